@@ -15,6 +15,11 @@ frappe.ui.form.on('Arrangement File', {
             };
         });
 
+        // חיפוש המגרשים הפנויים הקרובים ביותר לצביר / למחוברים של התיק
+        frm.add_custom_button(__('Find Nearest Lots'), function() {
+            open_nearest_lots_dialog(frm);
+        }, __("Actions"));
+
         // הוספת כפתור למחיקת Fixture Compensation (השורה הראשונה כדוגמה)
         if (frm.doc.link_fixtures && frm.doc.link_fixtures.length > 0) {
             frm.add_custom_button(__('Delete Fixture Compensation'), function() {
@@ -105,3 +110,84 @@ function update_total_fixture_compensation(frm) {
     });
     frm.set_value('total_fixture_compensation', total);
 }
+
+// k המגרשים הפנויים (חייבים בהיטל, לא משויכים לתיק שאינו מבוטל) הקרובים למיקום הצביר או המחובר
+function open_nearest_lots_dialog(frm) {
+    const first_fixture = (frm.doc.link_fixtures || []).map(row => row.link_fixture).find(Boolean);
+    const dialog = new frappe.ui.Dialog({
+        title: __('Nearest Available Lots'),
+        size: 'large',
+        fields: [
+            {
+                fieldname: 'source_doctype',
+                fieldtype: 'Select',
+                label: __('Near'),
+                options: ['Fixture Compensation', 'Cluster'],
+                default: 'Fixture Compensation',
+                onchange: () => dialog.set_df_property('source_name', 'options', dialog.get_value('source_doctype'))
+            },
+            {
+                fieldname: 'source_name',
+                fieldtype: 'Dynamic Link',
+                label: __('Document'),
+                options: 'source_doctype',
+                default: first_fixture,
+                reqd: 1
+            },
+            { fieldtype: 'Column Break' },
+            { fieldname: 'k', fieldtype: 'Int', label: __('Number of Lots'), default: 10 },
+            { fieldname: 'max_distance_m', fieldtype: 'Float', label: __('Max Distance (m)') },
+            { fieldtype: 'Section Break' },
+            { fieldname: 'results', fieldtype: 'HTML' }
+        ],
+        primary_action_label: __('Search'),
+        primary_action(values) {
+            frappe.call({
+                method: 'rb.gis_integration.nearest_lots.find_nearest_lots',
+                args: {
+                    doctype: values.source_doctype,
+                    name: values.source_name,
+                    k: values.k,
+                    max_distance_m: values.max_distance_m,
+                    // אותו סינון כמו בבחירת assigned_lot
+                    filters: { plan_status: 'אישור ומתן תוקף' },
+                    arrangement_file: frm.is_new() ? null : frm.doc.name
+                },
+                callback: function({ message }) {
+                    render_nearest_lots(frm, dialog, (message && message.lots) || []);
+                }
+            });
+        }
+    });
+    dialog.show();
+}
+
+function render_nearest_lots(frm, dialog, lots) {
+    const $wrapper = dialog.get_field('results').$wrapper;
+    if (!lots.length) {
+        $wrapper.html(`<div class="text-muted">${__('No available Lots found.')}</div>`);
+        return;
+    }
+    const esc = frappe.utils.escape_html;
+    const rows = lots.map(lot => `
+        <tr>
+            <td>${esc(lot.lot)}</td>
+            <td>${esc(lot.plan || '')}</td>
+            <td>${esc(lot.lot_number || '')}</td>
+            <td class="text-right">${format_number(lot.area_sqm || 0, null, 0)}</td>
+            <td class="text-right">${format_number(lot.distance_m, null, 0)}</td>
+            <td><button class="btn btn-xs btn-default" data-lot="${esc(lot.lot)}">${__('Assign')}</button></td>
+        </tr>`).join('');
+    $wrapper.html(`
+        <table class="table table-bordered table-condensed">
+            <thead><tr>
+                <th>${__('Lot')}</th><th>${__('Plan')}</th><th>${__('Lot Number')}</th>
+                <th class="text-right">${__('Area (sqm)')}</th><th class="text-right">${__('Distance (m)')}</th><th></th>
+            </tr></thead>
+            <tbody>${rows}</tbody>
+        </table>`);
+    $wrapper.find('button[data-lot]').on('click', function() {
+        frm.set_value('assigned_lot', $(this).attr('data-lot'));
+        dialog.hide();
+    });
+}
@@ -0,0 +1,110 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("gis-benchmark")
+@click.argument("doctype")
+@click.option("--modes", default="single,batch,concurrent", help="Comma separated sync modes to run")
+@click.option("--limit", type=int, help="Benchmark only the first N documents")
+@click.option("--latency-ms", type=float, default=20, help="Simulated GIS latency per request")
+@click.option("--jitter-ms", type=float, default=0, help="Random extra latency per request")
+@click.option("--error-rate", type=float, default=0, help="Fraction of requests failing with 503")
+@click.option("--batch-size", type=int, help="Batch size for the batch/concurrent modes")
+@click.option("--workers", type=int, help="Fetch threads for the concurrent mode")
+@pass_context
+def gis_benchmark(context, doctype, modes, limit, latency_ms, jitter_ms, error_rate, batch_size, workers):
+	"""Benchmark GIS geometry sync modes against a local pg_featureserv stand-in."""
+	import frappe
+
+	from rb.gis_integration.benchmark import run_benchmark
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		results = run_benchmark(
+			doctype,
+			modes=[m.strip() for m in modes.split(",") if m.strip()],
+			limit=limit,
+			latency_ms=latency_ms,
+			jitter_ms=jitter_ms,
+			error_rate=error_rate,
+			batch_size=batch_size,
+			workers=workers,
+		)
+	finally:
+		frappe.destroy()
+
+	columns = [
+		"mode", "documents", "batch_size", "workers", "seconds", "features_per_sec", "requests", "p95_ms", "errors"
+	]
+	click.echo("\t".join(columns))
+	for row in results:
+		click.echo("\t".join(str(row[c]) for c in columns))
+
+
+@click.command("gis-devserver")
+@click.option("--port", type=int, default=9000)
+@click.option("--collection", "collections", multiple=True, required=True)
+@click.option("--property", "prop", default="id", help="Property holding the generated ids")
+@click.option("--features", type=int, default=1000)
+@click.option("--latency-ms", type=float, default=0)
+@click.option("--error-rate", type=float, default=0)
+def gis_devserver(port, collections, prop, features, latency_ms, error_rate):
+	"""Serve generated features with the pg_featureserv API on localhost."""
+	from rb.gis_integration.devserver import DevServer, make_features
+
+	server = DevServer(port=port, latency_ms=latency_ms, error_rate=error_rate)
+	ids = [str(i) for i in range(1, features + 1)]
+	for collection in collections:
+		server.add_collection(collection, make_features(ids, prop))
+	click.echo(f"Serving {', '.join(collections)} on {server.url}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		server.stop()
+
+
+@click.command("gis-import")
+@click.argument("doctype")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--property", "match_property", help="Feature property matched against the layer's id_field")
+@click.option("--srid", type=int, help="EPSG code of a file that does not declare its CRS")
+@click.option("--table", help="GeoPackage feature table (when there are several)")
+@click.option("--batch-size", type=int, default=500, help="Features matched and committed per transaction")
+@pass_context
+def gis_import(context, doctype, path, match_property, srid, table, batch_size):
+	"""Import geometries from a GeoJSON, GeoJSONSeq or GeoPackage file into a GIS layer."""
+	import frappe
+
+	from rb.gis_integration.importer import import_file
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		stats = import_file(
+			doctype,
+			path,
+			match_property=match_property,
+			srid=srid,
+			table=table,
+			batch_size=batch_size,
+			progress=lambda s: click.echo(
+				f"read {s['read']}, updated {s['updated']}, unchanged {s['unchanged']}, "
+				f"unmatched {s['unmatched']}, errors {s['errors']}",
+				err=True,
+			),
+		)
+	finally:
+		frappe.destroy()
+
+	for key in ("read", "matched", "updated", "unchanged", "unmatched", "errors", "seconds"):
+		click.echo(f"{key}\t{stats.get(key)}")
+	for detail in stats["error_details"]:
+		click.echo(f"error\t{detail}")
+	if stats["unmatched_sample"]:
+		click.echo(f"unmatched sample\t{', '.join(map(str, stats['unmatched_sample']))}")
+
+
+commands = [gis_benchmark, gis_devserver, gis_import]
@@ -1,502 +1,134 @@
 import json
-from typing import Optional, Dict, Any, List
+import warnings
+from typing import Optional, Dict, Any, List, Tuple
 
 import frappe
 from frappe import _
+from werkzeug.wrappers import Response
 
+from . import cache as gis_cache
+from . import metrics as gis_metrics_store
+from . import geometry_store, sync_engine
+from .geometry import convert_to_fc, geometry_only_fc  # re-exported
 from .gis_connector import PGFeatureServConnector
-from .settings import get_doctype_config, load_gis_config, clear_gis_config_cache
+from .sync_engine import MAX_GEOJSON_BYTES, serialize_geometry  # re-exported
+from .settings import DEFAULT_GEOMETRY_MIN_ZOOM, get_doctype_config, load_gis_config, clear_gis_config_cache
 
 
-MAX_GEOJSON_BYTES = int(frappe.conf.get("gis_geojson_max_bytes", 1_000_000))  # default 1MB
-
+DEFAULT_VIEWPORT_LIMIT = 2000
+MAX_VIEWPORT_LIMIT = 10000
 
 @frappe.whitelist()
-def fetch_lot_geometry(lot_name: str) -> Optional[str]:
-    doc = frappe.get_doc("Lot", lot_name)
-    cfg = get_doctype_config("Lot") or {}
-    collection = cfg.get("collection", "lots")
-    id_field = cfg.get("id_field", "lot_id")
-    # Save simplified geometry-only FC into Geolocation field `location` by default
-    target_field = cfg.get("geometry_target_field", "location")
-    fetch_mode = cfg.get("fetch_mode")  # "by_id" or "by_property"
-    property_name = cfg.get("property_name")
-    fallback_props = cfg.get("fallback_properties") or []
-
-    feature_id = doc.get(id_field)
-    if not feature_id:
-        frappe.msgprint(_(f"No {id_field} found on this Lot"))
-        return None
-
-    conn = PGFeatureServConnector()
-    feature = None
-    if fetch_mode == "by_property" or property_name:
-        property_name = property_name or id_field
-        fc = conn.get_features_by_property(collection, property_name, feature_id, limit=1)
-        if fc and fc.get("features"):
-            feature = fc["features"][0]
-    else:
-        feature = conn.get_feature_by_id(collection, feature_id)
-
-    # Try configured fallbacks by property if primary attempt failed
-    if not feature and fallback_props:
-        for fp in fallback_props:
-            val = doc.get(fp)
-            if not val:
-                continue
-            fc = conn.get_features_by_property(collection, fp, val, limit=1)
-            if fc and fc.get("features"):
-                feature = fc["features"][0]
-                break
-
-    if not feature:
-        msg = _(
-            "No geometry found in GIS for {0} using {1}{2}"
-        ).format(
-            feature_id,
-            f"id_field={id_field}",
-            f", fallbacks={','.join(fallback_props)}" if fallback_props else "",
-        )
-        frappe.msgprint(msg, indicator="orange")
-        return None
+def fetch_geometry(doctype: str, name: str) -> Optional[str]:
+    """Fetch geometry from GIS for any configured DocType and store it."""
+    frappe.has_permission(doctype, "read", name, throw=True)
+    return sync_engine.fetch_document(doctype, name)
 
-    geojson_full = convert_to_fc(feature)
-    if not conn.validate_geojson(geojson_full):
-        frappe.throw(_("Invalid GeoJSON data received from GIS"))
-
-    # Simplify to geometry-only (strip id/properties) for the Geolocation field
-    geojson_simple = geometry_only_fc(geojson_full)
 
-    data = json.dumps(geojson_simple, ensure_ascii=False)
-    if len(data.encode("utf-8")) > MAX_GEOJSON_BYTES:
-        frappe.msgprint(
-            _("Geometry too large; consider simplifying or reducing precision"),
-            indicator="orange",
-        )
-
-    # Persist simplified FC into the target field (usually `location` Geolocation)
-    try:
-        doc.db_set(target_field, data)
-    except Exception:
-        pass
-
-    # Optionally persist full FC into a separate field if you add one in future
-
-    return data
+@frappe.whitelist()
+def fetch_lot_geometry(lot_name: str) -> Optional[str]:
+    return fetch_geometry("Lot", lot_name)
 
 
 @frappe.whitelist()
 def fetch_plan_geometry(plan_name: str) -> Optional[str]:
-    doc = frappe.get_doc("Plan", plan_name)
-    cfg = get_doctype_config("Plan") or {}
-    collection = cfg.get("collection", "rb_layers.plans")
-    id_field = cfg.get("id_field", "plan_number")
-    target_field = cfg.get("geometry_target_field", "location")
-    fetch_mode = cfg.get("fetch_mode")
-    property_name = cfg.get("property_name")
-    fallback_props = cfg.get("fallback_properties") or []
-
-    feature_id = doc.get(id_field)
-    if not feature_id:
-        frappe.msgprint(_(f"No {id_field} found on this Plan"))
-        return None
-
-    conn = PGFeatureServConnector()
-    feature = None
-    if fetch_mode == "by_property" or property_name:
-        property_name = property_name or id_field
-        fc = conn.get_features_by_property(collection, property_name, feature_id, limit=1)
-        if fc and fc.get("features"):
-            feature = fc["features"][0]
-    else:
-        feature = conn.get_feature_by_id(collection, feature_id)
-
-    if not feature and fallback_props:
-        for fp in fallback_props:
-            val = doc.get(fp)
-            if not val:
-                continue
-            fc = conn.get_features_by_property(collection, fp, val, limit=1)
-            if fc and fc.get("features"):
-                feature = fc["features"][0]
-                break
-
-    if not feature:
-        msg = _(
-            "No geometry found in GIS for {0} using {1}{2}"
-        ).format(
-            feature_id,
-            f"id_field={id_field}",
-            f", fallbacks={','.join(fallback_props)}" if fallback_props else "",
-        )
-        frappe.msgprint(msg, indicator="orange")
-        return None
-
-    geojson_full = convert_to_fc(feature)
-    if not conn.validate_geojson(geojson_full):
-        frappe.throw(_("Invalid GeoJSON data received from GIS"))
-
-    geojson_simple = geometry_only_fc(geojson_full)
-    data = json.dumps(geojson_simple, ensure_ascii=False)
-    if len(data.encode("utf-8")) > MAX_GEOJSON_BYTES:
-        frappe.msgprint(
-            _("Geometry too large; consider simplifying or reducing precision"),
-            indicator="orange",
-        )
-
-    try:
-        doc.db_set(target_field, data)
-    except Exception:
-        pass
-
-    return data
+    return fetch_geometry("Plan", plan_name)
 
 
 @frappe.whitelist()
 def fetch_cluster_geometry(cluster_name: str) -> Optional[str]:
-    """Fetch geometry from GIS for a Cluster document based on config and persist it.
-    cluster_name is the DocType name (doc.name), not the cluster_name field value.
-    """
-    doc = frappe.get_doc("Cluster", cluster_name)
-    cfg = get_doctype_config("Cluster") or {}
-    collection = cfg.get("collection", "rb_layers.clusters")
-    id_field = cfg.get("id_field", "cluster_name")
-    target_field = cfg.get("geometry_target_field", "location")
-    fetch_mode = cfg.get("fetch_mode")  # "by_id" or "by_property"
-    property_name = cfg.get("property_name")
-    fallback_props = cfg.get("fallback_properties") or []
-
-    feature_id = doc.get(id_field)
-    if not feature_id:
-        frappe.msgprint(_(f"No {id_field} found on this Cluster"))
-        return None
-
-    conn = PGFeatureServConnector()
-    feature = None
-    if fetch_mode == "by_property" or property_name:
-        property_name = property_name or id_field
-        fc = conn.get_features_by_property(collection, property_name, feature_id, limit=1)
-        if fc and fc.get("features"):
-            feature = fc["features"][0]
-    else:
-        feature = conn.get_feature_by_id(collection, feature_id)
-
-    if not feature and fallback_props:
-        for fp in fallback_props:
-            val = doc.get(fp)
-            if not val:
-                continue
-            fc = conn.get_features_by_property(collection, fp, val, limit=1)
-            if fc and fc.get("features"):
-                feature = fc["features"][0]
-                break
-
-    if not feature:
-        msg = _(
-            "No geometry found in GIS for {0} using {1}{2}"
-        ).format(
-            feature_id,
-            f"id_field={id_field}",
-            f", fallbacks={','.join(fallback_props)}" if fallback_props else "",
-        )
-        frappe.msgprint(msg, indicator="orange")
-        return None
-
-    geojson_full = convert_to_fc(feature)
-    if not conn.validate_geojson(geojson_full):
-        frappe.throw(_("Invalid GeoJSON data received from GIS"))
-
-    geojson_simple = geometry_only_fc(geojson_full)
-    data = json.dumps(geojson_simple, ensure_ascii=False)
-    if len(data.encode("utf-8")) > MAX_GEOJSON_BYTES:
-        frappe.msgprint(
-            _("Geometry too large; consider simplifying or reducing precision"),
-            indicator="orange",
-        )
-
-    try:
-        doc.db_set(target_field, data)
-    except Exception:
-        pass
-
-    return data
+    """cluster_name is the DocType name (doc.name), not the cluster_name field value."""
+    return fetch_geometry("Cluster", cluster_name)
 
 
 @frappe.whitelist()
 def fetch_fixture_compensation_geometry(fixture_name: str) -> Optional[str]:
-    """Fetch geometry for Fixture Compensation based on GIS config and persist it."""
-    doc = frappe.get_doc("Fixture Compensation", fixture_name)
-    cfg = get_doctype_config("Fixture Compensation") or {}
-    collection = cfg.get("collection", "rb_layers.fixture_compensation")
-    id_field = cfg.get("id_field", "name")
-    target_field = cfg.get("geometry_target_field", "location")
-    fetch_mode = cfg.get("fetch_mode")
-    property_name = cfg.get("property_name")
-    fallback_props = cfg.get("fallback_properties") or []
-
-    feature_id = doc.get(id_field) if id_field != "name" else doc.name
-    if not feature_id:
-        # As a last resort, use the document name which carries the FXC-* autoname
-        feature_id = doc.name
-
-    if not feature_id:
-        frappe.msgprint(_(f"No {id_field} found on this Fixture Compensation"))
-        return None
-
-    conn = PGFeatureServConnector()
-    feature = None
-    if fetch_mode == "by_property" or property_name:
-        property_name = property_name or id_field
-        fc = conn.get_features_by_property(collection, property_name, feature_id, limit=1)
-        if fc and fc.get("features"):
-            feature = fc["features"][0]
-    else:
-        feature = conn.get_feature_by_id(collection, feature_id)
-
-    if not feature and fallback_props:
-        for fp in fallback_props:
-            val = doc.get(fp)
-            if not val:
-                continue
-            fc = conn.get_features_by_property(collection, fp, val, limit=1)
-            if fc and fc.get("features"):
-                feature = fc["features"][0]
-                break
-
-    if not feature:
-        msg = _(
-            "No geometry found in GIS for {0} using {1}{2}"
-        ).format(
-            feature_id,
-            f"id_field={id_field}",
-            f", fallbacks={','.join(fallback_props)}" if fallback_props else "",
-        )
-        frappe.msgprint(msg, indicator="orange")
-        return None
-
-    geojson_full = convert_to_fc(feature)
-    if not conn.validate_geojson(geojson_full):
-        frappe.throw(_("Invalid GeoJSON data received from GIS"))
-
-    geojson_simple = geometry_only_fc(geojson_full)
-    data = json.dumps(geojson_simple, ensure_ascii=False)
-    if len(data.encode("utf-8")) > MAX_GEOJSON_BYTES:
-        frappe.msgprint(
-            _("Geometry too large; consider simplifying or reducing precision"),
-            indicator="orange",
-        )
+    return fetch_geometry("Fixture Compensation", fixture_name)
 
-    try:
-        doc.db_set(target_field, data)
-    except Exception:
-        pass
-
-    return data
 
 @frappe.whitelist()
 def fetch_geometry_by_property(
     doctype: str,
     docname: str,
-    field_name: str,
     collection: str,
     property_name: str,
     property_value: str,
     limit: int = 100,
+    field_name: Optional[str] = None,
 ) -> Optional[str]:
+    """Store the features matching `property_name = property_value` as a document's geometry.
+
+    The features go through the same reduction and GIS Geometry store as
+    `fetch_geometry`.
+
+    Deprecated: `field_name` is ignored and will be removed. Layer geometries live in
+    the GIS Geometry store, not on a document field, so there is no field to write to.
+    """
+    if field_name is not None:
+        warnings.warn(
+            "fetch_geometry_by_property: field_name is deprecated and ignored",
+            DeprecationWarning,
+            stacklevel=2,
+        )
     if not frappe.has_permission(doctype, "write", docname):
         frappe.throw(_("You don't have permission to update this document"))
+    layer = sync_engine.get_layer(doctype)
 
     conn = PGFeatureServConnector()
     fc = conn.get_features_by_property(collection, property_name, property_value, limit)
     if not fc or not fc.get("features"):
         frappe.msgprint(_("No geometry found for {0}={1}").format(property_name, property_value))
         return None
+    if not conn.validate_geojson(fc):
+        frappe.throw(_("Invalid GeoJSON data received from GIS"))
 
-    data = json.dumps(fc, ensure_ascii=False)
-    if len(data.encode("utf-8")) > MAX_GEOJSON_BYTES:
+    data, report = serialize_geometry(geometry_only_fc(fc), layer.cfg)
+    if not report["fits"]:
         frappe.msgprint(
             _("Geometry too large; consider narrowing the filter or simplifying"),
             indicator="orange",
         )
 
-    frappe.db.set_value(doctype, docname, field_name, data)
+    geometry_store.save_geometry(doctype, docname, data)
     return data
 
 
 @frappe.whitelist()
-def sync_all_lot_geometries(collection: Optional[str] = None) -> Dict[str, Any]:
-    lots = frappe.get_all(
-        "Lot",
-        filters={"lot_id": ["!=", ""]},
-        fields=["name", "lot_id"],
-    )
-    cfg = get_doctype_config("Lot") or {}
-    collection = cfg.get("collection", "lots")
-    id_field = cfg.get("id_field", "lot_id")
-    target_field = cfg.get("geometry_target_field", "location")
-    fetch_mode = cfg.get("fetch_mode")
-    property_name = cfg.get("property_name")
-
-    conn = PGFeatureServConnector()
-    ok, errs, details = 0, 0, []
-
-    for lot in lots:
-        coll = collection
-        try:
-            feature = None
-            feature_id = lot.get(id_field) or lot.get("lot_id")
-            if fetch_mode == "by_property" or property_name:
-                pn = property_name or id_field
-                fc = conn.get_features_by_property(coll, pn, feature_id, limit=1)
-                if fc and fc.get("features"):
-                    feature = fc["features"][0]
-            else:
-                feature = conn.get_feature_by_id(coll, feature_id)
-            if feature:
-                fc_full = convert_to_fc(feature)
-                fc_simple = geometry_only_fc(fc_full)
-                try:
-                    frappe.db.set_value("Lot", lot.name, target_field, json.dumps(fc_simple, ensure_ascii=False))
-                except Exception:
-                    pass
-                ok += 1
-            else:
-                errs += 1
-                details.append(f"No geometry for Lot {lot['name']}")
-        except Exception as e:
-            errs += 1
-            details.append(f"Error updating {lot['name']}: {e}")
-
-    return {"success": ok, "errors": errs, "error_details": details[:10]}
+def sync_all_geometries(
+    doctype: str, batch_size: Optional[int] = None, workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """Bulk sync every document of a configured DocType in the foreground."""
+    frappe.has_permission(doctype, "write", throw=True)
+    rows = sync_engine.get_rows(doctype)
+    return sync_engine.sync_rows(doctype, rows, batch_size=batch_size, workers=workers)
 
 
 @frappe.whitelist()
-def sync_all_plan_geometries() -> Dict[str, Any]:
-    plans = frappe.get_all(
-        "Plan",
-        filters={"plan_number": ["!=", ""]},
-        fields=["name", "plan_number"],
-    )
-    cfg = get_doctype_config("Plan") or {}
-    collection = cfg.get("collection", "rb_layers.plans")
-    id_field = cfg.get("id_field", "plan_number")
-    target_field = cfg.get("geometry_target_field", "location")
-    fetch_mode = cfg.get("fetch_mode")
-    property_name = cfg.get("property_name")
-    fallback_props = cfg.get("fallback_properties") or []
+def sync_all_lot_geometries(
+    collection: Optional[str] = None, batch_size: Optional[int] = None, workers: Optional[int] = None
+) -> Dict[str, Any]:
+    return sync_all_geometries("Lot", batch_size=batch_size, workers=workers)
 
-    conn = PGFeatureServConnector()
-    ok, errs, details = 0, 0, []
-
-    for plan in plans:
-        try:
-            feature = None
-            feature_id = plan.get(id_field) or plan.get("plan_number")
-            if fetch_mode == "by_property" or property_name:
-                pn = property_name or id_field
-                if feature_id:
-                    fc = conn.get_features_by_property(collection, pn, feature_id, limit=1)
-                    if fc and fc.get("features"):
-                        feature = fc["features"][0]
-            else:
-                feature = conn.get_feature_by_id(collection, feature_id)
-
-            if not feature and fallback_props:
-                values = frappe.db.get_value("Plan", plan.name, fallback_props, as_dict=True) if fallback_props else {}
-                for fp in fallback_props:
-                    val = (values or {}).get(fp)
-                    if not val:
-                        continue
-                    fc = conn.get_features_by_property(collection, fp, val, limit=1)
-                    if fc and fc.get("features"):
-                        feature = fc["features"][0]
-                        break
-
-            if feature:
-                fc_full = convert_to_fc(feature)
-                fc_simple = geometry_only_fc(fc_full)
-                try:
-                    frappe.db.set_value("Plan", plan.name, target_field, json.dumps(fc_simple, ensure_ascii=False))
-                except Exception:
-                    pass
-                ok += 1
-            else:
-                errs += 1
-                details.append(f"No geometry for Plan {plan['name']}")
-        except Exception as e:
-            errs += 1
-            details.append(f"Error updating {plan['name']}: {e}")
-
-    return {"success": ok, "errors": errs, "error_details": details[:10]}
+
+@frappe.whitelist()
+def sync_all_plan_geometries(batch_size: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    return sync_all_geometries("Plan", batch_size=batch_size, workers=workers)
 
 
 @frappe.whitelist()
-def sync_all_cluster_geometries(collection: Optional[str] = None) -> Dict[str, Any]:
+def sync_all_cluster_geometries(
+    collection: Optional[str] = None, batch_size: Optional[int] = None, workers: Optional[int] = None
+) -> Dict[str, Any]:
     """Bulk sync for Clusters that have an id_field value configured (default cluster_name)."""
-    clusters = frappe.get_all(
-        "Cluster",
-        filters={"cluster_name": ["!=", ""]},
-        fields=["name", "cluster_name"],
-    )
-    cfg = get_doctype_config("Cluster") or {}
-    collection = cfg.get("collection", "rb_layers.clusters")
-    id_field = cfg.get("id_field", "cluster_name")
-    target_field = cfg.get("geometry_target_field", "location")
-    fetch_mode = cfg.get("fetch_mode")
-    property_name = cfg.get("property_name")
-
-    conn = PGFeatureServConnector()
-    ok, errs, details = 0, 0, []
-
-    for cl in clusters:
-        coll = collection
-        try:
-            feature = None
-            feature_id = cl.get(id_field) or cl.get("cluster_name")
-            if fetch_mode == "by_property" or property_name:
-                pn = property_name or id_field
-                fc = conn.get_features_by_property(coll, pn, feature_id, limit=1)
-                if fc and fc.get("features"):
-                    feature = fc["features"][0]
-            else:
-                feature = conn.get_feature_by_id(coll, feature_id)
-            if feature:
-                fc_full = convert_to_fc(feature)
-                fc_simple = geometry_only_fc(fc_full)
-                try:
-                    frappe.db.set_value("Cluster", cl.name, target_field, json.dumps(fc_simple, ensure_ascii=False))
-                except Exception:
-                    pass
-                ok += 1
-            else:
-                errs += 1
-                details.append(f"No geometry for Cluster {cl['name']}")
-        except Exception as e:
-            errs += 1
-            details.append(f"Error updating {cl['name']}: {e}")
-
-    return {"success": ok, "errors": errs, "error_details": details[:10]}
+    return sync_all_geometries("Cluster", batch_size=batch_size, workers=workers)
 
 
 @frappe.whitelist()
-def sync_all_fixture_compensation_geometries() -> Dict[str, Any]:
+def sync_all_fixture_compensation_geometries(
+    batch_size: Optional[int] = None, workers: Optional[int] = None
+) -> Dict[str, Any]:
     """Bulk sync for Fixture Compensation records based on configured GIS mapping."""
-    fixtures = frappe.get_all("Fixture Compensation", pluck="name")
-    ok, errs, details = 0, 0, []
-
-    for fx_name in fixtures:
-        try:
-            data = fetch_fixture_compensation_geometry(fx_name)
-            if data:
-                ok += 1
-            else:
-                errs += 1
-                details.append(f"No geometry for Fixture Compensation {fx_name}")
-        except Exception as e:
-            errs += 1
-            details.append(f"Error updating {fx_name}: {e}")
-
-    return {"success": ok, "errors": errs, "error_details": details[:10]}
+    return sync_all_geometries("Fixture Compensation", batch_size=batch_size, workers=workers)
 
 
 @frappe.whitelist()
@@ -509,14 +141,14 @@ def get_fixture_compensation_coords(
     from frappe.geo import utils as geo_utils
 
     filters_sql = geo_utils.get_coords_conditions(doctype, filters)[4:]
-
-    if filters_sql:
-        rows = frappe.db.sql(
-            f"""SELECT name, location FROM `tab{doctype}` WHERE {filters_sql}""",
-            as_dict=True,
-        )
-    else:
-        rows = frappe.get_all(doctype, fields=["name", "location"])
+    rows = frappe.db.sql(
+        f"""SELECT `tab{doctype}`.name, g.geometry AS location
+        FROM `tab{doctype}`
+        INNER JOIN `tabGIS Geometry` g
+            ON g.reference_doctype = {frappe.db.escape(doctype)} AND g.reference_name = `tab{doctype}`.name
+        {"WHERE " + filters_sql if filters_sql else ""}""",
+        as_dict=True,
+    )
 
     coords = []
     for row in rows:
@@ -528,29 +160,94 @@ def get_fixture_compensation_coords(
     return geo_utils.convert_to_geojson("location_field", coords)
 
 
-def convert_to_fc(data: Dict[str, Any]) -> Dict[str, Any]:
-    t = data.get("type")
-    if t == "FeatureCollection":
-        return data
-    if t == "Feature":
-        return {"type": "FeatureCollection", "features": [data]}
-    # Geometry only
-    return {
-        "type": "FeatureCollection",
-        "features": [{"type": "Feature", "geometry": data, "properties": {}}],
-    }
+def _parse_bbox(bbox: Any) -> Tuple[float, float, float, float]:
+    values = bbox.split(",") if isinstance(bbox, str) else list(bbox or [])
+    try:
+        west, south, east, north = (float(v) for v in values)
+    except (TypeError, ValueError):
+        frappe.throw(_("bbox must be west,south,east,north in degrees"))
+    if west > east or south > north:
+        frappe.throw(_("Invalid bbox: {0}").format(bbox))
+    return west, south, east, north
+
+
+def _readable_names(doctype: str, names: List[str], filters: Optional[Any] = None) -> set:
+    """Subset of `names` the user can read and that match list-view style `filters`."""
+    if not names:
+        return set()
+    extra = frappe.parse_json(filters) if filters else []
+    if isinstance(extra, dict):
+        extra = [[doctype, k] + (v if isinstance(v, list) else ["=", v]) for k, v in extra.items()]
+    return set(
+        frappe.get_list(
+            doctype,
+            filters=[[doctype, "name", "in", names], *extra],
+            pluck="name",
+            limit_page_length=0,
+        )
+    )
 
-def geometry_only_fc(fc: Dict[str, Any]) -> Dict[str, Any]:
-    """Strip id and properties from each feature, keep geometry only."""
-    fc = convert_to_fc(fc)
-    simple = {"type": "FeatureCollection", "features": []}
-    for feat in fc.get("features", []):
-        simple["features"].append({
-            "type": "Feature",
-            "properties": {},
-            "geometry": feat.get("geometry"),
-        })
-    return simple
+
+@frappe.whitelist()
+def get_coords_in_view(
+    doctype: str,
+    bbox: Any,
+    zoom: Optional[int] = None,
+    limit: Optional[int] = None,
+    filters: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """GeoJSON features of a geo-enabled DocType that overlap the map viewport.
+
+    `bbox` is "west,south,east,north" in degrees. Below the collection's
+    `map.geometry_min_zoom` (default 14) features are returned as centroid points.
+    At most `limit` features are returned; `truncated` tells the map to zoom in.
+    `filters` are applied like list view filters, together with the user's permissions.
+    """
+    if not sync_engine.is_geo_doctype(doctype):
+        frappe.throw(_("GIS geometry is not stored for {0}").format(doctype))
+    frappe.has_permission(doctype, "read", throw=True)
+
+    west, south, east, north = _parse_bbox(bbox)
+    limit = min(max(int(limit or DEFAULT_VIEWPORT_LIMIT), 1), MAX_VIEWPORT_LIMIT)
+    map_cfg = (get_doctype_config(doctype) or {}).get("map") or {}
+    min_zoom = int(map_cfg.get("geometry_min_zoom") or DEFAULT_GEOMETRY_MIN_ZOOM)
+    with_geometry = zoom in (None, "") or int(zoom) >= min_zoom
+
+    rows = geometry_store.get_in_bbox(doctype, west, south, east, north, limit + 1, with_geometry)
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+
+    allowed = _readable_names(doctype, [row.reference_name for row in rows], filters)
+    features = []
+    for row in rows:
+        if row.reference_name not in allowed:
+            continue
+        if with_geometry:
+            geometries = [f.get("geometry") for f in json.loads(row.geometry or "{}").get("features") or []]
+        elif row.centroid_lon is not None:
+            geometries = [{"type": "Point", "coordinates": [row.centroid_lon, row.centroid_lat]}]
+        else:
+            geometries = []
+        for geometry in geometries:
+            features.append(
+                {
+                    "type": "Feature",
+                    "id": row.reference_name,
+                    "properties": {"name": row.reference_name},
+                    "geometry": geometry,
+                }
+            )
+
+    return {"type": "FeatureCollection", "features": features, "truncated": truncated}
+
+
+@frappe.whitelist()
+def get_document_geometry(doctype: str, name: str) -> Optional[str]:
+    """Stored geometry for a document, loaded by the form only when its map renders."""
+    if not sync_engine.is_geo_doctype(doctype):
+        frappe.throw(_("GIS geometry is not stored for {0}").format(doctype))
+    frappe.has_permission(doctype, "read", name, throw=True)
+    return geometry_store.get_geometry(doctype, name)
 
 
 @frappe.whitelist()
@@ -581,12 +278,28 @@ def gis_healthcheck(doctype: str = "Lot") -> Dict[str, Any]:
             "has_app_config_file": bool(load_gis_config()),
         },
         "config_meta": (load_gis_config() or {}).get("_meta"),
+        "cache": gis_cache.stats(),
+        "circuit": conn.breaker.state(),
         "examples": examples,
     }
 
 
+@frappe.whitelist()
+def gis_metrics(format: str = "json", reset: int = 0):
+    """pg_featureserv request metrics of all workers; `format=prometheus` for a scrape target."""
+    frappe.only_for("System Manager")
+    if int(reset or 0):
+        gis_metrics_store.reset()
+        return {"reset": True}
+    if format == "prometheus":
+        return Response(gis_metrics_store.prometheus_text(), mimetype="text/plain; version=0.0.4")
+    return gis_metrics_store.get_metrics()
+
+
 @frappe.whitelist()
 def gis_reload_config() -> Dict[str, Any]:
+    """Re-read config.json and site overrides in every worker (on their next access)."""
+    frappe.only_for("System Manager")
     clear_gis_config_cache()
     cfg = load_gis_config()
     return {"reloaded": True, "config": cfg}
@@ -595,7 +308,10 @@ def gis_reload_config() -> Dict[str, Any]:
 def gis_get_client_config(doctype: str) -> Dict[str, Any]:
     cfg = load_gis_config() or {}
     dt_cfg = get_doctype_config(doctype) or {}
+    from .tiles import tile_url
+
     return {
         "basemaps": cfg.get("basemaps") or {},
         "map": (dt_cfg.get("map") if isinstance(dt_cfg, dict) else None) or {},
+        "tile_url": tile_url(doctype) if sync_engine.is_geo_doctype(doctype) else None,
     }
@@ -0,0 +1,289 @@
+"""Polygon areas of stored geometries, in square metres on the WGS84 ellipsoid.
+
+Positions are projected with the ellipsoidal Lambert cylindrical equal-area projection,
+in which the planar shoelace area is the area on the ellipsoid. Edges are taken as
+straight in the projection rather than as geodesics; at lot scale the difference is
+far below survey precision. Rings are shifted to their first vertex before summing so
+metre-level results keep full precision. With NumPy installed, all rings of a batch
+are projected and summed in a few array operations; without it the same formulas run
+vertex by vertex.
+
+`compute_areas` writes the results to `computed_area_sqm` on the layer's DocType (Lot),
+and every geometry write refreshes the field for its own document.
+"""
+
+import json
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+
+AREA_FIELD = "computed_area_sqm"
+DEFAULT_CHUNK_SIZE = 2000
+PROGRESS_EVENT = "gis_area_progress"
+
+# WGS84
+_A = 6378137.0
+_F = 1 / 298.257223563
+_E2 = _F * (2 - _F)
+_E = math.sqrt(_E2)
+
+
+def iter_polygons(geometry: Optional[Dict[str, Any]]) -> Iterable[List[List[List[float]]]]:
+    """Polygon coordinate arrays of a geometry, Feature or FeatureCollection."""
+    if not isinstance(geometry, dict):
+        return
+    t = geometry.get("type")
+    if t == "FeatureCollection":
+        for feat in geometry.get("features") or []:
+            yield from iter_polygons(feat)
+    elif t == "Feature":
+        yield from iter_polygons(geometry.get("geometry"))
+    elif t == "GeometryCollection":
+        for g in geometry.get("geometries") or []:
+            yield from iter_polygons(g)
+    elif t == "Polygon":
+        yield geometry.get("coordinates") or []
+    elif t == "MultiPolygon":
+        yield from geometry.get("coordinates") or []
+
+
+def _flatten(geometries: List[Any]) -> Tuple[List[float], List[float], List[int], List[int], List[float]]:
+    """Closed rings of all geometries as flat arrays.
+
+    Returns (lons, lats, ring of each vertex, geometry of each ring, sign of each ring:
+    +1 for shells, -1 for holes).
+    """
+    lons, lats, vertex_ring, ring_owner, ring_sign = [], [], [], [], []
+    for index, geometry in enumerate(geometries):
+        for polygon in iter_polygons(geometry):
+            for k, ring in enumerate(polygon):
+                if len(ring) < 3:
+                    continue
+                ring_id = len(ring_owner)
+                ring_owner.append(index)
+                ring_sign.append(1.0 if k == 0 else -1.0)
+                points = list(ring) if ring[0] == ring[-1] else [*ring, ring[0]]
+                for p in points:
+                    lons.append(p[0])
+                    lats.append(p[1])
+                    vertex_ring.append(ring_id)
+    return lons, lats, vertex_ring, ring_owner, ring_sign
+
+
+def _project_y(sin_lat):
+    """Northing of the ellipsoidal cylindrical equal-area projection (works on arrays too)."""
+    log = np.log if np is not None and not isinstance(sin_lat, float) else math.log
+    es = _E * sin_lat
+    q = (1 - _E2) * (sin_lat / (1 - es * es) - log((1 - es) / (1 + es)) / (2 * _E))
+    return _A * q / 2
+
+
+def project(lon: float, lat: float) -> Tuple[float, float]:
+    """Equal-area (x, y) in metres; planar areas of projected polygons are ellipsoidal areas."""
+    return _A * math.radians(lon), _project_y(math.sin(math.radians(lat)))
+
+
+def _areas_numpy(flat, count: int) -> List[float]:
+    lons, lats, vertex_ring, ring_owner, ring_sign = flat
+    ring = np.asarray(vertex_ring, dtype=np.int64)
+    x = _A * np.radians(np.asarray(lons, dtype=np.float64))
+    y = _project_y(np.sin(np.radians(np.asarray(lats, dtype=np.float64))))
+
+    # Shift every ring to its first vertex to keep precision in the cross products
+    starts = np.flatnonzero(np.r_[True, ring[1:] != ring[:-1]])
+    x -= x[starts][ring]
+    y -= y[starts][ring]
+
+    same = ring[1:] == ring[:-1]
+    cross = (x[:-1] * y[1:] - x[1:] * y[:-1])[same]
+    ring_area = np.abs(np.bincount(ring[:-1][same], weights=cross, minlength=len(ring_owner))) / 2
+    areas = np.bincount(
+        np.asarray(ring_owner, dtype=np.int64),
+        weights=ring_area * np.asarray(ring_sign),
+        minlength=count,
+    )
+    return [max(float(a), 0.0) for a in areas]
+
+
+def _areas_python(flat, count: int) -> List[float]:
+    lons, lats, vertex_ring, ring_owner, ring_sign = flat
+    sums = [0.0] * len(ring_owner)
+    origin = None
+    prev = None
+    for lon, lat, ring in zip(lons, lats, vertex_ring):
+        x, y = project(lon, lat)
+        if prev is None or prev[2] != ring:
+            origin, prev = (x, y), (0.0, 0.0, ring)
+            continue
+        x, y = x - origin[0], y - origin[1]
+        sums[ring] += prev[0] * y - x * prev[1]
+        prev = (x, y, ring)
+    areas = [0.0] * count
+    for ring, total in enumerate(sums):
+        areas[ring_owner[ring]] += ring_sign[ring] * abs(total) / 2
+    return [max(a, 0.0) for a in areas]
+
+
+def polygon_areas(geometries: List[Any]) -> List[float]:
+    """Area in m² of each geometry (holes subtracted; 0 for points and lines)."""
+    if not geometries:
+        return []
+    flat = _flatten(geometries)
+    if not flat[0]:
+        return [0.0] * len(geometries)
+    if np is not None:
+        return _areas_numpy(flat, len(geometries))
+    return _areas_python(flat, len(geometries))
+
+
+def has_area_field(doctype: str) -> bool:
+    return bool(frappe.get_meta(doctype).has_field(AREA_FIELD))
+
+
+def update_area(doctype: str, name: str, fc: Dict[str, Any]):
+    """Refresh the computed area of one document after its geometry was written."""
+    if has_area_field(doctype):
+        area = round(polygon_areas([fc])[0], 2)
+        frappe.db.set_value(doctype, name, AREA_FIELD, area, update_modified=False)
+
+
+def compute_areas(
+    doctype: str = "Lot",
+    plan: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress=None,
+) -> Dict[str, Any]:
+    """Recompute `computed_area_sqm` from the stored geometries of a DocType.
+
+    Geometries are read and written `chunk_size` documents at a time, one commit per
+    chunk; `plan` limits Lots to one Plan.
+    """
+    from .geometry_store import STORE_DOCTYPE
+
+    if not has_area_field(doctype):
+        frappe.throw(_("{0} has no {1} field").format(doctype, AREA_FIELD))
+    chunk_size = max(cint(chunk_size) or DEFAULT_CHUNK_SIZE, 1)
+    names = sorted(frappe.get_all(doctype, filters={"plan": plan}, pluck="name")) if plan else None
+    if names is not None:
+        total = len(names)
+    else:
+        total = frappe.db.count(STORE_DOCTYPE, {"reference_doctype": doctype})
+    started = time.monotonic()
+    computed = 0
+
+    def chunks():
+        fields = ["reference_name", "geometry"]
+        if names is not None:
+            for start in range(0, len(names), chunk_size):
+                chunk = names[start : start + chunk_size]
+                yield frappe.get_all(
+                    STORE_DOCTYPE,
+                    filters={"reference_doctype": doctype, "reference_name": ["in", chunk]},
+                    fields=fields,
+                )
+            return
+        last = None
+        while True:
+            filters = [["reference_doctype", "=", doctype]]
+            if last:
+                filters.append(["reference_name", ">", last])
+            rows = frappe.get_all(
+                STORE_DOCTYPE,
+                filters=filters,
+                fields=fields,
+                order_by="reference_name asc",
+                limit_page_length=chunk_size,
+            )
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1].reference_name
+
+    for rows in chunks():
+        if not rows:
+            continue
+        areas = polygon_areas([json.loads(row.geometry) if row.geometry else None for row in rows])
+        frappe.db.bulk_update(
+            doctype,
+            {row.reference_name: {AREA_FIELD: round(area, 2)} for row, area in zip(rows, areas)},
+            update_modified=False,
+        )
+        frappe.db.commit()
+        computed += len(rows)
+        if progress:
+            progress({"doctype": doctype, "plan": plan, "processed": computed, "total": total})
+
+    return {
+        "doctype": doctype,
+        "plan": plan,
+        "computed": computed,
+        "seconds": round(time.monotonic() - started, 2),
+        "vectorized": np is not None,
+    }
+
+
+@frappe.whitelist()
+def get_computed_areas(doctype: str, names) -> Dict[str, float]:
+    """Areas (m²) of the stored geometries of the given documents, computed on the fly."""
+    from .geometry_store import STORE_DOCTYPE
+
+    if isinstance(names, str):
+        names = frappe.parse_json(names) if names.startswith("[") else [names]
+    names = [n for n in names if frappe.has_permission(doctype, "read", n)]
+    rows = frappe.get_all(
+        STORE_DOCTYPE,
+        filters={"reference_doctype": doctype, "reference_name": ["in", names or [""]]},
+        fields=["reference_name", "geometry"],
+    )
+    areas = polygon_areas([json.loads(row.geometry) if row.geometry else None for row in rows])
+    return {row.reference_name: round(area, 2) for row, area in zip(rows, areas)}
+
+
+@frappe.whitelist()
+def start_area_computation(plan: Optional[str] = None) -> Dict[str, Any]:
+    """Recompute Lot areas (of one Plan, or all) in a background job.
+
+    Progress and the result are pushed to the caller over `gis_area_progress`.
+    """
+    frappe.only_for(["System Manager", "GIS Operator"])
+    if plan and not frappe.db.exists("Plan", plan):
+        frappe.throw(_("Plan not found: {0}").format(plan))
+    job_id = f"gis_area::{plan or 'all'}"
+    frappe.enqueue(
+        "rb.gis_integration.area.run_area_computation",
+        queue="long",
+        timeout=3600,
+        job_id=job_id,
+        deduplicate=True,
+        plan=plan,
+        user=frappe.session.user,
+    )
+    return {"job_id": job_id}
+
+
+def run_area_computation(plan: Optional[str] = None, user: Optional[str] = None):
+    """Background job for `start_area_computation`."""
+    def publish(payload):
+        frappe.publish_realtime(PROGRESS_EVENT, payload, user=user)
+
+    try:
+        result = compute_areas(
+            "Lot", plan=plan, progress=lambda p: publish({**p, "status": "running"})
+        )
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), "GIS area computation failed")
+        publish({"doctype": "Lot", "plan": plan, "status": "failed", "error": str(e)})
+        return
+    publish({**result, "status": "completed"})
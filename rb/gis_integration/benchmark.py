@@ -0,0 +1,109 @@
+"""GIS sync benchmark against the local pg_featureserv stand-in (`devserver`).
+
+The stand-in is loaded with one generated feature for every document that would be
+synced. The layer is then pointed at it (in this process only), and each sync mode runs
+over the same documents:
+
+- single: one lookup per document (`batch_size` 1, one worker)
+- batch: `prop IN (...)` lookups with the layer's `batch_size`
+- concurrent: batched lookups fetched by `sync_workers` threads
+
+Every mode uses a fresh collection name so the feature cache never carries over
+between modes, and its geometry writes are rolled back afterwards.
+"""
+
+import time
+import uuid
+from copy import deepcopy
+from typing import Any, Dict, List, Optional
+
+import frappe
+
+from . import sync_engine
+from .devserver import DevServer, make_features
+from .settings import clear_gis_config_cache
+
+
+MODES = ("single", "batch", "concurrent")
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_WORKERS = 4
+
+
+def _override(values: Dict[str, Any]):
+    """Merge `values` into this process's `gis_integration` site config and reload it."""
+    conf = frappe.local.conf.setdefault("gis_integration", {})
+    for key, value in values.items():
+        if isinstance(value, dict) and isinstance(conf.get(key), dict):
+            for sub, sub_value in value.items():
+                conf[key][sub] = {**(conf[key].get(sub) or {}), **sub_value}
+        else:
+            conf[key] = value
+    clear_gis_config_cache()
+
+
+def run_benchmark(
+    doctype: str,
+    modes: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    latency_ms: float = 20,
+    jitter_ms: float = 0,
+    error_rate: float = 0,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Run the selected sync modes for `doctype` and return one result row per mode."""
+    layer = sync_engine.get_layer(doctype)
+    rows = sync_engine.get_rows(doctype, limit=limit)
+    ids = [layer.feature_id(row) for row in rows]
+    if not ids:
+        frappe.throw(f"No {doctype} documents with a {layer.id_field} to sync")
+
+    server = DevServer(latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate).start()
+    original = deepcopy(frappe.local.conf.get("gis_integration") or {})
+    results = []
+    try:
+        features = make_features(ids, layer.lookup_property, layer.updated_at_property)
+        for mode in modes or MODES:
+            if mode not in MODES:
+                frappe.throw(f"Unknown mode {mode}; use one of {', '.join(MODES)}")
+            collection = f"bench_{uuid.uuid4().hex[:8]}"
+            server.add_collection(collection, features)
+            _override(
+                {
+                    "pg_featureserv_url": server.url,
+                    "circuit_breaker_threshold": 0,
+                    "collections": {doctype: {"collection": collection}},
+                }
+            )
+            size = 1 if mode == "single" else int(batch_size or layer.batch_size() or DEFAULT_BATCH_SIZE)
+            if mode == "batch" and size == 1:
+                size = DEFAULT_BATCH_SIZE
+            pool = int(workers or DEFAULT_WORKERS) if mode == "concurrent" else 1
+
+            server.reset_stats()
+            started = time.perf_counter()
+            outcome = sync_engine.sync_rows(doctype, rows, batch_size=size, workers=pool)
+            seconds = time.perf_counter() - started
+            frappe.db.rollback()
+
+            stats = server.stats()
+            results.append(
+                {
+                    "mode": mode,
+                    "documents": len(rows),
+                    "batch_size": size,
+                    "workers": pool,
+                    "seconds": round(seconds, 3),
+                    "features_per_sec": round(len(rows) / seconds, 1) if seconds else None,
+                    "requests": stats["requests"],
+                    "server_errors": stats["errors"],
+                    "p95_ms": stats["p95_ms"],
+                    "synced": outcome["success"],
+                    "errors": outcome["errors"],
+                }
+            )
+    finally:
+        server.stop()
+        frappe.local.conf["gis_integration"] = original
+        clear_gis_config_cache()
+    return results
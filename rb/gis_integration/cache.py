@@ -0,0 +1,155 @@
+"""Two-tier cache for GIS payloads.
+
+Tier 1 is a per-process LRU bounded by payload bytes and holding already-parsed
+objects, so repeated hits skip both Redis and JSON parsing. Tier 2 is Redis, holding
+zlib-compressed JSON. Local entries live at most `local_cache_ttl` seconds so changes
+made through another worker become visible quickly. Cached objects are shared between
+callers and must be treated as read-only.
+"""
+
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import frappe
+
+from .settings import load_gis_config
+
+
+DEFAULT_LOCAL_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_LOCAL_TTL = 60
+COMPRESS_LEVEL = 6
+# Marker for "looked up, does not exist in GIS" (negative cache entries)
+NOT_FOUND = "__gis_not_found__"
+
+
+class ByteBoundedLRU:
+    """Thread-safe LRU whose capacity is a total byte budget rather than an entry count."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any, size: int, ttl: float):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._data[key] = (value, size, time.monotonic() + ttl)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._data:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def _drop(self, key: str):
+        _value, size, _expires = self._data.pop(key)
+        self.bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_LOCAL: Optional[ByteBoundedLRU] = None
+_LOCAL_LOCK = threading.Lock()
+_STATS = {"local_hits": 0, "redis_hits": 0, "misses": 0, "sets": 0}
+
+
+def _settings() -> Tuple[int, int]:
+    cfg = load_gis_config() or {}
+    return (
+        int(cfg.get("local_cache_max_bytes") or DEFAULT_LOCAL_MAX_BYTES),
+        int(cfg.get("local_cache_ttl") or DEFAULT_LOCAL_TTL),
+    )
+
+
+def _local() -> ByteBoundedLRU:
+    global _LOCAL
+    if _LOCAL is None:
+        with _LOCAL_LOCK:
+            if _LOCAL is None:
+                _LOCAL = ByteBoundedLRU(_settings()[0])
+    return _LOCAL
+
+
+def _local_key(key: str) -> str:
+    # Redis keys are namespaced per site by frappe.cache(); the process-wide LRU is not
+    return f"{getattr(frappe.local, 'site', None)}|{key}"
+
+
+def get_value(key: str) -> Any:
+    """Return the cached object, NOT_FOUND for a cached miss, or None when not cached."""
+    local = _local()
+    value = local.get(_local_key(key))
+    if value is not None:
+        _STATS["local_hits"] += 1
+        return value
+
+    raw = frappe.cache().get_value(key)
+    if raw is None:
+        _STATS["misses"] += 1
+        return None
+
+    if isinstance(raw, bytes):
+        text = zlib.decompress(raw).decode("utf-8")
+    else:
+        # Entries written before compression was introduced are plain JSON strings
+        text = raw
+    value = NOT_FOUND if text == NOT_FOUND else json.loads(text)
+    local.put(_local_key(key), value, len(text), _settings()[1])
+    _STATS["redis_hits"] += 1
+    return value
+
+
+def set_value(key: str, value: Any, ttl: int):
+    """Cache `value` (a JSON-serialisable object or NOT_FOUND) for `ttl` seconds in both tiers."""
+    if ttl <= 0:
+        return
+    text = value if value == NOT_FOUND else json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    data = text.encode("utf-8")
+    frappe.cache().set_value(key, zlib.compress(data, COMPRESS_LEVEL), expires_in_sec=ttl)
+    _local().put(_local_key(key), value, len(data), min(ttl, _settings()[1]))
+    _STATS["sets"] += 1
+
+
+def delete_value(key: str):
+    _local().delete(_local_key(key))
+    frappe.cache().delete_value(key)
+
+
+def stats() -> Dict[str, Any]:
+    """Counters for this worker process (exposed by gis_healthcheck)."""
+    local = _local()
+    lookups = _STATS["local_hits"] + _STATS["redis_hits"] + _STATS["misses"]
+    return {
+        **_STATS,
+        "local_evictions": local.evictions,
+        "local_entries": len(local),
+        "local_bytes": local.bytes,
+        "local_max_bytes": local.max_bytes,
+        "hit_ratio": round((_STATS["local_hits"] + _STATS["redis_hits"]) / lookups, 4) if lookups else None,
+    }
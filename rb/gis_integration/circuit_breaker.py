@@ -0,0 +1,95 @@
+"""Circuit breaker for pg_featureserv, shared by all workers through Redis.
+
+Closed: requests go through; transport errors and 5xx responses are counted.
+Open: after `circuit_breaker_threshold` consecutive failures, requests fail at once
+with GISUnavailableError for `circuit_breaker_cooldown` seconds instead of waiting for
+the HTTP timeout. Half-open: once the cool-down expires a single probe request (across
+all workers) is let through; success closes the circuit, failure opens it again.
+"""
+
+from typing import Any, Dict
+
+import frappe
+from frappe import _
+
+
+DEFAULT_THRESHOLD = 5
+DEFAULT_COOLDOWN = 30
+# Failure counters of a server that is never called again are dropped after this long
+FAILURES_TTL = 3600
+
+
+class GISUnavailableError(frappe.ValidationError):
+    """pg_featureserv cannot be reached, or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        threshold: int = DEFAULT_THRESHOLD,
+        cooldown: int = DEFAULT_COOLDOWN,
+        probe_timeout: int = 30,
+    ):
+        # A threshold of 0 disables the breaker
+        self.threshold = max(int(threshold), 0)
+        self.cooldown = max(int(cooldown), 1)
+        self.probe_timeout = max(int(probe_timeout), 1)
+        cache = frappe.cache()
+        # Raw Redis keys (INCR / SET NX), read with get()/mget() rather than get_value()
+        self._failures_key = cache.make_key(f"gis:breaker:{name}:failures")
+        self._open_key = cache.make_key(f"gis:breaker:{name}:open")
+        self._probe_key = cache.make_key(f"gis:breaker:{name}:probe")
+
+    def before_request(self) -> int:
+        """Raise GISUnavailableError unless a request may be sent now.
+
+        Returns the current failure count, to be passed back to `record_success`.
+        """
+        if not self.threshold:
+            return 0
+        cache = frappe.cache()
+        is_open, failures = cache.mget([self._open_key, self._failures_key])
+        failures = int(failures or 0)
+        if is_open:
+            raise GISUnavailableError(_("GIS server is unavailable; retrying in a few seconds"))
+        if failures >= self.threshold and not cache.set(self._probe_key, 1, ex=self.probe_timeout, nx=True):
+            # Half-open and another request is already probing the server
+            raise GISUnavailableError(_("GIS server is unavailable; retrying in a few seconds"))
+        return failures
+
+    def record_success(self, failures: int = 0):
+        if failures:
+            frappe.cache().delete(self._failures_key, self._probe_key)
+
+    def record_failure(self):
+        if not self.threshold:
+            return
+        cache = frappe.cache()
+        failures = cache.incr(self._failures_key)
+        cache.expire(self._failures_key, FAILURES_TTL)
+        if failures >= self.threshold:
+            cache.set(self._open_key, 1, ex=self.cooldown)
+            cache.delete(self._probe_key)
+            if failures == self.threshold:
+                frappe.logger("gis").warning(f"GIS circuit opened after {failures} consecutive failures")
+
+    def state(self) -> Dict[str, Any]:
+        """Current state for diagnostics (`gis_healthcheck`)."""
+        cache = frappe.cache()
+        failures = int(cache.get(self._failures_key) or 0)
+        retry_in = cache.ttl(self._open_key)
+        if not self.threshold:
+            state = "disabled"
+        elif retry_in and retry_in > 0:
+            state = "open"
+        elif failures >= self.threshold:
+            state = "half_open"
+        else:
+            state = "closed"
+        return {
+            "state": state,
+            "failures": failures,
+            "threshold": self.threshold,
+            "retry_in": retry_in if state == "open" else None,
+        }
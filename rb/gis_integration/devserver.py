@@ -0,0 +1,288 @@
+"""Local pg_featureserv stand-in for development and benchmarks.
+
+Serves generated polygon features from memory with the subset of the pg_featureserv
+API the connector uses:
+
+- GET /collections
+- GET /collections/{collection}/items.json?filter=...&limit=...&offset=...&sortby=a,b
+  where filter is `prop='v'`, `prop IN ('a','b')` or `prop >= 'v'`
+- GET /collections/{collection}/items/{id}.json
+
+Every request can be delayed (`latency_ms` plus up to `jitter_ms`) and fail with a
+503 at `error_rate`, so connector changes can be compared under realistic conditions.
+Standard library only; run it standalone with
+
+    python -m rb.gis_integration.devserver --collection rb_layers.lots --property lotId --features 5000
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+_LITERAL = r"'((?:[^']|'')*)'"
+_EQUALS = re.compile(rf"^\s*(\w+)\s*=\s*{_LITERAL}\s*$")
+_IN = re.compile(r"^\s*(\w+)\s+IN\s*\((.*)\)\s*$", re.I)
+_GTE = re.compile(rf"^\s*(\w+)\s*>=\s*{_LITERAL}\s*$")
+# Keyset paging: a > 'x' OR (a = 'x' AND b > 'y')
+_KEYSET = re.compile(
+    rf"^\s*(\w+)\s*>\s*{_LITERAL}\s+OR\s+\(\s*(\w+)\s*=\s*{_LITERAL}\s+AND\s+(\w+)\s*>\s*{_LITERAL}\s*\)\s*$",
+    re.I,
+)
+
+
+def make_features(
+    ids: List[Any],
+    prop: str,
+    updated_at_property: Optional[str] = None,
+    seed: int = 0,
+    vertices: int = 24,
+) -> List[Dict[str, Any]]:
+    """One small polygon per id (around central Israel), with `prop` set to the id."""
+    rng = random.Random(seed)
+    features = []
+    for i, value in enumerate(ids):
+        lon, lat = 34.75 + rng.random() * 0.3, 31.9 + rng.random() * 0.3
+        radius = 0.0002 + rng.random() * 0.0006
+        ring = []
+        for k in range(vertices):
+            angle = 2 * math.pi * k / vertices
+            r = radius * (0.8 + 0.4 * rng.random())
+            ring.append([round(lon + r * math.cos(angle), 7), round(lat + r * math.sin(angle), 7)])
+        ring.append(ring[0])
+        props = {prop: value}
+        if updated_at_property:
+            props[updated_at_property] = f"2025-01-01T00:00:{i % 60:02d}"
+        geometry = {"type": "Polygon", "coordinates": [ring]}
+        features.append({"type": "Feature", "id": value, "properties": props, "geometry": geometry})
+    return features
+
+
+def _unquote_cql(text: str) -> str:
+    return text.replace("''", "'")
+
+
+def parse_equality(cql: Optional[str]) -> Optional[Tuple[str, List[str]]]:
+    """(property, values) for `prop='v'` and `prop IN (...)` filters, else None."""
+    m = _EQUALS.match(cql or "")
+    if m:
+        return m.group(1), [_unquote_cql(m.group(2))]
+    m = _IN.match(cql or "")
+    if m:
+        return m.group(1), [_unquote_cql(v) for v in re.findall(_LITERAL, m.group(2))]
+    return None
+
+
+def parse_filter(cql: Optional[str]) -> Callable[[Dict[str, Any]], bool]:
+    """Predicate over feature properties for the CQL forms the connector sends."""
+    if not cql:
+        return lambda props: True
+    equality = parse_equality(cql)
+    if equality:
+        prop, values = equality[0], set(equality[1])
+        return lambda props: str(props.get(prop)) in values
+    m = _GTE.match(cql)
+    if m:
+        prop, value = m.group(1), _unquote_cql(m.group(2))
+        return lambda props: props.get(prop) is not None and str(props.get(prop)) >= value
+    m = _KEYSET.match(cql)
+    if m and m.group(1) == m.group(3):
+        prop, value = m.group(1), _unquote_cql(m.group(2))
+        tie, after = m.group(5), _unquote_cql(m.group(6))
+
+        def keyset(props):
+            current = props.get(prop)
+            if current is None:
+                return False
+            return str(current) > value or (str(current) == value and str(props.get(tie)) > after)
+
+        return keyset
+    raise ValueError(f"Unsupported filter: {cql}")
+
+
+class DevServer:
+    """In-memory feature server on a background thread."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        seed: int = 0,
+    ):
+        self.collections: Dict[str, List[Dict[str, Any]]] = {}
+        # {(collection, property): {str(value): [features]}}, built on first use
+        self._indexes: Dict[Tuple[str, str], Dict[str, List[Dict[str, Any]]]] = {}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._durations: List[float] = []
+        self.errors = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_collection(self, name: str, features: List[Dict[str, Any]]):
+        self.collections[name] = features
+        self._indexes = {k: v for k, v in self._indexes.items() if k[0] != name}
+
+    def _index(self, collection: str, prop: str) -> Dict[str, List[Dict[str, Any]]]:
+        key = (collection, prop)
+        index = self._indexes.get(key)
+        if index is None:
+            index = {}
+            for feat in self.collections[collection]:
+                if prop == "__id__":
+                    index.setdefault(str(feat.get("id")), []).append(feat)
+                else:
+                    index.setdefault(str((feat.get("properties") or {}).get(prop)), []).append(feat)
+            self._indexes[key] = index
+        return index
+
+    def start(self) -> "DevServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self._durations = []
+            self.errors = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            durations = sorted(self._durations)
+            errors = self.errors
+        p95 = durations[min(int(len(durations) * 0.95), len(durations) - 1)] if durations else None
+        return {
+            "requests": len(durations),
+            "errors": errors,
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+        }
+
+    def _record(self, seconds: float, error: bool):
+        with self._lock:
+            self._durations.append(seconds)
+            if error:
+                self.errors += 1
+
+    def _delay(self) -> bool:
+        """Sleep the configured latency; True when this request should fail."""
+        with self._lock:
+            jitter = self._rng.random() * self.jitter_ms
+            fail = self._rng.random() < self.error_rate
+        if self.latency_ms or jitter:
+            time.sleep((self.latency_ms + jitter) / 1000.0)
+        return fail
+
+    def handle(self, path: str, query: Dict[str, List[str]]):
+        """(status, payload) for a GET request."""
+        parts = [unquote(p) for p in path.strip("/").split("/")]
+        if parts == ["collections"]:
+            return 200, {"collections": [{"id": name} for name in sorted(self.collections)]}
+        if len(parts) < 3 or parts[0] != "collections" or parts[1] not in self.collections:
+            return 404, {"error": "not found"}
+        features = self.collections[parts[1]]
+
+        if len(parts) == 4 and parts[2] == "items":
+            feature_id = parts[3][: -len(".json")] if parts[3].endswith(".json") else parts[3]
+            found = self._index(parts[1], "__id__").get(feature_id)
+            return (200, found[0]) if found else (404, {"error": "not found"})
+
+        if parts[2] not in ("items", "items.json"):
+            return 404, {"error": "not found"}
+        cql = (query.get("filter") or [None])[0]
+        equality = parse_equality(cql)
+        if equality:
+            index = self._index(parts[1], equality[0])
+            selected = [f for value in dict.fromkeys(equality[1]) for f in index.get(value, [])]
+        else:
+            try:
+                match = parse_filter(cql)
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            selected = [f for f in features if match(f.get("properties") or {})]
+        sortby = (query.get("sortby") or [None])[0]
+        if sortby:
+            keys = [key.strip().lstrip("+-") for key in sortby.split(",") if key.strip()]
+            selected.sort(key=lambda f: [str((f.get("properties") or {}).get(k) or "") for k in keys])
+        limit = int((query.get("limit") or [10])[0])
+        offset = int((query.get("offset") or [0])[0])
+        page = selected[offset : offset + limit]
+        return 200, {"type": "FeatureCollection", "features": page, "numberReturned": len(page)}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                started = time.perf_counter()
+                fail = server._delay()
+                if fail:
+                    status, payload = 503, {"error": "injected failure"}
+                else:
+                    parsed = urlparse(self.path)
+                    status, payload = server.handle(parsed.path, parse_qs(parsed.query))
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/geo+json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                server._record(time.perf_counter() - started, status >= 500)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local pg_featureserv stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--collection", action="append", required=True, help="collection name (repeatable)")
+    parser.add_argument("--property", default="id", help="property holding the generated ids")
+    parser.add_argument("--features", type=int, default=1000)
+    parser.add_argument("--updated-at-property")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    server = DevServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    for collection in args.collection:
+        ids = [str(i) for i in range(1, args.features + 1)]
+        server.add_collection(collection, make_features(ids, args.property, args.updated_at_property))
+    print(f"Serving {', '.join(args.collection)} on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
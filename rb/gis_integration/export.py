@@ -0,0 +1,118 @@
+"""Streaming GeoJSON export of stored geometries.
+
+Rows are read with an unbuffered cursor and written feature by feature into a spooled
+temporary file, which is then streamed as the response body. Peak memory is one row
+plus the spool threshold, whatever the size of the layer. The body is not generated
+straight from the cursor because Frappe closes the database connection before the
+WSGI server iterates the response.
+"""
+
+import json
+from tempfile import SpooledTemporaryFile
+from typing import Any, List, Optional
+
+import frappe
+from frappe import _
+from frappe.utils.response import json_handler
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+from .sync_engine import is_geo_doctype
+
+
+# Exports larger than this go to a temporary file on disk instead of memory
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+def _property_fields(doctype: str, properties: Optional[Any]) -> List[str]:
+    """Requested property columns, limited to real fields of the DocType."""
+    if not properties:
+        return []
+    if isinstance(properties, str):
+        properties = frappe.parse_json(properties) if properties.startswith("[") else properties.split(",")
+    valid = set(frappe.get_meta(doctype).get_valid_columns())
+    fields = []
+    for field in properties:
+        field = str(field).strip()
+        if field and field != "name":
+            if field not in valid:
+                frappe.throw(_("Unknown field {0} for {1}").format(field, doctype))
+            fields.append(field)
+    return list(dict.fromkeys(fields))
+
+
+def write_feature_collection(
+    out, doctype: str, filters: Optional[Any] = None, fields: Optional[List[str]] = None
+) -> int:
+    """Write the FeatureCollection for the readable documents matching `filters` to `out`.
+
+    Returns the number of features written.
+    """
+    fields = fields or []
+    # get_list builds the query with list filters and the user's permission conditions
+    query = frappe.get_list(
+        doctype,
+        filters=frappe.parse_json(filters) if filters else None,
+        fields=["name", *fields],
+        limit_page_length=0,
+        run=0,
+    )
+    sql = f"""SELECT d.*, g.geometry AS `__geometry`
+        FROM ({query}) d
+        INNER JOIN `tabGIS Geometry` g
+            ON g.reference_doctype = {frappe.db.escape(doctype)} AND g.reference_name = d.name
+        ORDER BY d.name"""
+
+    count = 0
+    out.write(b'{"type":"FeatureCollection","features":[')
+    with frappe.db.unbuffered_cursor():
+        for row in frappe.db.sql(sql, as_dict=True, as_iterator=True):
+            geometry = row.pop("__geometry", None)
+            if not geometry:
+                continue
+            props = dict(row)
+            for feat in json.loads(geometry).get("features") or []:
+                feature = {
+                    "type": "Feature",
+                    "id": row["name"],
+                    "properties": props,
+                    "geometry": feat.get("geometry"),
+                }
+                if count:
+                    out.write(b",")
+                out.write(json.dumps(feature, ensure_ascii=False, default=json_handler).encode("utf-8"))
+                count += 1
+    out.write(b"]}")
+    return count
+
+
+@frappe.whitelist()
+def export_geojson(doctype: str, filters: Optional[Any] = None, properties: Optional[Any] = None):
+    """Download every readable geometry of a geo-enabled DocType as one GeoJSON file.
+
+    `filters` are list-view style filters; `properties` is a list (or comma separated
+    string) of fields to include as feature properties next to `name`.
+    """
+    if not is_geo_doctype(doctype):
+        frappe.throw(_("GIS geometry is not stored for {0}").format(doctype))
+    frappe.has_permission(doctype, "export", throw=True)
+    fields = _property_fields(doctype, properties)
+
+    spool = SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        write_feature_collection(spool, doctype, filters, fields)
+        size = spool.tell()
+        spool.seek(0)
+    except Exception:
+        spool.close()
+        raise
+
+    response = Response(
+        wrap_file(frappe.local.request.environ, spool, buffer_size=CHUNK_SIZE),
+        mimetype="application/geo+json",
+        direct_passthrough=True,
+    )
+    response.headers["Content-Length"] = str(size)
+    response.headers["Content-Disposition"] = f'attachment; filename="{frappe.scrub(doctype)}.geojson"'
+    return response
@@ -0,0 +1,120 @@
+"""Deferred, coalesced geometry fetches for document events.
+
+Saving a document of a GIS layer never talks to GIS. When the layer's id field (or a
+fallback field) changed, or the document has no stored geometry yet, (doctype, name)
+is added to a Redis set after commit and one deduplicated flush job is queued. The
+flush pops the set in batches and syncs each DocType's documents with the batch
+engine (`prop IN (...)` lookups). Repeated saves of a document before the flush runs
+collapse into one fetch, and a bulk edit of hundreds of Lots becomes a few batched
+requests instead of one job per document. Failed fetches are queued again, and a cron
+entry flushes anything left behind.
+"""
+
+import json
+from collections import defaultdict
+from functools import partial
+from typing import Dict, List
+
+import frappe
+import redis
+
+from . import geometry_store, sync_engine
+from .circuit_breaker import GISUnavailableError
+from .gis_connector import PGFeatureServConnector
+
+
+FLUSH_JOB_ID = "gis_fetch_flush"
+FLUSH_BATCH = 500
+
+
+def _pending_key() -> str:
+    # Raw Redis set (SADD / SPOP), not a pickled cache value. The key is already
+    # site-prefixed, so it goes through the plain redis.Redis methods: RedisWrapper's
+    # own sadd/spop would prefix it again (and its spop takes no count).
+    return frappe.cache().make_key("gis:fetch_pending")
+
+
+def _push(*members: str):
+    redis.Redis.sadd(frappe.cache(), _pending_key(), *members)
+
+
+def request_fetch(doctype: str, name: str):
+    """Queue a geometry fetch for a document once the current transaction commits."""
+    frappe.db.after_commit.add(partial(_add_pending, doctype, name))
+
+
+def _add_pending(doctype: str, name: str):
+    _push(json.dumps([doctype, name], ensure_ascii=False))
+    frappe.enqueue(
+        "rb.gis_integration.fetch_queue.flush_pending_fetches",
+        queue="short",
+        job_id=FLUSH_JOB_ID,
+        deduplicate=True,
+    )
+
+
+def on_document_update(doc, method=None):
+    """doc_events on_update: queue a fetch when the GIS lookup keys changed or nothing is stored."""
+    if not sync_engine.is_geo_doctype(doc.doctype):
+        return
+    layer = sync_engine.get_layer(doc.doctype)
+    if not layer.feature_id(doc):
+        return
+    keys_changed = any(doc.has_value_changed(f) for f in [layer.id_field, *layer.fallback_properties])
+    if keys_changed or not geometry_store.has_geometry(doc.doctype, doc.name):
+        request_fetch(doc.doctype, doc.name)
+
+
+def _requeue(members: List[str]):
+    if members:
+        _push(*members)
+
+
+def _member(doctype: str, name: str) -> str:
+    return json.dumps([doctype, name], ensure_ascii=False)
+
+
+def flush_pending_fetches():
+    """Background job and cron: fetch every queued document, batched per DocType.
+
+    Documents whose fetch failed go back into the queue once this run ends (so the
+    next run retries them rather than this one spinning on them); when GIS is
+    unavailable the whole drained batch goes back and the run stops.
+    """
+    breaker = PGFeatureServConnector().breaker
+    cache = frappe.cache()
+    retry: List[str] = []
+    try:
+        while True:
+            if breaker.state()["state"] == "open":
+                # Leave the queue for the next run instead of failing every document
+                return
+            members = redis.Redis.spop(cache, _pending_key(), FLUSH_BATCH)
+            if not members:
+                return
+
+            by_doctype: Dict[str, List[str]] = defaultdict(list)
+            for member in members:
+                doctype, name = json.loads(member)
+                by_doctype[doctype].append(name)
+
+            for doctype, names in by_doctype.items():
+                if not sync_engine.is_geo_doctype(doctype):
+                    continue
+                try:
+                    rows = sync_engine.get_rows(doctype, names=names)
+                    result = sync_engine.sync_rows(doctype, rows) if rows else None
+                    frappe.db.commit()
+                except GISUnavailableError:
+                    frappe.db.rollback()
+                    retry.extend(members)
+                    return
+                except Exception:
+                    frappe.db.rollback()
+                    frappe.log_error(frappe.get_traceback(), f"GIS deferred fetch failed for {doctype}")
+                    retry.extend(_member(doctype, n) for n in names)
+                    continue
+                if result and result["failed"]:
+                    retry.extend(_member(doctype, n) for n in result["failed"])
+    finally:
+        _requeue(list(dict.fromkeys(retry)))
@@ -0,0 +1,280 @@
+"""Geometry reduction for GeoJSON stored in Frappe.
+
+Coordinates are in EPSG:4326 degrees, so tolerances are in degrees too
+(1e-5 is roughly 1 m at our latitudes). When shapely is installed, simplification
+uses its topology-preserving algorithm; otherwise a Douglas-Peucker pass runs per
+ring that never collapses a ring below a valid polygon.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from shapely.geometry import mapping as _shapely_mapping
+    from shapely.geometry import shape as _shapely_shape
+except ImportError:  # optional dependency
+    _shapely_shape = None
+    _shapely_mapping = None
+
+
+MAX_SIMPLIFY_STEPS = 8
+
+
+def convert_to_fc(data: Dict[str, Any]) -> Dict[str, Any]:
+    t = data.get("type")
+    if t == "FeatureCollection":
+        return data
+    if t == "Feature":
+        return {"type": "FeatureCollection", "features": [data]}
+    # Geometry only
+    return {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "geometry": data, "properties": {}}],
+    }
+
+
+def geometry_only_fc(fc: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip id and properties from each feature, keep geometry only."""
+    fc = convert_to_fc(fc)
+    simple = {"type": "FeatureCollection", "features": []}
+    for feat in fc.get("features", []):
+        simple["features"].append({
+            "type": "Feature",
+            "properties": {},
+            "geometry": feat.get("geometry"),
+        })
+    return simple
+
+
+def quantize(geometry: Dict[str, Any], precision: int) -> Dict[str, Any]:
+    """Round coordinates to `precision` decimals and drop consecutive duplicate vertices."""
+    def point(p):
+        return [round(c, precision) for c in p]
+
+    def line(points, closed=False):
+        out = []
+        for p in points:
+            q = point(p)
+            if not out or q != out[-1]:
+                out.append(q)
+        if closed and len(out) < 4:
+            # Rounding collapsed the ring; keep it at full precision rather than break it
+            return [list(p) for p in points]
+        return out
+
+    return _map_geometry(geometry, point, line)
+
+
+def simplify(geometry: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """Simplify lines and polygon rings with the given tolerance (degrees)."""
+    if not tolerance or tolerance <= 0:
+        return geometry
+    if _shapely_shape is not None and geometry.get("type") != "GeometryCollection":
+        simplified = _shapely_shape(geometry).simplify(tolerance, preserve_topology=True)
+        if not simplified.is_empty:
+            return json.loads(json.dumps(_shapely_mapping(simplified)))
+        return geometry
+
+    def line(points, closed=False):
+        reduced = douglas_peucker(points, tolerance)
+        if closed and len(reduced) < 4:
+            return points
+        if not closed and len(reduced) < 2:
+            return points
+        return reduced
+
+    return _map_geometry(geometry, lambda p: p, line)
+
+
+def reduce_feature_collection(
+    fc: Dict[str, Any],
+    max_bytes: int,
+    precision: Optional[int] = None,
+    tolerance: Optional[float] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Serialize a FeatureCollection, shrinking it to fit `max_bytes` when needed.
+
+    Coordinates are always quantized when `precision` is set. Simplification only runs
+    while the payload is over budget, starting at `tolerance` and doubling it each step.
+    Returns the JSON string and a small report (bytes before/after, tolerance used, fits).
+    """
+    if precision is not None:
+        fc = _map_features(fc, lambda g: quantize(g, int(precision)))
+    data = _dumps(fc)
+    original = len(data.encode("utf-8"))
+    size, used = original, None
+
+    step_tolerance = float(tolerance or 0)
+    steps = 0
+    while size > max_bytes and step_tolerance > 0 and steps < MAX_SIMPLIFY_STEPS:
+        candidate = _map_features(fc, lambda g: simplify(g, step_tolerance))
+        if precision is not None:
+            candidate = _map_features(candidate, lambda g: quantize(g, int(precision)))
+        data = _dumps(candidate)
+        size, used = len(data.encode("utf-8")), step_tolerance
+        step_tolerance *= 2
+        steps += 1
+
+    return data, {"original_bytes": original, "bytes": size, "tolerance": used, "fits": size <= max_bytes}
+
+
+def bounds(fc: Dict[str, Any]) -> Optional[Tuple[float, float, float, float]]:
+    """(min_lon, min_lat, max_lon, max_lat) over all features, or None when there are no coordinates."""
+    box = [float("inf"), float("inf"), float("-inf"), float("-inf")]
+
+    def point(p):
+        box[0], box[1] = min(box[0], p[0]), min(box[1], p[1])
+        box[2], box[3] = max(box[2], p[0]), max(box[3], p[1])
+        return p
+
+    def line(points, closed=False):
+        for p in points:
+            point(p)
+        return points
+
+    _map_features(fc, lambda g: _map_geometry(g, point, line))
+    if box[0] == float("inf"):
+        return None
+    return box[0], box[1], box[2], box[3]
+
+
+def centroid(fc: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """(lon, lat) centroid over all features.
+
+    Polygons are weighted by area (holes subtract); when there is no polygon area the
+    mean of all vertices is used, so points and lines still get a representative point.
+    """
+    area_sum, cx_sum, cy_sum = 0.0, 0.0, 0.0
+    vertices: List[List[float]] = []
+
+    def ring_moments(ring):
+        a = cx = cy = 0.0
+        for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+            cross = x0 * y1 - x1 * y0
+            a += cross
+            cx += (x0 + x1) * cross
+            cy += (y0 + y1) * cross
+        return a / 2.0, cx, cy
+
+    def collect_point(p):
+        vertices.append(p)
+        return p
+
+    def collect_line(points, closed=False):
+        vertices.extend(points)
+        return points
+
+    def visit(geometry):
+        nonlocal area_sum, cx_sum, cy_sum
+        t = geometry.get("type")
+        if t == "GeometryCollection":
+            for g in geometry.get("geometries") or []:
+                visit(g)
+            return
+        polygons = [geometry.get("coordinates")] if t == "Polygon" else []
+        if t == "MultiPolygon":
+            polygons = geometry.get("coordinates") or []
+        for poly in polygons:
+            for index, ring in enumerate(poly or []):
+                a, cx, cy = ring_moments([p[:2] for p in ring])
+                if a == 0:
+                    continue
+                # Ring orientation is not guaranteed: the shell adds, holes subtract
+                role = 1 if index == 0 else -1
+                orientation = 1 if a > 0 else -1
+                area_sum += role * abs(a)
+                cx_sum += role * orientation * cx / 6.0
+                cy_sum += role * orientation * cy / 6.0
+        _map_geometry(geometry, collect_point, collect_line)
+
+    for feat in fc.get("features") or []:
+        if feat.get("geometry"):
+            visit(feat["geometry"])
+
+    if area_sum:
+        return cx_sum / area_sum, cy_sum / area_sum
+    if vertices:
+        return sum(p[0] for p in vertices) / len(vertices), sum(p[1] for p in vertices) / len(vertices)
+    return None
+
+
+def transform_coordinates(geometry: Dict[str, Any], fn) -> Dict[str, Any]:
+    """Apply `fn(x, y) -> (x, y)` to every position; extra dimensions (Z/M) are dropped."""
+    def point(p):
+        return list(fn(p[0], p[1]))
+
+    def line(points, closed=False):
+        return [point(p) for p in points]
+
+    return _map_geometry(geometry, point, line)
+
+
+def _dumps(fc: Dict[str, Any]) -> str:
+    return json.dumps(fc, ensure_ascii=False)
+
+
+def _map_features(fc: Dict[str, Any], fn) -> Dict[str, Any]:
+    features = []
+    for feat in fc.get("features") or []:
+        geometry = feat.get("geometry")
+        features.append({**feat, "geometry": fn(geometry) if geometry else geometry})
+    return {**fc, "features": features}
+
+
+def _map_geometry(geometry: Dict[str, Any], point_fn, line_fn) -> Dict[str, Any]:
+    t = geometry.get("type")
+    coords = geometry.get("coordinates")
+    if t == "Point":
+        return {**geometry, "coordinates": point_fn(coords)}
+    if t == "MultiPoint":
+        return {**geometry, "coordinates": [point_fn(p) for p in coords]}
+    if t == "LineString":
+        return {**geometry, "coordinates": line_fn(coords)}
+    if t == "MultiLineString":
+        return {**geometry, "coordinates": [line_fn(part) for part in coords]}
+    if t == "Polygon":
+        return {**geometry, "coordinates": [line_fn(ring, closed=True) for ring in coords]}
+    if t == "MultiPolygon":
+        return {
+            **geometry,
+            "coordinates": [[line_fn(ring, closed=True) for ring in poly] for poly in coords],
+        }
+    if t == "GeometryCollection":
+        return {
+            **geometry,
+            "geometries": [_map_geometry(g, point_fn, line_fn) for g in geometry.get("geometries") or []],
+        }
+    return geometry
+
+
+def douglas_peucker(points: List[List[float]], tolerance: float) -> List[List[float]]:
+    """Iterative Douglas-Peucker; keeps both endpoints (so closed rings stay closed)."""
+    n = len(points)
+    if n < 3:
+        return list(points)
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    tol_sq = tolerance * tolerance
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        ax, ay = points[start][0], points[start][1]
+        bx, by = points[end][0], points[end][1]
+        dx, dy = bx - ax, by - ay
+        seg_len_sq = dx * dx + dy * dy
+        max_dist, index = -1.0, -1
+        for i in range(start + 1, end):
+            px, py = points[i][0], points[i][1]
+            if seg_len_sq == 0:
+                dist = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg_len_sq))
+                qx, qy = ax + t * dx, ay + t * dy
+                dist = (px - qx) ** 2 + (py - qy) ** 2
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index != -1 and max_dist > tol_sq:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [p for p, k in zip(points, keep) if k]
@@ -0,0 +1,187 @@
+"""Geometry store: GeoJSON for GIS-backed documents, kept outside their own rows.
+
+DocTypes configured as GIS layers (see `sync_engine`) only keep a virtual `location` field; the
+serialized geometry lives in one `GIS Geometry` row per (doctype, name) together with
+its content hash, bounding box, centroid, byte size and fetch time. Forms load it on demand
+(`api.get_document_geometry`), so `frappe.get_doc`, list queries and version diffs on
+the owning DocTypes never carry the payload. Writes also refresh the owning document's
+`computed_area_sqm` when it has one (see `area`) and tell the nearest-Lot index about
+Lot changes (see `nearest_lots`).
+"""
+
+import hashlib
+import json
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import frappe
+from frappe.utils import now_datetime
+
+from .area import update_area
+from .geometry import bounds, centroid
+
+
+STORE_DOCTYPE = "GIS Geometry"
+BBOX_FIELDS = ["min_lon", "min_lat", "max_lon", "max_lat"]
+
+
+def geometry_hash(data: str) -> str:
+    """Content hash of a serialized geometry, stored next to it to detect unchanged fetches."""
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def _key(doctype: str, name: str) -> Dict[str, str]:
+    return {"reference_doctype": doctype, "reference_name": name}
+
+
+def get_geometry(doctype: str, name: str) -> Optional[str]:
+    """Serialized geometry-only FeatureCollection for a document, or None."""
+    return frappe.db.get_value(STORE_DOCTYPE, _key(doctype, name), "geometry") or None
+
+
+def has_geometry(doctype: str, name: str) -> bool:
+    return bool(frappe.db.exists(STORE_DOCTYPE, _key(doctype, name)))
+
+
+def get_hashes(doctype: str, names: Iterable[str]) -> Dict[str, str]:
+    """Stored geometry hashes for many documents of one DocType, keyed by document name."""
+    names = list(names)
+    if not names:
+        return {}
+    rows = frappe.get_all(
+        STORE_DOCTYPE,
+        filters={"reference_doctype": doctype, "reference_name": ["in", names]},
+        fields=["reference_name", "geometry_hash"],
+    )
+    return {row.reference_name: row.geometry_hash or "" for row in rows}
+
+
+def save_geometry(
+    doctype: str,
+    name: str,
+    data: str,
+    current_hash: Optional[str] = None,
+    invalidate_tiles: bool = True,
+) -> bool:
+    """Store serialized geometry for a document unless it matches what is already stored.
+
+    Pass `current_hash` when it is already known (bulk syncs read them in one query) so
+    unchanged geometries cost no read at all. Bulk writers that drop the whole layer's
+    tiles once at the end pass `invalidate_tiles=False`. Returns True when the store was
+    written.
+    """
+    new_hash = geometry_hash(data)
+    if current_hash == new_hash:
+        return False
+    existing = frappe.db.get_value(
+        STORE_DOCTYPE, _key(doctype, name), ["name", "geometry_hash", *BBOX_FIELDS], as_dict=True
+    )
+    if existing and existing.geometry_hash == new_hash:
+        return False
+
+    fc = json.loads(data)
+    box = bounds(fc) or (None, None, None, None)
+    center = centroid(fc) or (None, None)
+    values = {
+        "geometry": data,
+        "geometry_hash": new_hash,
+        "byte_size": len(data.encode("utf-8")),
+        "fetched_at": now_datetime(),
+        "min_lon": box[0],
+        "min_lat": box[1],
+        "max_lon": box[2],
+        "max_lat": box[3],
+        "centroid_lon": center[0],
+        "centroid_lat": center[1],
+    }
+    if existing:
+        frappe.db.set_value(STORE_DOCTYPE, existing.name, values, update_modified=True)
+    else:
+        store = frappe.new_doc(STORE_DOCTYPE)
+        store.update({**_key(doctype, name), **values})
+        store.insert(ignore_permissions=True)
+    update_area(doctype, name, fc)
+    _mark_index_changed(doctype)
+    if invalidate_tiles:
+        _invalidate_tiles(doctype, _bbox_of(existing), box)
+    return True
+
+
+def get_bbox(doctype: str, name: str) -> Optional[Tuple[float, float, float, float]]:
+    """Stored (min_lon, min_lat, max_lon, max_lat) of a document's geometry, or None."""
+    return _bbox_of(frappe.db.get_value(STORE_DOCTYPE, _key(doctype, name), BBOX_FIELDS, as_dict=True))
+
+
+def _bbox_of(row) -> Optional[Tuple[float, float, float, float]]:
+    if not row or row.get("min_lon") is None:
+        return None
+    return tuple(row.get(f) for f in BBOX_FIELDS)
+
+
+def _invalidate_tiles(doctype: str, *boxes):
+    # After commit, so a tile rebuilt concurrently cannot cache the pre-change geometry
+    from .tiles import invalidate_tiles
+
+    frappe.db.after_commit.add(partial(invalidate_tiles, doctype, *boxes))
+
+
+def _mark_index_changed(doctype: str):
+    from .nearest_lots import mark_changed
+
+    mark_changed(doctype)
+
+
+def delete_geometry(doctype: str, name: str):
+    box = get_bbox(doctype, name)
+    frappe.db.delete(STORE_DOCTYPE, _key(doctype, name))
+    _invalidate_tiles(doctype, box)
+    _mark_index_changed(doctype)
+
+
+def _is_layer(doctype: str) -> bool:
+    from .sync_engine import is_geo_doctype
+
+    return is_geo_doctype(doctype)
+
+
+def discard_client_geometry(doc, method=None):
+    """doc_events validate: drop the copy of `location` a form sends back on save.
+
+    The field is virtual, so it is never written anyway; clearing it keeps the payload
+    out of the version diff.
+    """
+    if doc.get("location") and _is_layer(doc.doctype):
+        doc.location = None
+
+
+def on_trash(doc, method=None):
+    """doc_events on_trash: remove the stored geometry with its document."""
+    if _is_layer(doc.doctype):
+        delete_geometry(doc.doctype, doc.name)
+
+
+def get_in_bbox(
+    doctype: str,
+    west: float,
+    south: float,
+    east: float,
+    north: float,
+    limit: int,
+    with_geometry: bool = True,
+) -> List[Dict[str, Any]]:
+    """Stored rows of one DocType whose bounding box overlaps the given one (indexed query)."""
+    fields = ["reference_name", "centroid_lon", "centroid_lat"]
+    if with_geometry:
+        fields.append("geometry")
+    return frappe.get_all(
+        STORE_DOCTYPE,
+        filters=[
+            ["reference_doctype", "=", doctype],
+            ["min_lon", "<=", east],
+            ["max_lon", ">=", west],
+            ["min_lat", "<=", north],
+            ["max_lat", ">=", south],
+        ],
+        fields=fields,
+        limit_page_length=limit,
+    )
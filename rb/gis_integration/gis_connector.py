@@ -1,11 +1,76 @@
 import logging
+import threading
+import time
+from concurrent.futures import Future
 import frappe
+import redis
 import requests
-from typing import Optional, Dict, Any
+from frappe import _
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List, Tuple
 from urllib.parse import urlencode
+from . import cache as gis_cache
+from . import metrics
+from .cache import NOT_FOUND
+from .circuit_breaker import DEFAULT_COOLDOWN, DEFAULT_THRESHOLD, CircuitBreaker, GISUnavailableError
 from .settings import load_gis_config
 
 
+# One pooled session per worker process, keyed by base URL and pool settings.
+# Sessions keep TCP/TLS connections alive between calls and across background jobs.
+_SESSIONS: Dict[Tuple[Any, ...], requests.Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+DEFAULT_CACHE_TTL = 300
+DEFAULT_NEGATIVE_CACHE_TTL = 60
+
+# pg_featureserv caps page size server-side (LimitMax, 10000 by default)
+MAX_BATCH_LIMIT = 10000
+
+# In-flight requests of this process, keyed by site and request; followers wait on the leader's future
+_INFLIGHT: Dict[str, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+FLIGHT_POLL_INTERVAL = 0.05
+
+
+def get_session(base_url: str, pool_connections: int = 4, pool_maxsize: int = 10, pool_block: bool = False) -> requests.Session:
+    """Return the process-wide keep-alive session for a pg_featureserv base URL.
+
+    pool_connections is the number of per-host pools kept; pool_maxsize caps the
+    connections kept open to a single host (a hard limit when pool_block is set).
+    """
+    key = (base_url, pool_connections, pool_maxsize, pool_block)
+    session = _SESSIONS.get(key)
+    if session is not None:
+        return session
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSIONS[key] = session
+    return session
+
+
+def cql_literal(value: Any) -> str:
+    """Quote a value as a CQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _decode_feature(cached: Any) -> Optional[Dict[str, Any]]:
+    return None if cached == NOT_FOUND else cached
+
+
+def _decode_collection(cached: Any) -> Dict[str, Any]:
+    return {"type": "FeatureCollection", "features": []} if cached == NOT_FOUND else cached
+
+
 class PGFeatureServConnector:
     """Connector to pg_featureserv for fetching GIS features as GeoJSON."""
 
@@ -24,6 +89,26 @@ class PGFeatureServConnector:
             integration_conf.get("pg_featureserv_timeout")
             or conf.get("pg_featureserv_timeout", 30)
         )
+
+        def _setting(key, default):
+            value = integration_conf.get(key)
+            if value is None:
+                value = conf.get(key)
+            if value is None:
+                value = config_file.get(key)
+            return default if value is None else value
+
+        self.pool_connections = max(int(_setting("pg_featureserv_pool_connections", 4)), 1)
+        self.pool_maxsize = max(int(_setting("pg_featureserv_pool_maxsize", 10)), 1)
+        self.pool_block = bool(_setting("pg_featureserv_pool_block", False))
+        self.breaker = CircuitBreaker(
+            self.base_url.split("://", 1)[-1].replace(":", "_"),
+            threshold=int(_setting("circuit_breaker_threshold", DEFAULT_THRESHOLD)),
+            cooldown=int(_setting("circuit_breaker_cooldown", DEFAULT_COOLDOWN)),
+            probe_timeout=self.timeout,
+        )
+        # Seconds a worker waits for another worker's identical request (0 = per process only)
+        self.flight_wait = max(float(_setting("single_flight_wait", 0) or 0), 0)
         self.headers = {"Accept": "application/geo+json", "Content-Type": "application/json"}
         api_key = integration_conf.get("pg_featureserv_api_key") or conf.get("pg_featureserv_api_key")
         if api_key:
@@ -38,11 +123,15 @@ class PGFeatureServConnector:
         except Exception:
             self.log = logging.getLogger("frappe.gis")
 
+    @property
+    def session(self) -> requests.Session:
+        return get_session(self.base_url, self.pool_connections, self.pool_maxsize, self.pool_block)
+
     def check_connectivity(self) -> Dict[str, Any]:
         """Check basic connectivity to pg_featureserv and list collections."""
         url = f"{self.base_url}/collections"
         try:
-            resp = requests.get(url, headers=self.headers, timeout=self.timeout)
+            resp = self.session.get(url, headers=self.headers, timeout=self.timeout)
             return {
                 "ok": resp.status_code == 200,
                 "status": resp.status_code,
@@ -52,46 +141,210 @@ class PGFeatureServConnector:
         except requests.RequestException as e:
             return {"ok": False, "status": None, "url": url, "error": str(e)}
 
+    def _get(self, url: str, collection: str) -> requests.Response:
+        """GET through the circuit breaker, recording metrics for the collection.
+
+        Raises GISUnavailableError when the breaker is open or the server cannot be
+        reached; 5xx responses are returned but count as failures.
+        """
+        try:
+            failures = self.breaker.before_request()
+        except GISUnavailableError:
+            metrics.record_request(collection, "circuit_open", 0)
+            raise
+        started = time.perf_counter()
+        try:
+            resp = self.session.get(url, headers=self.headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            metrics.record_request(collection, "error", time.perf_counter() - started)
+            self.log.error(f"Request error: {e}")
+            self.breaker.record_failure()
+            raise GISUnavailableError(_("Failed to connect to GIS server")) from e
+        metrics.record_request(collection, resp.status_code, time.perf_counter() - started, len(resp.content))
+        if resp.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success(failures)
+        return resp
+
+    def _single_flight(self, key: str, fetch, decode=None):
+        """Run `fetch` once for concurrent identical requests and share its result.
+
+        Within the process, callers with the same key wait on the in-flight call. When
+        `decode` is given, `key` is the request's cache key and, with `single_flight_wait`
+        set, the flight also spans workers (see `_fetch_once_across_workers`). Shared
+        results must be treated as read-only, like cached ones.
+        """
+        flight_key = f"{getattr(frappe.local, 'site', None)}|{key}"
+        with _INFLIGHT_LOCK:
+            future = _INFLIGHT.get(flight_key)
+            leader = future is None
+            if leader:
+                future = _INFLIGHT[flight_key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = self._fetch_once_across_workers(key, fetch, decode) if decode else fetch()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with _INFLIGHT_LOCK:
+                _INFLIGHT.pop(flight_key, None)
+
+    def _fetch_once_across_workers(self, cache_key: str, fetch, decode):
+        """One worker fetches under a short Redis lock; the others poll for its cache entry.
+
+        Waiters give up and fetch themselves after `single_flight_wait` seconds, or as soon
+        as the lock is released without a cache entry (errors are not cached).
+        """
+        if not self.flight_wait:
+            return fetch()
+        cache = frappe.cache()
+        lock_key = cache.make_key(f"{cache_key}:flight")
+        if cache.set(lock_key, 1, nx=True, ex=self.timeout):
+            try:
+                return fetch()
+            finally:
+                cache.delete(lock_key)
+        deadline = time.monotonic() + self.flight_wait
+        while time.monotonic() < deadline:
+            time.sleep(FLIGHT_POLL_INTERVAL)
+            cached = gis_cache.get_value(cache_key)
+            if cached is not None:
+                return decode(cached)
+            # lock_key is already site-prefixed; RedisWrapper.exists would prefix it again
+            if not redis.Redis.exists(cache, lock_key):
+                break
+        return fetch()
+
     def _cache_key(self, *parts: str) -> str:
         return "gis:" + ":".join([p.replace(":", "_") for p in parts])
 
+    def cache_ttls(self, collection: str) -> Tuple[int, int]:
+        """(positive, negative) cache TTL in seconds for a collection.
+
+        Read from the matching `collections` entry (`cache_ttl`, `negative_cache_ttl`),
+        falling back to top-level values and then the module defaults.
+        """
+        cfg = load_gis_config() or {}
+        coll_cfg: Dict[str, Any] = {}
+        for entry in (cfg.get("collections") or {}).values():
+            if isinstance(entry, dict) and entry.get("collection") == collection:
+                coll_cfg = entry
+                break
+        ttl = coll_cfg.get("cache_ttl", cfg.get("cache_ttl", DEFAULT_CACHE_TTL))
+        negative_ttl = coll_cfg.get("negative_cache_ttl", cfg.get("negative_cache_ttl", DEFAULT_NEGATIVE_CACHE_TTL))
+        return int(ttl or 0), int(negative_ttl or 0)
+
     def get_feature_by_id(self, collection: str, feature_id: str) -> Optional[Dict[str, Any]]:
-        """Fetch single Feature by ID with optional cache."""
+        """Fetch single Feature by ID with optional cache (404s are cached briefly too)."""
         cache_key = self._cache_key("f", collection, str(feature_id))
-        cached = frappe.cache().get_value(cache_key)
-        if cached:
-            return frappe.parse_json(cached)
+        cached = gis_cache.get_value(cache_key)
+        metrics.record_cache(collection, cached is not None)
+        if cached is not None:
+            return _decode_feature(cached)
+        return self._single_flight(
+            cache_key, lambda: self._fetch_feature(collection, feature_id, cache_key), _decode_feature
+        )
 
+    def _fetch_feature(self, collection: str, feature_id: str, cache_key: str) -> Optional[Dict[str, Any]]:
+        ttl, negative_ttl = self.cache_ttls(collection)
         url = f"{self.base_url}/collections/{collection}/items/{feature_id}.json"
-        try:
-            resp = requests.get(url, headers=self.headers, timeout=self.timeout)
-            if resp.status_code == 200:
-                data = resp.json()
-                frappe.cache().set_value(cache_key, frappe.as_json(data), expires_in_sec=300)
-                return data
-            if resp.status_code == 404:
-                self.log.warning(f"Feature not found: {collection}/{feature_id}")
-                return None
-            self.log.error(f"Error fetching feature: {resp.status_code} - {resp.text}")
+        resp = self._get(url, collection)
+        if resp.status_code == 200:
+            data = resp.json()
+            gis_cache.set_value(cache_key, data, ttl)
+            return data
+        if resp.status_code == 404:
+            self.log.warning(f"Feature not found: {collection}/{feature_id}")
+            gis_cache.set_value(cache_key, NOT_FOUND, negative_ttl)
             return None
-        except requests.RequestException as e:
-            self.log.error(f"Request error: {e}")
-            frappe.throw("Failed to connect to GIS server")
+        self.log.error(f"Error fetching feature: {resp.status_code} - {resp.text}")
+        return None
 
-    def get_features_by_property(self, collection: str, prop: str, value: Any, limit: int = 100) -> Optional[Dict[str, Any]]:
-        """Fetch Features by property filter (CQL), sanitized and limited."""
-        safe_value = str(value).replace("'", "''")
-        params = {"filter": f"{prop}='{safe_value}'", "limit": min(max(int(limit), 1), 500)}
+    def _get_items(self, collection: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """GET /collections/{collection}/items.json with query params.
+
+        None on an error response; GISUnavailableError when the server cannot be reached.
+        """
         url = f"{self.base_url}/collections/{collection}/items.json?{urlencode(params)}"
-        try:
-            resp = requests.get(url, headers=self.headers, timeout=self.timeout)
-            if resp.status_code == 200:
-                return resp.json()
-            self.log.error(f"Error fetching features: {resp.status_code} - {resp.text}")
-            return None
-        except requests.RequestException as e:
-            self.log.error(f"Request error: {e}")
-            return None
+        return self._single_flight(url, lambda: self._fetch_items(url, collection))
+
+    def _fetch_items(self, url: str, collection: str) -> Optional[Dict[str, Any]]:
+        resp = self._get(url, collection)
+        if resp.status_code == 200:
+            return resp.json()
+        self.log.error(f"Error fetching features: {resp.status_code} - {resp.text[:500]}")
+        return None
+
+    def get_features_by_property(self, collection: str, prop: str, value: Any, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """Fetch Features by property filter (CQL), sanitized, limited and cached.
+
+        Empty results are cached for the shorter negative TTL so repeated lookups of IDs
+        that do not exist in GIS yet stay off the server; request errors are not cached.
+        """
+        limit = min(max(int(limit), 1), 500)
+        cache_key = self._cache_key("p", collection, prop, str(value), str(limit))
+        cached = gis_cache.get_value(cache_key)
+        metrics.record_cache(collection, cached is not None)
+        if cached is not None:
+            return _decode_collection(cached)
+
+        def fetch():
+            fc = self._get_items(collection, {"filter": f"{prop}={cql_literal(value)}", "limit": limit})
+            if fc is not None:
+                ttl, negative_ttl = self.cache_ttls(collection)
+                if fc.get("features"):
+                    gis_cache.set_value(cache_key, fc, ttl)
+                else:
+                    gis_cache.set_value(cache_key, NOT_FOUND, negative_ttl)
+            return fc
+
+        return self._single_flight(cache_key, fetch, _decode_collection)
+
+    def get_features_by_property_values(self, collection: str, prop: str, values: List[Any]) -> Optional[Dict[str, Any]]:
+        """Fetch Features whose property matches any of `values` with a `prop IN (...)` CQL filter.
+
+        A value may match several features (multipart or duplicated IDs), so pages of
+        `len(values)` features are read by offset until a short page (or `numberMatched`)
+        ends the result. None when any page fails, so callers never take a partial result
+        for "not found".
+        """
+        if not values:
+            return {"type": "FeatureCollection", "features": []}
+        quoted = ",".join(cql_literal(v) for v in values)
+        limit = min(len(values), MAX_BATCH_LIMIT)
+        features: List[Dict[str, Any]] = []
+        while True:
+            params = {"filter": f"{prop} IN ({quoted})", "limit": limit, "offset": len(features)}
+            page = self._get_items(collection, params)
+            if page is None:
+                return None
+            batch = page.get("features") or []
+            features.extend(batch)
+            matched = page.get("numberMatched")
+            if len(batch) < limit or (isinstance(matched, int) and len(features) >= matched):
+                return {"type": "FeatureCollection", "features": features}
+
+    def get_features_by_filter(
+        self,
+        collection: str,
+        cql: Optional[str] = None,
+        limit: int = 1000,
+        offset: int = 0,
+        sortby: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch one page of Features matching a raw CQL filter (callers quote values via cql_literal)."""
+        params: Dict[str, Any] = {"limit": min(max(int(limit), 1), MAX_BATCH_LIMIT), "offset": max(int(offset), 0)}
+        if cql:
+            params["filter"] = cql
+        if sortby:
+            params["sortby"] = sortby
+        return self._get_items(collection, params)
 
     @staticmethod
     def validate_geojson(obj: Dict[str, Any]) -> bool:
@@ -0,0 +1,507 @@
+"""Offline geometry import from GeoJSON and GeoPackage files.
+
+Surveyor files are read feature by feature, never whole:
+
+- GeoJSON FeatureCollection (.geojson/.json): the `features` array is decoded one
+  object at a time from a fixed-size read buffer
+- GeoJSONSeq / newline-delimited GeoJSON (.geojsonl/.geojsons/.ndjson/.jsonl): one
+  feature per line
+- GeoPackage (.gpkg): rows are iterated from SQLite and the GeoPackage WKB blobs are
+  decoded here, so no GDAL is needed
+
+Features are matched to documents the way the sync engine matches GIS features: the
+layer's `property_name` (or the feature id for `by_id` layers) against its `id_field`,
+then each `fallback_properties` field for the rest. Every `DEFAULT_BATCH_SIZE`
+features are matched with one query per field and written to the GIS Geometry store
+in one transaction. pg_featureserv is never called. Files in another CRS are
+reprojected to EPSG:4326 when pyproj is installed.
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import struct
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from . import geometry_store, sync_engine, tiles
+from .geometry import bounds, convert_to_fc, transform_coordinates
+
+try:
+    from pyproj import Transformer as _Transformer
+except ImportError:  # optional dependency
+    _Transformer = None
+
+
+DEFAULT_BATCH_SIZE = 500
+READ_CHUNK = 1024 * 1024
+PROGRESS_EVENT = "gis_import_progress"
+GEOJSON_SEQ_EXTENSIONS = (".geojsonl", ".geojsons", ".ndjson", ".jsonl")
+GEOJSON_EXTENSIONS = (".geojson", ".json")
+GEOPACKAGE_EXTENSIONS = (".gpkg",)
+
+_FEATURES_KEY = re.compile(r'"features"\s*:\s*\[')
+_CRS_NAME = re.compile(r'"crs"\s*:\s*\{.*?"name"\s*:\s*"([^"]+)"', re.S)
+_WKB_TYPES = {
+    1: "Point",
+    2: "LineString",
+    3: "Polygon",
+    4: "MultiPoint",
+    5: "MultiLineString",
+    6: "MultiPolygon",
+    7: "GeometryCollection",
+}
+# Bytes of the envelope that follows the GeoPackage header, by envelope indicator
+_GPKG_ENVELOPE_BYTES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+
+# -- readers -----------------------------------------------------------------------
+
+
+def _epsg_of(crs_name: Optional[str]) -> Optional[int]:
+    """EPSG code of a legacy GeoJSON `crs` name such as urn:ogc:def:crs:EPSG::2039."""
+    if not crs_name:
+        return None
+    if crs_name.upper().endswith("CRS84"):
+        return 4326
+    m = re.search(r"EPSG:+(\d+)", crs_name, re.I)
+    return int(m.group(1)) if m else None
+
+
+def iter_geojson(fh, chunk_size: int = READ_CHUNK) -> Tuple[Optional[int], Iterator[Dict[str, Any]]]:
+    """(EPSG code from a legacy `crs` member or None, iterator of features) for a GeoJSON file.
+
+    Only the part of the file before the `features` array is held whole; features are
+    decoded one at a time, so memory is bounded by the largest feature plus one chunk.
+    A file holding a single Feature or geometry is read whole.
+    """
+    buf = ""
+    while True:
+        m = _FEATURES_KEY.search(buf)
+        if m:
+            break
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            whole = json.loads(buf) if buf.strip() else None
+            if not whole:
+                return None, iter([])
+            crs = _epsg_of(((whole.get("crs") or {}).get("properties") or {}).get("name"))
+            return crs, iter(convert_to_fc(whole).get("features") or [])
+        buf += chunk
+
+    name = _CRS_NAME.search(buf[: m.start()])
+    return _epsg_of(name.group(1) if name else None), _iter_array(fh, buf[m.end() :], chunk_size)
+
+
+def _iter_array(fh, buf: str, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    decoder = json.JSONDecoder()
+    pos = 0
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buf):
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                raise ValueError("Unexpected end of file inside the features array")
+            buf, pos = chunk, 0
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            feature, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # The feature continues in the next chunk (an object cannot decode early)
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                raise
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        yield feature
+        pos = end
+        if pos > chunk_size:
+            buf, pos = buf[pos:], 0
+
+
+def iter_geojson_seq(fh) -> Iterator[Dict[str, Any]]:
+    """Features of a GeoJSONSeq (RFC 8142) or newline-delimited GeoJSON file."""
+    for line in fh:
+        line = line.strip().lstrip("\x1e").strip()
+        if line:
+            yield from convert_to_fc(json.loads(line)).get("features") or []
+
+
+def _read_wkb(buf: bytes, offset: int = 0) -> Tuple[Optional[Dict[str, Any]], int]:
+    """Decode one WKB geometry (ISO or EWKB, Z/M dropped); returns (geometry, next offset)."""
+    order = "<" if buf[offset] == 1 else ">"
+    (code,) = struct.unpack_from(f"{order}I", buf, offset + 1)
+    offset += 5
+    dims = 2 + bool(code & 0x80000000) + bool(code & 0x40000000)
+    if code & 0x20000000:
+        offset += 4  # EWKB SRID
+    code &= 0x0FFFFFFF
+    kind = code % 1000
+    dims += {1: 1, 2: 1, 3: 2}.get(code // 1000, 0)
+    name = _WKB_TYPES.get(kind)
+    if not name:
+        raise ValueError(f"Unsupported WKB geometry type {code}")
+
+    def count(at: int) -> Tuple[int, int]:
+        return struct.unpack_from(f"{order}I", buf, at)[0], at + 4
+
+    def positions(n: int, at: int) -> Tuple[List[List[float]], int]:
+        values = struct.unpack_from(f"{order}{n * dims}d", buf, at)
+        return [[values[i], values[i + 1]] for i in range(0, n * dims, dims)], at + 8 * n * dims
+
+    if kind == 1:
+        (point,), offset = positions(1, offset)
+        if math.isnan(point[0]):
+            return None, offset  # empty point
+        return {"type": name, "coordinates": point}, offset
+    if kind == 2:
+        n, offset = count(offset)
+        coords, offset = positions(n, offset)
+        return {"type": name, "coordinates": coords}, offset
+    if kind == 3:
+        n, offset = count(offset)
+        rings = []
+        for _i in range(n):
+            size, offset = count(offset)
+            ring, offset = positions(size, offset)
+            rings.append(ring)
+        return {"type": name, "coordinates": rings}, offset
+
+    n, offset = count(offset)
+    parts = []
+    for _i in range(n):
+        part, offset = _read_wkb(buf, offset)
+        if part:
+            parts.append(part)
+    if kind == 7:
+        return {"type": name, "geometries": parts}, offset
+    return {"type": name, "coordinates": [p["coordinates"] for p in parts]}, offset
+
+
+def parse_gpkg_geometry(blob: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    """GeoJSON geometry of a GeoPackage geometry blob (header, envelope, then WKB)."""
+    if blob is None:
+        return None
+    blob = bytes(blob)
+    if blob[:2] != b"GP":
+        raise ValueError("Not a GeoPackage geometry blob")
+    flags = blob[3]
+    if flags & 0x10:
+        return None  # empty geometry
+    envelope = _GPKG_ENVELOPE_BYTES.get((flags >> 1) & 0x07)
+    if envelope is None:
+        raise ValueError("Invalid GeoPackage envelope indicator")
+    return _read_wkb(blob, 8 + envelope)[0]
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def iter_geopackage(
+    conn: sqlite3.Connection, table: Optional[str] = None
+) -> Tuple[Optional[int], Iterator[Dict[str, Any]]]:
+    """(EPSG code, iterator of features) for one feature table of a GeoPackage."""
+    layers = conn.execute(
+        "SELECT c.table_name, g.column_name, g.srs_id FROM gpkg_contents c "
+        "JOIN gpkg_geometry_columns g ON g.table_name = c.table_name "
+        "WHERE c.data_type = 'features' ORDER BY c.table_name"
+    ).fetchall()
+    if table:
+        layers = [row for row in layers if row[0] == table]
+    if len(layers) != 1:
+        frappe.throw(
+            _("Choose one GeoPackage table: {0}").format(", ".join(row[0] for row in layers))
+            if layers
+            else _("GeoPackage has no feature table {0}").format(table or "")
+        )
+    table, geometry_column, srs_id = layers[0]
+
+    org = conn.execute(
+        "SELECT organization, organization_coordsys_id FROM gpkg_spatial_ref_sys WHERE srs_id = ?",
+        (srs_id,),
+    ).fetchone()
+    if srs_id in (0, -1, None):
+        epsg = None  # undefined; checked against lon/lat bounds instead
+    elif org and str(org[0]).upper() == "EPSG":
+        epsg = int(org[1])
+    else:
+        epsg = int(srs_id)
+
+    pk = next((row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})") if row[5]), None)
+
+    def rows():
+        cursor = conn.execute(f"SELECT * FROM {_quote(table)}")
+        columns = [d[0] for d in cursor.description]
+        for values in cursor:
+            record = dict(zip(columns, values))
+            blob = record.pop(geometry_column)
+            yield {
+                "type": "Feature",
+                "id": record.get(pk) if pk else None,
+                "properties": {k: v for k, v in record.items() if not isinstance(v, bytes)},
+                "geometry": parse_gpkg_geometry(blob),
+            }
+
+    return epsg, rows()
+
+
+# -- import ------------------------------------------------------------------------
+
+
+def _transformer(epsg: Optional[int]) -> Optional[Callable[[float, float], Tuple[float, float]]]:
+    if not epsg or epsg == 4326:
+        return None
+    if _Transformer is None:
+        frappe.throw(
+            _("The file is in EPSG:{0}. Install pyproj or convert it to EPSG:4326 first").format(epsg)
+        )
+    return _Transformer.from_crs(f"EPSG:{epsg}", "EPSG:4326", always_xy=True).transform
+
+
+def _prepare(feature: Dict[str, Any], transform) -> Dict[str, Any]:
+    """The feature in EPSG:4326; raises ValueError for a missing or out-of-range geometry."""
+    geometry = feature.get("geometry")
+    if not isinstance(geometry, dict) or not geometry.get("type"):
+        raise ValueError("no geometry")
+    if transform:
+        geometry = transform_coordinates(geometry, transform)
+    feature = {**feature, "type": "Feature", "geometry": geometry}
+    box = bounds(convert_to_fc(feature))
+    if not box:
+        raise ValueError("empty geometry")
+    if box[0] < -180 or box[2] > 180 or box[1] < -90 or box[3] > 90:
+        raise ValueError("coordinates are not longitude/latitude; pass the file's srid")
+    return feature
+
+
+def _feature_value(feature: Dict[str, Any], prop: Optional[str]) -> Any:
+    """The feature's `prop` property, or its id when `prop` is None."""
+    if prop is None:
+        return feature.get("id")
+    return (feature.get("properties") or {}).get(prop)
+
+
+def _match(
+    layer: sync_engine.Layer, features: List[Dict[str, Any]], prop: Optional[str]
+) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """({document name: feature}, unmatched features) for one batch.
+
+    One query per field: the id field first, then each fallback field for the features
+    still unmatched. A document matched by several features gets the last one.
+    """
+    targets: Dict[str, Dict[str, Any]] = {}
+    pending = features
+    for field, feature_prop in [(layer.id_field, prop), *((fp, fp) for fp in layer.fallback_properties)]:
+        by_value: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for feature in pending:
+            value = _feature_value(feature, feature_prop)
+            if value not in (None, ""):
+                by_value[str(value)].append(feature)
+        if not by_value:
+            continue
+        rows = frappe.get_all(
+            layer.doctype,
+            filters={field: ["in", list(by_value)]},
+            fields=list(dict.fromkeys(["name", field])),
+        )
+        matched = set()
+        for row in rows:
+            for feature in by_value.get(str(row.get(field)), []):
+                if field == layer.id_field or row["name"] not in targets:
+                    targets[row["name"]] = feature
+                matched.add(id(feature))
+        pending = [f for f in pending if id(f) not in matched]
+        if not pending:
+            break
+    return targets, pending
+
+
+def _open(path: str, table: Optional[str]):
+    """(epsg, features, close) for a supported file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in GEOPACKAGE_EXTENSIONS:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            epsg, features = iter_geopackage(conn, table)
+        except Exception:
+            conn.close()
+            raise
+        return epsg, features, conn.close
+    if ext in GEOJSON_SEQ_EXTENSIONS or ext in GEOJSON_EXTENSIONS:
+        fh = open(path, encoding="utf-8-sig")
+        try:
+            if ext in GEOJSON_SEQ_EXTENSIONS:
+                epsg, features = None, iter_geojson_seq(fh)
+            else:
+                epsg, features = iter_geojson(fh)
+        except Exception:
+            fh.close()
+            raise
+        return epsg, features, fh.close
+    frappe.throw(_("Unsupported file type {0}; use GeoJSON, GeoJSONSeq or GeoPackage").format(ext or path))
+
+
+def import_file(
+    doctype: str,
+    path: str,
+    match_property: Optional[str] = None,
+    srid: Optional[int] = None,
+    table: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Import the geometries in a file into a layer's GIS Geometry store.
+
+    `match_property` overrides the feature property matched against the layer's
+    `id_field`; `srid` sets the source CRS of files that do not declare one. Every
+    batch is committed, and `progress` is called with the counters after each one.
+    Tiles of the layer are dropped once at the end rather than per geometry.
+    """
+    layer = sync_engine.get_layer(doctype)
+    prop = match_property or (layer.lookup_property if layer.by_property else None)
+    batch_size = max(cint(batch_size) or DEFAULT_BATCH_SIZE, 1)
+    stats = {
+        "doctype": doctype,
+        "read": 0,
+        "matched": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "unmatched": 0,
+        "errors": 0,
+        "error_details": [],
+        "unmatched_sample": [],
+    }
+    started = time.monotonic()
+
+    def fail(detail: str):
+        stats["errors"] += 1
+        if len(stats["error_details"]) < 10:
+            stats["error_details"].append(detail)
+
+    def flush(batch: List[Dict[str, Any]]):
+        targets, unmatched = _match(layer, batch, prop)
+        stats["unmatched"] += len(unmatched)
+        for feature in unmatched[: 10 - len(stats["unmatched_sample"])]:
+            stats["unmatched_sample"].append(_feature_value(feature, prop))
+        hashes = geometry_store.get_hashes(doctype, list(targets))
+        for name, feature in targets.items():
+            try:
+                changed = sync_engine.store_feature(
+                    layer, name, feature, hashes.get(name), invalidate_tiles=False
+                )
+            except Exception as e:
+                fail(f"Error updating {name}: {e}")
+                continue
+            stats["matched"] += 1
+            stats["updated" if changed else "unchanged"] += 1
+        frappe.db.commit()
+        stats["seconds"] = round(time.monotonic() - started, 1)
+        if progress:
+            progress(stats)
+
+    file_epsg, features, close = _open(path, table)
+    try:
+        transform = _transformer(cint(srid) or file_epsg)
+        batch: List[Dict[str, Any]] = []
+        for feature in features:
+            stats["read"] += 1
+            try:
+                batch.append(_prepare(feature, transform))
+            except ValueError as e:
+                fail(f"Feature {_feature_value(feature, prop)}: {e}")
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        flush(batch)
+    finally:
+        close()
+        if stats["updated"]:
+            tiles.invalidate_layer(doctype)
+
+    stats["seconds"] = round(time.monotonic() - started, 1)
+    return stats
+
+
+# -- background job ------------------------------------------------------------------
+
+
+def _publish(payload: Dict[str, Any], user: Optional[str]):
+    frappe.publish_realtime(PROGRESS_EVENT, payload, user=user)
+
+
+@frappe.whitelist()
+def start_geometry_import(
+    doctype: str,
+    file_url: str,
+    match_property: Optional[str] = None,
+    srid: Optional[int] = None,
+    table: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Import an uploaded GeoJSON/GeoPackage File into a layer in a background job.
+
+    Progress is pushed to the caller over the `gis_import_progress` realtime event.
+    """
+    frappe.only_for("System Manager")
+    sync_engine.get_layer(doctype)
+    file_doc = frappe.get_doc("File", {"file_url": file_url})
+    path = file_doc.get_full_path()
+    if os.path.splitext(path)[1].lower() not in (
+        *GEOJSON_EXTENSIONS,
+        *GEOJSON_SEQ_EXTENSIONS,
+        *GEOPACKAGE_EXTENSIONS,
+    ):
+        frappe.throw(_("Unsupported file type; use GeoJSON, GeoJSONSeq or GeoPackage"))
+
+    job_id = f"gis_import::{doctype}::{file_doc.name}"
+    frappe.enqueue(
+        "rb.gis_integration.importer.run_geometry_import",
+        queue="long",
+        timeout=7200,
+        job_id=job_id,
+        deduplicate=True,
+        enqueue_after_commit=True,
+        doctype=doctype,
+        path=path,
+        match_property=match_property,
+        srid=srid,
+        table=table,
+        user=frappe.session.user,
+    )
+    return {"job_id": job_id}
+
+
+def run_geometry_import(
+    doctype: str,
+    path: str,
+    match_property: Optional[str] = None,
+    srid: Optional[int] = None,
+    table: Optional[str] = None,
+    user: Optional[str] = None,
+):
+    """Background job for `start_geometry_import`."""
+    try:
+        stats = import_file(
+            doctype,
+            path,
+            match_property=match_property,
+            srid=srid,
+            table=table,
+            progress=lambda s: _publish({**s, "status": "running"}, user),
+        )
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), f"GIS geometry import failed for {doctype}")
+        _publish({"doctype": doctype, "status": "failed", "error": str(e)}, user)
+        return
+    _publish({**stats, "status": "completed"}, user)
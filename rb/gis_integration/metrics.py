@@ -0,0 +1,200 @@
+"""Request metrics for pg_featureserv, aggregated across workers in Redis.
+
+Per collection: request counts by status, a fixed-bucket latency histogram (p50/p95/p99
+are estimated from it), bytes received and feature cache hits/misses. Each HTTP
+request is written with one pipelined round trip. Cache lookups are far more frequent
+and mostly served from process memory, so their counters are buffered in the process
+and written with the next request, or after FLUSH_INTERVAL seconds.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import frappe
+import redis
+
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+FLUSH_INTERVAL = 10
+
+_PENDING: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_PENDING_LOCK = threading.Lock()
+_LAST_FLUSH = [time.monotonic()]
+
+
+def _key(collection: str) -> str:
+    # Raw Redis hashes (HINCRBY). The keys are already site-prefixed, so they are read
+    # with the plain redis.Redis methods: RedisWrapper's smembers/hgetall would prefix
+    # them again (and hgetall unpickles the values).
+    return frappe.cache().make_key(f"gis:metrics:{collection}")
+
+
+def _index_key() -> str:
+    return frappe.cache().make_key("gis:metrics:collections")
+
+
+def _bucket(seconds: float) -> str:
+    for bound in BUCKETS:
+        if seconds <= bound:
+            return str(bound)
+    return "+Inf"
+
+
+def record_request(collection: str, status: Any, seconds: float, size: int = 0):
+    """Count one request; `status` is the HTTP status code, "error" or "circuit_open"."""
+    with _PENDING_LOCK:
+        counters = _PENDING[collection]
+        counters["requests"] += 1
+        counters[f"status:{status}"] += 1
+        counters[f"bucket:{_bucket(seconds)}"] += 1
+        counters["latency_us"] += int(seconds * 1_000_000)
+        counters["bytes"] += size
+        if status == "error" or status == "circuit_open" or (isinstance(status, int) and status >= 500):
+            counters["errors"] += 1
+    flush()
+
+
+def record_cache(collection: str, hit: bool):
+    with _PENDING_LOCK:
+        _PENDING[collection]["cache_hits" if hit else "cache_misses"] += 1
+    if time.monotonic() - _LAST_FLUSH[0] >= FLUSH_INTERVAL:
+        flush()
+
+
+def flush():
+    """Write the counters buffered in this process to Redis."""
+    with _PENDING_LOCK:
+        pending = {c: dict(v) for c, v in _PENDING.items() if v}
+        _PENDING.clear()
+        _LAST_FLUSH[0] = time.monotonic()
+    if not pending:
+        return
+    try:
+        pipe = frappe.cache().pipeline()
+        pipe.sadd(_index_key(), *pending)
+        for collection, counters in pending.items():
+            key = _key(collection)
+            for field, value in counters.items():
+                pipe.hincrby(key, field, value)
+        pipe.execute()
+    except Exception:
+        # Metrics must never break a GIS call
+        frappe.logger("gis").warning("Could not write GIS metrics", exc_info=True)
+
+
+def _percentile(buckets: Dict[str, int], total: int, q: float) -> Optional[float]:
+    """Estimate a latency quantile by linear interpolation inside its histogram bucket."""
+    if not total:
+        return None
+    rank = q * total
+    seen, lower = 0, 0.0
+    for bound in BUCKETS:
+        count = buckets.get(str(bound), 0)
+        if count and seen + count >= rank:
+            return round(lower + (bound - lower) * (rank - seen) / count, 4)
+        seen += count
+        lower = bound
+    return BUCKETS[-1]
+
+
+def _collections() -> List[str]:
+    members = redis.Redis.smembers(frappe.cache(), _index_key())
+    return sorted(m.decode() if isinstance(m, bytes) else m for m in members)
+
+
+def _raw(collection: str) -> Dict[str, int]:
+    data = redis.Redis.hgetall(frappe.cache(), _key(collection))
+    return {(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in data.items()}
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Aggregated metrics of all workers, per collection."""
+    flush()
+    out: Dict[str, Any] = {}
+    for collection in _collections():
+        raw = _raw(collection)
+        requests = raw.get("requests", 0)
+        buckets = {k[len("bucket:"):]: v for k, v in raw.items() if k.startswith("bucket:")}
+        hits, misses = raw.get("cache_hits", 0), raw.get("cache_misses", 0)
+        out[collection] = {
+            "requests": requests,
+            "errors": raw.get("errors", 0),
+            "error_rate": round(raw.get("errors", 0) / requests, 4) if requests else None,
+            "status_codes": {k[len("status:"):]: v for k, v in raw.items() if k.startswith("status:")},
+            "bytes_received": raw.get("bytes", 0),
+            "latency": {
+                "avg": round(raw.get("latency_us", 0) / requests / 1_000_000, 4) if requests else None,
+                "p50": _percentile(buckets, requests, 0.5),
+                "p95": _percentile(buckets, requests, 0.95),
+                "p99": _percentile(buckets, requests, 0.99),
+            },
+            "cache": {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            },
+        }
+    return out
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(name: str, value: Any, **labels: str) -> str:
+    text = ",".join(f'{k}="{_label(str(v))}"' for k, v in labels.items())
+    return f"{name}{{{text}}} {value}"
+
+
+def prometheus_text() -> str:
+    """The same metrics in the Prometheus text exposition format (version 0.0.4)."""
+    flush()
+    raws = {collection: _raw(collection) for collection in _collections()}
+    lines = [
+        "# HELP gis_requests_total pg_featureserv requests by collection and status.",
+        "# TYPE gis_requests_total counter",
+    ]
+    for collection, raw in raws.items():
+        for field, value in sorted(raw.items()):
+            if field.startswith("status:"):
+                lines.append(
+                    _sample("gis_requests_total", value, collection=collection, status=field[len("status:"):])
+                )
+
+    lines += [
+        "# HELP gis_request_duration_seconds pg_featureserv request latency.",
+        "# TYPE gis_request_duration_seconds histogram",
+    ]
+    for collection, raw in raws.items():
+        name, cumulative = "gis_request_duration_seconds", 0
+        for bound in [*map(str, BUCKETS), "+Inf"]:
+            cumulative += raw.get(f"bucket:{bound}", 0)
+            lines.append(_sample(f"{name}_bucket", cumulative, collection=collection, le=bound))
+        lines.append(_sample(f"{name}_sum", raw.get("latency_us", 0) / 1_000_000, collection=collection))
+        lines.append(_sample(f"{name}_count", raw.get("requests", 0), collection=collection))
+
+    lines += [
+        "# HELP gis_response_bytes_total Bytes received from pg_featureserv.",
+        "# TYPE gis_response_bytes_total counter",
+    ]
+    for collection, raw in raws.items():
+        lines.append(_sample("gis_response_bytes_total", raw.get("bytes", 0), collection=collection))
+
+    lines += [
+        "# HELP gis_cache_lookups_total Feature cache lookups by result.",
+        "# TYPE gis_cache_lookups_total counter",
+    ]
+    for collection, raw in raws.items():
+        for result, field in (("hit", "cache_hits"), ("miss", "cache_misses")):
+            value = raw.get(field, 0)
+            lines.append(_sample("gis_cache_lookups_total", value, collection=collection, result=result))
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    cache = frappe.cache()
+    keys = [_key(collection) for collection in _collections()]
+    cache.delete(_index_key(), *keys)
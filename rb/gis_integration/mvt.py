@@ -0,0 +1,167 @@
+"""Minimal Mapbox Vector Tile (MVT 2.1) encoder.
+
+Only what the tile endpoint needs: one or more layers of points, lines and polygons
+already projected to integer tile coordinates, with string/number/bool attributes.
+The protobuf wire format is written by hand so no protobuf package is required.
+"""
+
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+POINT, LINESTRING, POLYGON = 1, 2, 3
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+Coords = Sequence[Tuple[int, int]]
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _len_field(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _uint_field(field: int, value: int) -> bytes:
+    return _key(field, 0) + _varint(value)
+
+
+def _packed(field: int, values: List[int]) -> bytes:
+    return _len_field(field, b"".join(_varint(v) for v in values))
+
+
+def _command(cmd: int, count: int) -> int:
+    return (cmd & 0x7) | (count << 3)
+
+
+def ring_area(ring: Coords) -> float:
+    """Shoelace area in tile coordinates (y down): positive for exterior rings per the spec."""
+    area = 0
+    for (x0, y0), (x1, y1) in zip(ring, list(ring[1:]) + [ring[0]]):
+        area += x0 * y1 - x1 * y0
+    return area / 2.0
+
+
+class _Cursor:
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+
+    def params(self, points: Coords) -> List[int]:
+        out = []
+        for x, y in points:
+            out.append(_zigzag(x - self.x))
+            out.append(_zigzag(y - self.y))
+            self.x, self.y = x, y
+        return out
+
+
+def encode_geometry(geom_type: int, parts: List[Coords]) -> List[int]:
+    """Geometry command stream.
+
+    POINT: `parts` is a single list of points. LINESTRING: one list per line.
+    POLYGON: one list per ring (open, i.e. without the closing point), exterior rings
+    wound positively and each followed by its holes wound negatively.
+    """
+    cursor = _Cursor()
+    out: List[int] = []
+    if geom_type == POINT:
+        points = parts[0] if parts else []
+        if points:
+            out.append(_command(_MOVE_TO, len(points)))
+            out.extend(cursor.params(points))
+        return out
+    for part in parts:
+        min_len = 3 if geom_type == POLYGON else 2
+        if len(part) < min_len:
+            continue
+        out.append(_command(_MOVE_TO, 1))
+        out.extend(cursor.params(part[:1]))
+        out.append(_command(_LINE_TO, len(part) - 1))
+        out.extend(cursor.params(part[1:]))
+        if geom_type == POLYGON:
+            out.append(_command(_CLOSE_PATH, 1))
+    return out
+
+
+def _value(value: Any) -> bytes:
+    if isinstance(value, bool):
+        return _uint_field(7, int(value))
+    if isinstance(value, int) and -(2 ** 63) <= value < 2 ** 63:
+        return _uint_field(6, _zigzag(value))
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack("<d", value)
+    return _len_field(1, str(value).encode("utf-8"))
+
+
+def encode_layer(
+    name: str,
+    features: List[Dict[str, Any]],
+    extent: int = 4096,
+) -> bytes:
+    """Encode one layer.
+
+    Each feature is {"type": POINT|LINESTRING|POLYGON, "parts": [...], "properties": {...}}
+    and optionally an unsigned integer "id". Features with empty geometry are skipped.
+    """
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, Any], int] = {}
+    value_list: List[Any] = []
+    body = bytearray()
+
+    for feat in features:
+        geometry = encode_geometry(feat["type"], feat["parts"])
+        if not geometry:
+            continue
+        tags: List[int] = []
+        for k, v in (feat.get("properties") or {}).items():
+            if v is None:
+                continue
+            ki = keys.setdefault(k, len(keys))
+            vkey = (type(v), v)
+            vi = values.get(vkey)
+            if vi is None:
+                vi = values[vkey] = len(value_list)
+                value_list.append(v)
+            tags.extend((ki, vi))
+        encoded = bytearray()
+        fid: Optional[int] = feat.get("id")
+        if isinstance(fid, int) and fid >= 0:
+            encoded += _uint_field(1, fid)
+        if tags:
+            encoded += _packed(2, tags)
+        encoded += _uint_field(3, feat["type"])
+        encoded += _packed(4, geometry)
+        body += _len_field(2, bytes(encoded))
+
+    layer = bytearray()
+    layer += _uint_field(15, 2)
+    layer += _len_field(1, name.encode("utf-8"))
+    layer += body
+    for k in keys:
+        layer += _len_field(3, k.encode("utf-8"))
+    for v in value_list:
+        layer += _len_field(4, _value(v))
+    layer += _uint_field(5, extent)
+    return bytes(layer)
+
+
+def encode_tile(layers: List[bytes]) -> bytes:
+    """Wrap encoded layers into a tile message."""
+    return b"".join(_len_field(3, layer) for layer in layers)
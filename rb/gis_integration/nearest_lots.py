@@ -0,0 +1,386 @@
+"""k-nearest available Lots for Arrangement File planning.
+
+Every worker keeps a KD-tree over the stored Lot centroids, built once per site from
+the GIS Geometry store and projected to local metres (equirectangular around the
+mean latitude). Geometry writes don't rebuild it:
+
+- A Lot geometry write or delete bumps a Redis counter after commit.
+- A query that sees a new counter value reads only the store rows modified since its
+  last look, with a safety margin for long transactions.
+- Moved or new Lots go to a small overlay, and their stale tree entries are skipped.
+- The tree is rebuilt once the overlay outgrows `REBUILD_RATIO` of its size.
+
+Queries walk the tree best-first, so candidates come out nearest first and are checked
+for availability in growing batches:
+
+- the Lot must be chargeable (plus any extra Lot filters);
+- it must not be the `assigned_lot` of an Arrangement File that isn't cancelled;
+- it must still have the stored centroid the index holds.
+
+Lots whose geometry was deleted are dropped from the index during that check.
+"""
+
+import heapq
+import math
+from datetime import timedelta
+from itertools import count
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now_datetime
+
+from .geometry_store import STORE_DOCTYPE
+
+
+INDEX_DOCTYPE = "Lot"
+DEFAULT_K = 10
+MAX_K = 200
+LEAF_SIZE = 16
+FIRST_BATCH = 64
+MAX_BATCH = 4096
+# Overlay size (share of the tree) at which the tree is rebuilt
+REBUILD_RATIO = 0.05
+MIN_REBUILD_OVERLAY = 1000
+# Store rows re-read before the last delta query, for writes committed late
+DELTA_MARGIN = timedelta(minutes=10)
+EARTH_RADIUS = 6371008.8
+
+# Per site: {site: LotIndex}
+_INDEXES: Dict[Optional[str], "LotIndex"] = {}
+
+Point = Tuple[float, float]
+
+
+class KDTree:
+    """Static 2-d tree over points, searched best-first by bounding-box distance."""
+
+    def __init__(self, points: List[Point], leaf_size: int = LEAF_SIZE):
+        self.order = list(range(len(points)))
+        self.points = points
+        # Per node: (min_x, min_y, max_x, max_y, start, end, left, right); leaves have left -1
+        self.nodes: List[Tuple[float, float, float, float, int, int, int, int]] = []
+        if points:
+            self._build(0, len(points), leaf_size)
+
+    def _build(self, start: int, end: int, leaf_size: int) -> int:
+        idx = self.order[start:end]
+        xs = [self.points[i][0] for i in idx]
+        ys = [self.points[i][1] for i in idx]
+        box = (min(xs), min(ys), max(xs), max(ys))
+        node = len(self.nodes)
+        self.nodes.append((*box, start, end, -1, -1))
+        if end - start <= leaf_size:
+            return node
+        axis = 0 if box[2] - box[0] >= box[3] - box[1] else 1
+        idx.sort(key=lambda i: self.points[i][axis])
+        self.order[start:end] = idx
+        mid = (start + end) // 2
+        left = self._build(start, mid, leaf_size)
+        right = self._build(mid, end, leaf_size)
+        self.nodes[node] = (*box, start, end, left, right)
+        return node
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+
+def _box_distance2(node, x: float, y: float) -> float:
+    dx = max(node[0] - x, 0.0, x - node[2])
+    dy = max(node[1] - y, 0.0, y - node[3])
+    return dx * dx + dy * dy
+
+
+class Search:
+    """Points of a tree plus extra points, yielded nearest first as (distance², key).
+
+    Tree points are keyed by their index and extra points (`push`) by their name.
+    """
+
+    def __init__(self, tree: KDTree, x: float, y: float):
+        self.tree, self.x, self.y = tree, x, y
+        self.tick = count()
+        # (distance², tiebreak, is_point, node index / point key)
+        self.heap: List[Tuple[float, int, bool, Any]] = []
+        if tree.nodes:
+            self.heap.append((_box_distance2(tree.nodes[0], x, y), next(self.tick), False, 0))
+
+    def push(self, key: Any, point: Point):
+        d2 = (point[0] - self.x) ** 2 + (point[1] - self.y) ** 2
+        heapq.heappush(self.heap, (d2, next(self.tick), True, key))
+
+    def __iter__(self) -> Iterator[Tuple[float, Any]]:
+        tree, x, y, heap = self.tree, self.x, self.y, self.heap
+        while heap:
+            d2, _tick, is_point, key = heapq.heappop(heap)
+            if is_point:
+                yield d2, key
+                continue
+            node = tree.nodes[key]
+            if node[6] < 0:
+                for i in tree.order[node[4] : node[5]]:
+                    px, py = tree.points[i]
+                    heapq.heappush(heap, ((px - x) ** 2 + (py - y) ** 2, next(self.tick), True, i))
+            else:
+                for child in (node[6], node[7]):
+                    d2 = _box_distance2(tree.nodes[child], x, y)
+                    heapq.heappush(heap, (d2, next(self.tick), False, child))
+
+
+def _version_key() -> str:
+    # Raw Redis counter (INCR), read with get() like the GIS config version
+    return frappe.cache().make_key("gis:lot_index_version")
+
+
+def _version() -> int:
+    try:
+        return int(frappe.cache().get(_version_key()) or 0)
+    except Exception:
+        return 0
+
+
+def _bump_version():
+    frappe.flags.gis_lot_index_dirty = False
+    try:
+        frappe.cache().incr(_version_key())
+    except Exception:
+        pass
+
+
+def mark_changed(doctype: str):
+    """Tell every worker's index that Lot geometries changed (once per transaction, after commit)."""
+    if doctype != INDEX_DOCTYPE or frappe.flags.gis_lot_index_dirty:
+        return
+    frappe.flags.gis_lot_index_dirty = True
+    frappe.db.after_commit.add(_bump_version)
+    frappe.db.after_rollback.add(_clear_dirty)
+
+
+def _clear_dirty():
+    frappe.flags.gis_lot_index_dirty = False
+
+
+class LotIndex:
+    """KD-tree over Lot centroids plus an overlay of Lots changed since it was built."""
+
+    def __init__(self):
+        self.version = _version()
+        self.synced_at = now_datetime()
+        rows = frappe.get_all(
+            STORE_DOCTYPE,
+            filters={"reference_doctype": INDEX_DOCTYPE, "centroid_lon": ["is", "set"]},
+            fields=["reference_name", "centroid_lon", "centroid_lat"],
+        )
+        lats = [row.centroid_lat for row in rows]
+        self.lat0 = math.radians(sum(lats) / len(lats)) if lats else 0.0
+        self.cos_lat0 = math.cos(self.lat0)
+        self.names = [row.reference_name for row in rows]
+        self.lonlat = [(row.centroid_lon, row.centroid_lat) for row in rows]
+        self.tree = KDTree([self.project(*p) for p in self.lonlat])
+        self.position = {name: i for i, name in enumerate(self.names)}
+        # Changed since the build: name -> (lon, lat), or None once the geometry is gone
+        self.overlay: Dict[str, Optional[Point]] = {}
+
+    def project(self, lon: float, lat: float) -> Point:
+        return (
+            EARTH_RADIUS * math.radians(lon) * self.cos_lat0,
+            EARTH_RADIUS * math.radians(lat),
+        )
+
+    def location(self, name: str) -> Optional[Point]:
+        if name in self.overlay:
+            return self.overlay[name]
+        i = self.position.get(name)
+        return self.lonlat[i] if i is not None else None
+
+    def stale(self) -> bool:
+        return len(self.overlay) > max(REBUILD_RATIO * len(self.tree), MIN_REBUILD_OVERLAY)
+
+    def refresh(self):
+        """Pull Lot centroids written since the last look into the overlay."""
+        version = _version()
+        if version == self.version:
+            return
+        started = now_datetime()
+        rows = frappe.get_all(
+            STORE_DOCTYPE,
+            filters={
+                "reference_doctype": INDEX_DOCTYPE,
+                "modified": [">=", self.synced_at - DELTA_MARGIN],
+            },
+            fields=["reference_name", "centroid_lon", "centroid_lat"],
+        )
+        for row in rows:
+            self.update(row.reference_name, row.centroid_lon, row.centroid_lat)
+        self.version, self.synced_at = version, started
+
+    def update(self, name: str, lon: Optional[float], lat: Optional[float]):
+        point = (lon, lat) if lon is not None and lat is not None else None
+        if self.location(name) != point:
+            self.overlay[name] = point
+
+    def search(self, lon: float, lat: float) -> Iterator[Tuple[str, Point]]:
+        """(name, (lon, lat)) of indexed Lots, nearest to (lon, lat) first."""
+        search = Search(self.tree, *self.project(lon, lat))
+        for name, point in self.overlay.items():
+            if point is not None:
+                search.push(name, self.project(*point))
+        for _d2, key in search:
+            if isinstance(key, str):
+                point = self.overlay.get(key)
+                if point is not None:
+                    yield key, point
+                continue
+            name = self.names[key]
+            if name not in self.overlay:
+                yield name, self.lonlat[key]
+
+
+def get_index() -> LotIndex:
+    """The current site's Lot index, brought up to date with committed geometry writes."""
+    site = getattr(frappe.local, "site", None)
+    index = _INDEXES.get(site)
+    if index is None:
+        index = _INDEXES[site] = LotIndex()
+    else:
+        index.refresh()
+        if index.stale():
+            index = _INDEXES[site] = LotIndex()
+    return index
+
+
+def clear_index():
+    """Drop this worker's index for the current site; the next query rebuilds it."""
+    _INDEXES.pop(getattr(frappe.local, "site", None), None)
+
+
+def haversine(a: Point, b: Point) -> float:
+    """Great-circle distance in metres between two (lon, lat) points."""
+    lon1, lat1, lon2, lat2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _available(
+    names: List[str], filters: Dict[str, Any], exclude_file: Optional[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Lots among `names` that are chargeable, match `filters` and are not held."""
+    lots = frappe.get_all(
+        INDEX_DOCTYPE,
+        filters={**filters, "name": ["in", names], "chargeable": 1},
+        fields=["name", "lot_number", "plan", "area_sqm", "plan_status"],
+    )
+    if not lots:
+        return {}
+    held_filters = {"assigned_lot": ["in", [lot.name for lot in lots]], "docstatus": ["!=", 2]}
+    if exclude_file:
+        held_filters["name"] = ["!=", exclude_file]
+    held = set(frappe.get_all("Arrangement File", filters=held_filters, pluck="assigned_lot"))
+    return {lot.name: lot for lot in lots if lot.name not in held}
+
+
+def _stored_centroids(names: List[str]) -> Dict[str, Point]:
+    rows = frappe.get_all(
+        STORE_DOCTYPE,
+        filters={"reference_doctype": INDEX_DOCTYPE, "reference_name": ["in", names]},
+        fields=["reference_name", "centroid_lon", "centroid_lat"],
+    )
+    return {
+        row.reference_name: (row.centroid_lon, row.centroid_lat)
+        for row in rows
+        if row.centroid_lon is not None
+    }
+
+
+def nearest_lots(
+    lon: float,
+    lat: float,
+    k: int = DEFAULT_K,
+    filters: Optional[Dict[str, Any]] = None,
+    exclude_file: Optional[str] = None,
+    max_distance_m: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """The `k` nearest available Lots to (lon, lat), nearest first.
+
+    `filters` are extra Lot filters (e.g. `plan_status`); `exclude_file` is an
+    Arrangement File whose own assigned Lot counts as available.
+    """
+    index = get_index()
+    filters = filters or {}
+    found: List[Dict[str, Any]] = []
+    batch: List[Tuple[str, Point]] = []
+    size = max(FIRST_BATCH, 4 * k)
+
+    def check(batch):
+        names = [name for name, _p in batch]
+        stored = _stored_centroids(names)
+        available = _available(names, filters, exclude_file)
+        for name, point in batch:
+            current = stored.get(name)
+            if current != point:
+                # Written in a transaction the delta query has not seen yet
+                index.update(name, *(current or (None, None)))
+                continue
+            lot = available.get(name)
+            if lot:
+                found.append({"lot": name, "distance_m": round(haversine((lon, lat), point), 1), **lot})
+
+    for name, point in index.search(lon, lat):
+        if max_distance_m and haversine((lon, lat), point) > max_distance_m:
+            break
+        batch.append((name, point))
+        if len(batch) >= size:
+            check(batch)
+            batch, size = [], min(size * 2, MAX_BATCH)
+            if len(found) >= k:
+                break
+    if batch and len(found) < k:
+        check(batch)
+
+    for row in found:
+        row.pop("name", None)
+    found.sort(key=lambda row: row["distance_m"])
+    return found[:k]
+
+
+@frappe.whitelist()
+def find_nearest_lots(
+    doctype: Optional[str] = None,
+    name: Optional[str] = None,
+    lon: Optional[float] = None,
+    lat: Optional[float] = None,
+    k: int = DEFAULT_K,
+    filters: Optional[Any] = None,
+    arrangement_file: Optional[str] = None,
+    max_distance_m: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Nearest unassigned, chargeable Lots to a document's stored centroid or to (lon, lat).
+
+    `doctype`/`name` is typically a Cluster or Fixture Compensation. Pass the
+    Arrangement File being edited as `arrangement_file` so its own Lot is listed too.
+    """
+    frappe.has_permission(INDEX_DOCTYPE, "read", throw=True)
+    if doctype and name:
+        frappe.has_permission(doctype, "read", name, throw=True)
+        point = frappe.db.get_value(
+            STORE_DOCTYPE,
+            {"reference_doctype": doctype, "reference_name": name},
+            ["centroid_lon", "centroid_lat"],
+        )
+        if not point or point[0] is None:
+            frappe.throw(_("{0} {1} has no stored geometry").format(_(doctype), name))
+        lon, lat = point
+    elif lon is None or lat is None:
+        frappe.throw(_("Pass a document (doctype and name) or a lon/lat location"))
+    if isinstance(filters, str):
+        filters = frappe.parse_json(filters)
+    k = min(max(cint(k) or DEFAULT_K, 1), MAX_K)
+    lots = nearest_lots(
+        flt(lon),
+        flt(lat),
+        k=k,
+        filters=filters,
+        exclude_file=arrangement_file or None,
+        max_distance_m=flt(max_distance_m) or None,
+    )
+    return {"lon": flt(lon), "lat": flt(lat), "lots": lots}
@@ -1,13 +1,18 @@
 import json
 import os
 from copy import deepcopy
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import frappe
 
 
-_CACHED: Optional[Dict[str, Any]] = None
-_SOURCE_PATHS: List[str] = []
+# Below this zoom the map APIs (viewport and vector tiles) return centroids instead of
+# full geometries; a layer's `map.geometry_min_zoom` overrides it
+DEFAULT_GEOMETRY_MIN_ZOOM = 14
+
+# Merged config per site: {site: (version, config)}. A reload bumps the site's version
+# in Redis, so every worker rebuilds its copy on the next request that reads it.
+_CACHED: Dict[Optional[str], Tuple[int, Dict[str, Any]]] = {}
 
 
 def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
@@ -20,17 +25,42 @@ def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any
     return out
 
 
+def _version_key() -> str:
+    # Raw Redis counter (INCR), read with get() rather than the pickling get_value()
+    return frappe.cache().make_key("gis:config_version")
+
+
+def _version() -> int:
+    try:
+        return int(frappe.cache().get(_version_key()) or 0)
+    except Exception:
+        # No site or Redis (e.g. during install): cache per process until reload
+        return 0
+
+
 def load_gis_config() -> Dict[str, Any]:
     """Load app config and merge with site-level overrides under gis_integration.
     Site values override app values, but missing keys fall back to app defaults.
+
+    The merged config is memoized per request (`frappe.local`) and cached per site in
+    the process; the Redis version is checked once per request. Treat it as read-only.
     """
-    global _CACHED
-    if _CACHED is not None:
-        return _CACHED
+    cfg = getattr(frappe.local, "gis_config", None)
+    if cfg is not None:
+        return cfg
+
+    site = getattr(frappe.local, "site", None)
+    version = _version()
+    entry = _CACHED.get(site)
+    if entry is None or entry[0] != version:
+        entry = _CACHED[site] = (version, _build_config())
+    frappe.local.gis_config = entry[1]
+    return entry[1]
+
 
+def _build_config() -> Dict[str, Any]:
     app_cfg: Dict[str, Any] = {}
-    global _SOURCE_PATHS
-    _SOURCE_PATHS = []
+    source_paths: List[str] = []
     # enumerate candidate paths robustly
     candidates = []
     try:
@@ -47,7 +77,7 @@ def load_gis_config() -> Dict[str, Any]:
 
     for path in candidates:
         if path and os.path.exists(path):
-            _SOURCE_PATHS.append(path)
+            source_paths.append(path)
             try:
                 with open(path, "r", encoding="utf-8") as f:
                     app_cfg = json.load(f)
@@ -58,10 +88,10 @@ def load_gis_config() -> Dict[str, Any]:
     conf = frappe.get_conf() or {}
     site_override = conf.get("gis_integration") or {}
 
-    _CACHED = _deep_merge(app_cfg, site_override)
+    cfg = _deep_merge(app_cfg, site_override)
     # attach meta for debugging
-    _CACHED.setdefault("_meta", {})["source_paths"] = _SOURCE_PATHS
-    return _CACHED
+    cfg.setdefault("_meta", {})["source_paths"] = source_paths
+    return cfg
 
 
 def get_doctype_config(doctype: str) -> Optional[Dict[str, Any]]:
@@ -71,5 +101,10 @@ def get_doctype_config(doctype: str) -> Optional[Dict[str, Any]]:
 
 
 def clear_gis_config_cache():
-    global _CACHED
-    _CACHED = None
+    """Invalidate the config of the current site in every worker (lazily, on next access)."""
+    _CACHED.pop(getattr(frappe.local, "site", None), None)
+    frappe.local.gis_config = None
+    try:
+        frappe.cache().incr(_version_key())
+    except Exception:
+        pass
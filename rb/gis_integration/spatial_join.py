@@ -0,0 +1,269 @@
+"""Spatial auto-linking: point each document at the polygon that contains its centroid.
+
+A layer with a `spatial_link` entry in config.json (`{"doctype": "Plan", "field":
+"plan"}`) gets that Link field derived from geometry: Lot → Plan, Fixture
+Compensation → Cluster. One pass builds a uniform grid over the target polygons'
+stored bounding boxes. Each source centroid is then looked up in its grid cell and
+tested for point-in-polygon only against the few candidates there. Both sides come
+from the GIS Geometry store, so GIS is never called.
+
+When polygons overlap (an amending plan inside an outline plan), a document already
+linked to one of them keeps its link; otherwise the smallest containing polygon is
+proposed and the change is flagged as ambiguous.
+
+`preview_spatial_links` returns the proposed changes and keeps them in Redis under a
+token for an hour. `apply_spatial_links` saves exactly the reviewed changes in a
+background job and skips documents whose link changed after the preview.
+"""
+
+import json
+import math
+import statistics
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import frappe
+from frappe import _
+
+from .area import iter_polygons
+from .geometry_store import BBOX_FIELDS, STORE_DOCTYPE
+from .settings import get_doctype_config
+
+
+PREVIEW_TTL = 3600
+PREVIEW_ROWS = 500
+APPLY_COMMIT_EVERY = 100
+PROGRESS_EVENT = "gis_spatial_link_progress"
+# Polygons spanning more grid cells than this are tested for every point instead
+MAX_CELLS_PER_POLYGON = 4096
+MIN_CELL_DEGREES = 1e-5
+
+
+def _in_ring(x: float, y: float, ring: List[List[float]]) -> bool:
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def contains(polygons: List[List[List[List[float]]]], x: float, y: float) -> bool:
+    """True when (x, y) lies in any of the polygons (inside the shell, outside its holes)."""
+    for rings in polygons:
+        if rings and _in_ring(x, y, rings[0]) and not any(_in_ring(x, y, hole) for hole in rings[1:]):
+            return True
+    return False
+
+
+class PolygonGrid:
+    """Uniform grid over polygon bounding boxes for point-in-polygon lookups.
+
+    The cell size is the median polygon extent, so a typical polygon covers a few
+    cells and a cell holds a few polygons.
+    """
+
+    def __init__(self, items: List[Tuple[str, List[Any], Tuple[float, float, float, float]]]):
+        self.items = items
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self.large: List[int] = []
+        extents = [max(b[2] - b[0], b[3] - b[1]) for _n, _p, b in items]
+        self.cell = max(statistics.median(extents) if extents else 1.0, MIN_CELL_DEGREES)
+        for index, (_name, _polygons, box) in enumerate(items):
+            x0, y0 = self._cell_of(box[0], box[1])
+            x1, y1 = self._cell_of(box[2], box[3])
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CELLS_PER_POLYGON:
+                self.large.append(index)
+                continue
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self.cells[(cx, cy)].append(index)
+
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    def find(self, x: float, y: float) -> List[str]:
+        """Names of the polygons containing (x, y), smallest bounding box first."""
+        found = []
+        for index in [*self.cells.get(self._cell_of(x, y), ()), *self.large]:
+            name, polygons, box = self.items[index]
+            if box[0] <= x <= box[2] and box[1] <= y <= box[3] and contains(polygons, x, y):
+                found.append((abs((box[2] - box[0]) * (box[3] - box[1])), name))
+        return [name for _size, name in sorted(found)]
+
+
+def get_link_config(doctype: str) -> Dict[str, str]:
+    link = (get_doctype_config(doctype) or {}).get("spatial_link") or {}
+    if not link.get("doctype") or not link.get("field"):
+        frappe.throw(_("No spatial_link is configured for {0}").format(doctype))
+    return link
+
+
+def build_grid(doctype: str) -> PolygonGrid:
+    """Grid over the stored polygons of every document of `doctype`."""
+    rows = frappe.get_all(
+        STORE_DOCTYPE,
+        filters={"reference_doctype": doctype, "min_lon": ["is", "set"]},
+        fields=["reference_name", "geometry", *BBOX_FIELDS],
+    )
+    items = []
+    for row in rows:
+        try:
+            polygons = list(iter_polygons(json.loads(row.geometry or "null")))
+        except ValueError:
+            continue
+        if polygons:
+            items.append((row.reference_name, polygons, tuple(row[f] for f in BBOX_FIELDS)))
+    return PolygonGrid(items)
+
+
+def compute_links(doctype: str, only_unlinked: bool = False) -> Dict[str, Any]:
+    """Proposed Link values for every document of `doctype` with a stored centroid."""
+    link = get_link_config(doctype)
+    field = link["field"]
+    grid = build_grid(link["doctype"])
+    current = {
+        row.name: row.get(field)
+        for row in frappe.get_all(doctype, fields=["name", field])
+        if not (only_unlinked and row.get(field))
+    }
+    points = frappe.get_all(
+        STORE_DOCTYPE,
+        filters={"reference_doctype": doctype, "centroid_lon": ["is", "set"]},
+        fields=["reference_name", "centroid_lon", "centroid_lat"],
+    )
+
+    changes, outside = [], []
+    unchanged, ambiguous, located = 0, 0, 0
+    for point in points:
+        name = point.reference_name
+        if name not in current:
+            continue
+        located += 1
+        linked = current[name]
+        containing = grid.find(point.centroid_lon, point.centroid_lat)
+        if not containing:
+            outside.append({"name": name, "current": linked})
+        elif linked in containing:
+            unchanged += 1
+        else:
+            ambiguous += len(containing) > 1
+            changes.append(
+                {
+                    "name": name,
+                    "current": linked,
+                    "proposed": containing[0],
+                    "candidates": containing if len(containing) > 1 else None,
+                }
+            )
+
+    return {
+        "doctype": doctype,
+        "target": link["doctype"],
+        "field": field,
+        "polygons": len(grid.items),
+        "documents": len(current),
+        "without_geometry": len(current) - located,
+        "unchanged": unchanged,
+        "changes": changes,
+        "ambiguous": ambiguous,
+        "outside": outside,
+    }
+
+
+def _preview_key(token: str) -> str:
+    return f"gis_spatial_link:{token}"
+
+
+@frappe.whitelist()
+def preview_spatial_links(doctype: str, only_unlinked: int = 0) -> Dict[str, Any]:
+    """Run the spatial join and return the proposed changes for review.
+
+    The full diff is kept for an hour under the returned `token`; only the first
+    PREVIEW_ROWS changes and outside documents are returned.
+    """
+    frappe.only_for(["System Manager", "GIS Operator"])
+    result = compute_links(doctype, only_unlinked=bool(int(only_unlinked or 0)))
+    token = uuid.uuid4().hex
+    frappe.cache().set_value(_preview_key(token), result, expires_in_sec=PREVIEW_TTL)
+    return {
+        **{k: v for k, v in result.items() if k not in ("changes", "outside")},
+        "token": token,
+        "change_count": len(result["changes"]),
+        "outside_count": len(result["outside"]),
+        "changes": result["changes"][:PREVIEW_ROWS],
+        "outside": result["outside"][:PREVIEW_ROWS],
+    }
+
+
+@frappe.whitelist()
+def apply_spatial_links(token: str, names: Optional[Any] = None) -> Dict[str, Any]:
+    """Apply a reviewed preview (all changes, or only `names`) in a background job."""
+    frappe.only_for(["System Manager", "GIS Operator"])
+    if not frappe.cache().get_value(_preview_key(token)):
+        frappe.throw(_("This preview has expired; run it again"))
+    if isinstance(names, str):
+        names = frappe.parse_json(names)
+    job_id = f"gis_spatial_link::{token}"
+    frappe.enqueue(
+        "rb.gis_integration.spatial_join.run_apply_spatial_links",
+        queue="long",
+        timeout=3600,
+        job_id=job_id,
+        deduplicate=True,
+        token=token,
+        names=names,
+        user=frappe.session.user,
+    )
+    return {"job_id": job_id}
+
+
+def run_apply_spatial_links(token: str, names: Optional[List[str]] = None, user: Optional[str] = None):
+    """Background job for `apply_spatial_links`.
+
+    Documents are saved normally, so validations, hooks and version history apply.
+    """
+    result = frappe.cache().get_value(_preview_key(token))
+    if not result:
+        return
+    doctype, field = result["doctype"], result["field"]
+    selected = set(names) if names else None
+    changes = [c for c in result["changes"] if selected is None or c["name"] in selected]
+    stats = {
+        "doctype": doctype,
+        "total": len(changes),
+        "applied": 0,
+        "stale": 0,
+        "errors": 0,
+        "error_details": [],
+    }
+
+    def publish(status: str):
+        frappe.publish_realtime(PROGRESS_EVENT, {**stats, "status": status}, user=user)
+
+    for i, change in enumerate(changes, 1):
+        frappe.db.savepoint("spatial_link")
+        try:
+            doc = frappe.get_doc(doctype, change["name"])
+            if doc.get(field) != change["current"]:
+                stats["stale"] += 1
+            else:
+                doc.set(field, change["proposed"])
+                doc.save()
+                stats["applied"] += 1
+        except Exception as e:
+            frappe.db.rollback(save_point="spatial_link")
+            stats["errors"] += 1
+            if len(stats["error_details"]) < 10:
+                stats["error_details"].append(f"{change['name']}: {e}")
+        if i % APPLY_COMMIT_EVERY == 0:
+            frappe.db.commit()
+            publish("running")
+
+    frappe.db.commit()
+    frappe.cache().delete_value(_preview_key(token))
+    publish("completed")
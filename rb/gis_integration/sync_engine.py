@@ -0,0 +1,510 @@
+"""Declarative GIS geometry sync engine.
+
+Every entry under `collections` in config.json (keyed by DocType) that names a
+pg_featureserv `collection` is a layer. One pipeline serves all layers: look the
+feature up, reduce it (`coordinate_precision`, `simplify_tolerance`) and keep it in
+the GIS Geometry store. It runs in four modes:
+
+- single: `fetch_document`, for one document (form button, document hooks)
+- batch: `sync_rows` with `batch_size` > 1 looks features up with one `prop IN (...)`
+  request per batch and falls back to single lookups for the misses
+- concurrent: the same with `sync_workers` > 1 fetch threads
+- incremental: `sync_incremental` pulls only features changed since a watermark
+  (layers with an `updated_at_property`)
+
+Adding a layer needs only a config entry; give the DocType a virtual Geolocation field
+`location` if its form should show the geometry.
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from . import geometry_store
+from .circuit_breaker import GISUnavailableError
+from .geometry import convert_to_fc, geometry_only_fc, reduce_feature_collection
+from .gis_connector import PGFeatureServConnector, cql_literal
+from .settings import get_doctype_config, load_gis_config
+
+
+MAX_GEOJSON_BYTES = int(frappe.conf.get("gis_geojson_max_bytes", 1_000_000))  # default 1MB
+MAX_SYNC_WORKERS = 16
+DEFAULT_INCREMENTAL_PAGE_SIZE = 1000
+
+
+class Layer:
+    """Sync settings of one DocType, resolved from its `collections` entry."""
+
+    def __init__(self, doctype: str, cfg: Dict[str, Any]):
+        self.doctype = doctype
+        self.cfg = cfg
+        self.collection = cfg["collection"]
+        self.id_field = cfg.get("id_field") or "name"
+        self.fetch_mode = cfg.get("fetch_mode")  # "by_id" or "by_property"
+        self.property_name = cfg.get("property_name")
+        self.by_property = self.fetch_mode == "by_property" or bool(self.property_name)
+        self.lookup_property = self.property_name or self.id_field
+        meta = frappe.get_meta(doctype)
+        # Fallbacks are document fields whose value is looked up under the same GIS property
+        self.fallback_properties = [f for f in cfg.get("fallback_properties") or [] if meta.has_field(f)]
+        self.updated_at_property = cfg.get("updated_at_property")
+        self.incremental_page_size = cint(cfg.get("incremental_page_size")) or DEFAULT_INCREMENTAL_PAGE_SIZE
+
+    def feature_id(self, doc: Dict[str, Any]) -> Any:
+        return doc.get("name") if self.id_field == "name" else doc.get(self.id_field)
+
+    def batch_size(self, override: Optional[int] = None) -> int:
+        """Batch size for `prop IN (...)` lookups; 1 (or less) keeps one request per document."""
+        value = override if override not in (None, "") else self.cfg.get("batch_size")
+        try:
+            return max(int(value or 1), 1)
+        except (TypeError, ValueError):
+            return 1
+
+    def workers(self, override: Optional[int] = None) -> int:
+        """Number of concurrent GIS fetches for bulk sync; 1 (the default) keeps it sequential."""
+        value = override if override not in (None, "") else self.cfg.get("sync_workers")
+        try:
+            return min(max(int(value or 1), 1), MAX_SYNC_WORKERS)
+        except (TypeError, ValueError):
+            return 1
+
+
+def layer_doctypes() -> List[str]:
+    """DocTypes configured as GIS layers."""
+    collections = (load_gis_config() or {}).get("collections") or {}
+    return [dt for dt, cfg in collections.items() if isinstance(cfg, dict) and cfg.get("collection")]
+
+
+def is_geo_doctype(doctype: str) -> bool:
+    return bool((get_doctype_config(doctype) or {}).get("collection"))
+
+
+def get_layer(doctype: str) -> Layer:
+    cfg = get_doctype_config(doctype) or {}
+    if not cfg.get("collection"):
+        frappe.throw(_("GIS sync is not configured for {0}").format(doctype))
+    return Layer(doctype, cfg)
+
+
+def serialize_geometry(fc: Dict[str, Any], cfg: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Serialize a geometry-only FC for storage, applying the collection's reduction settings.
+
+    `coordinate_precision` (decimals) is always applied; `simplify_tolerance` (degrees) is
+    used only while the payload exceeds MAX_GEOJSON_BYTES, doubling up to a fixed limit.
+    """
+    precision = cfg.get("coordinate_precision")
+    return reduce_feature_collection(
+        fc,
+        MAX_GEOJSON_BYTES,
+        precision=int(precision) if precision not in (None, "") else None,
+        tolerance=float(cfg.get("simplify_tolerance") or 0),
+    )
+
+
+def store_feature(
+    layer: Layer,
+    name: str,
+    feature: Dict[str, Any],
+    current_hash: Optional[str] = None,
+    invalidate_tiles: bool = True,
+) -> bool:
+    """Persist a GIS feature as a geometry-only FeatureCollection; True when the store changed."""
+    data, _report = serialize_geometry(geometry_only_fc(convert_to_fc(feature)), layer.cfg)
+    return geometry_store.save_geometry(layer.doctype, name, data, current_hash, invalidate_tiles)
+
+
+def _lookup_feature(conn: PGFeatureServConnector, layer: Layer, feature_id: Any) -> Optional[Dict[str, Any]]:
+    """Single-document lookup following the configured fetch mode."""
+    if not feature_id:
+        return None
+    if layer.by_property:
+        fc = conn.get_features_by_property(layer.collection, layer.lookup_property, feature_id, limit=1)
+        if fc and fc.get("features"):
+            return fc["features"][0]
+        return None
+    return conn.get_feature_by_id(layer.collection, feature_id)
+
+
+def _lookup_by_fallbacks(
+    conn: PGFeatureServConnector, layer: Layer, doc: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    for fp in layer.fallback_properties:
+        val = doc.get(fp)
+        if not val:
+            continue
+        fc = conn.get_features_by_property(layer.collection, fp, val, limit=1)
+        if fc and fc.get("features"):
+            return fc["features"][0]
+    return None
+
+
+def find_feature(
+    conn: PGFeatureServConnector,
+    layer: Layer,
+    doc: Dict[str, Any],
+    prefetched: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Feature for a document: prefetched batch result, then single lookup, then fallbacks."""
+    feature_id = layer.feature_id(doc)
+    feature = (prefetched or {}).get(str(feature_id)) if feature_id else None
+    if not feature:
+        feature = _lookup_feature(conn, layer, feature_id)
+    if not feature and layer.fallback_properties:
+        feature = _lookup_by_fallbacks(conn, layer, doc)
+    return feature
+
+
+def fetch_document(doctype: str, name: str) -> Optional[str]:
+    """Single mode: fetch, reduce and store the geometry of one document.
+
+    Reports problems to the user with msgprint and returns the stored data, or None.
+    While GIS is unavailable the last stored geometry is returned without waiting.
+    """
+    layer = get_layer(doctype)
+    doc = frappe.get_doc(doctype, name)
+
+    feature_id = layer.feature_id(doc)
+    if not feature_id:
+        frappe.msgprint(_("No {0} found on this {1}").format(layer.id_field, _(doctype)))
+        return None
+
+    conn = PGFeatureServConnector()
+    try:
+        feature = find_feature(conn, layer, doc)
+    except GISUnavailableError:
+        # Keep saves fast during a GIS outage: fall back to the last stored geometry
+        data = geometry_store.get_geometry(doctype, doc.name)
+        msg = (
+            _("GIS server is unavailable; showing the last known geometry")
+            if data
+            else _("GIS server is unavailable; geometry was not fetched")
+        )
+        frappe.msgprint(msg, indicator="orange")
+        return data
+    if not feature:
+        fallbacks = layer.fallback_properties
+        msg = _("No geometry found in GIS for {0} using {1}{2}").format(
+            feature_id,
+            f"id_field={layer.id_field}",
+            f", fallbacks={','.join(fallbacks)}" if fallbacks else "",
+        )
+        frappe.msgprint(msg, indicator="orange")
+        return None
+
+    geojson_full = convert_to_fc(feature)
+    if not conn.validate_geojson(geojson_full):
+        frappe.throw(_("Invalid GeoJSON data received from GIS"))
+
+    # Strip id/properties, quantize and reduce to the byte budget
+    data, report = serialize_geometry(geometry_only_fc(geojson_full), layer.cfg)
+    if not report["fits"]:
+        frappe.msgprint(
+            _("Geometry too large; consider simplifying or reducing precision"),
+            indicator="orange",
+        )
+
+    try:
+        geometry_store.save_geometry(doctype, doc.name, data)
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), f"GIS geometry store failed for {doctype} {doc.name}")
+
+    return data
+
+
+@contextmanager
+def _site_context(site: str, sites_path: str):
+    """Frappe site context for a worker thread: init/connect on entry, destroy on exit."""
+    frappe.init(site=site, sites_path=sites_path)
+    try:
+        frappe.connect()
+        yield
+    finally:
+        frappe.destroy()
+
+
+def _map_ordered(fn, items: List[Any], workers: int = 1) -> List[Tuple[Any, Optional[Exception]]]:
+    """Apply `fn` to each item and return `(result, error)` pairs in input order.
+
+    With workers > 1 the calls run on a bounded set of threads. Each thread sets up
+    its own site context (init + connect) once and destroys it when the work is done,
+    so no thread-local site state or database connection outlives the call. `fn`
+    should still only do HTTP/cache work; the caller keeps all database writes on its
+    own connection.
+    """
+    def safe(item):
+        try:
+            return fn(item), None
+        except Exception as e:
+            return None, e
+
+    if workers <= 1 or len(items) <= 1:
+        return [safe(item) for item in items]
+
+    results: List[Tuple[Any, Optional[Exception]]] = [(None, None)] * len(items)
+    pending = iter(enumerate(items))
+    lock = threading.Lock()
+    site, sites_path = frappe.local.site, frappe.local.sites_path
+
+    def work():
+        with _site_context(site, sites_path):
+            while True:
+                with lock:
+                    nxt = next(pending, None)
+                if nxt is None:
+                    return
+                results[nxt[0]] = safe(nxt[1])
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        for future in [pool.submit(work) for _ in range(min(workers, len(items)))]:
+            future.result()
+    return results
+
+
+def _prefetch_features(
+    conn: PGFeatureServConnector,
+    layer: Layer,
+    values: List[Any],
+    batch_size: int,
+    workers: int = 1,
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch features for many property values in batches and index them by that value.
+
+    Values that are not returned are simply absent from the result; callers fall back
+    to single lookups for those.
+    """
+    prop = layer.lookup_property
+    unique = list(dict.fromkeys(str(v) for v in values if v not in (None, "")))
+    chunks = [unique[start : start + batch_size] for start in range(0, len(unique), batch_size)]
+    found: Dict[str, Dict[str, Any]] = {}
+    results = _map_ordered(
+        lambda chunk: conn.get_features_by_property_values(layer.collection, prop, chunk), chunks, workers
+    )
+    for fc, error in results:
+        if error:
+            conn.log.error(f"Batch lookup failed for {layer.collection}: {error}")
+            continue
+        for feat in (fc or {}).get("features") or []:
+            key = (feat.get("properties") or {}).get(prop)
+            if key is not None:
+                found.setdefault(str(key), feat)
+    return found
+
+
+def _row_filters(layer: Layer) -> List[List[Any]]:
+    # Only documents with an id to look up
+    return [[layer.id_field, "!=", ""]] if layer.id_field != "name" else []
+
+
+def count_rows(doctype: str) -> int:
+    """Number of documents `get_rows` returns for a full sync."""
+    return frappe.db.count(doctype, filters=_row_filters(get_layer(doctype)))
+
+
+def get_rows(
+    doctype: str,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    names: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Documents to sync, with the id field and any fallback fields preloaded.
+
+    `after`/`limit` page through the documents by name for chunked background syncs;
+    `names` restricts the rows to the given documents.
+    """
+    layer = get_layer(doctype)
+    fields = ["name", layer.id_field, *layer.fallback_properties]
+    filters = _row_filters(layer)
+    if after:
+        filters.append(["name", ">", after])
+    if names is not None:
+        filters.append(["name", "in", names])
+    return frappe.get_all(
+        doctype,
+        filters=filters,
+        fields=list(dict.fromkeys(fields)),
+        order_by="name asc",
+        limit_page_length=limit or 0,
+    )
+
+
+def sync_rows(
+    doctype: str,
+    rows: List[Dict[str, Any]],
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Batch/concurrent mode: sync the given rows (from `get_rows`).
+
+    Features are fetched (concurrently when configured), then written sequentially in
+    document order on the caller's connection. `failed` lists the documents whose
+    fetch or write raised (worth retrying), unlike those GIS has no feature for.
+    """
+    layer = get_layer(doctype)
+    size = layer.batch_size(batch_size)
+    pool_size = layer.workers(workers)
+    conn = PGFeatureServConnector()
+    ok, unchanged, errs, details, failed = 0, 0, 0, [], []
+
+    prefetched: Dict[str, Dict[str, Any]] = {}
+    if layer.by_property and size > 1:
+        prefetched = _prefetch_features(conn, layer, [layer.feature_id(row) for row in rows], size, pool_size)
+
+    resolved = _map_ordered(lambda row: find_feature(conn, layer, row, prefetched), rows, pool_size)
+    hashes = geometry_store.get_hashes(doctype, [row["name"] for row in rows])
+    for row, (feature, error) in zip(rows, resolved):
+        if error:
+            errs += 1
+            failed.append(row["name"])
+            details.append(f"Error updating {row['name']}: {error}")
+            continue
+        try:
+            if feature:
+                if not store_feature(layer, row["name"], feature, hashes.get(row["name"])):
+                    unchanged += 1
+                ok += 1
+            else:
+                errs += 1
+                details.append(f"No geometry for {doctype} {row['name']}")
+        except Exception as e:
+            errs += 1
+            failed.append(row["name"])
+            details.append(f"Error updating {row['name']}: {e}")
+
+    return {
+        "success": ok,
+        "unchanged": unchanged,
+        "errors": errs,
+        "error_details": details[:10],
+        "failed": failed,
+    }
+
+
+def _watermark_key(doctype: str) -> str:
+    return f"gis_sync_watermark:{doctype}"
+
+
+def get_watermark(doctype: str) -> Optional[Dict[str, Any]]:
+    """Last synced `{"updated_at", "id"}` position of an incremental sync, or None.
+
+    Watermarks stored before keyset paging were a bare timestamp; they resume with no id.
+    """
+    raw = frappe.db.get_global(_watermark_key(doctype))
+    if not raw:
+        return None
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = None
+    if isinstance(value, dict) and value.get("updated_at") is not None:
+        return value
+    return {"updated_at": raw, "id": None}
+
+
+def _keyset_filter(updated_prop: str, id_prop: str, watermark: Optional[Dict[str, Any]]) -> Optional[str]:
+    """CQL for features after `watermark` in (updated_at, id) order."""
+    if not watermark:
+        return None
+    updated = cql_literal(watermark["updated_at"])
+    if watermark.get("id") is None:
+        return f"{updated_prop} >= {updated}"
+    after_id = cql_literal(watermark["id"])
+    return f"{updated_prop} > {updated} OR ({updated_prop} = {updated} AND {id_prop} > {after_id})"
+
+
+def sync_incremental(doctype: str) -> Dict[str, Any]:
+    """Incremental mode: sync only features changed in GIS since the stored watermark.
+
+    Pages are requested sorted by (`updated_at_property`, lookup property) and each
+    page starts after the last (updated_at, id) pair of the previous one (keyset
+    paging), so features updated while the run reads the pages cannot shift rows past
+    it. That pair is the watermark, committed after every page, so an interrupted run
+    continues where it stopped. Without a watermark the first run walks the whole
+    collection.
+    """
+    layer = get_layer(doctype)
+    updated_prop = layer.updated_at_property
+    if not updated_prop:
+        frappe.throw(_("Incremental GIS sync is not configured for {0}").format(doctype))
+
+    id_prop = layer.lookup_property
+    page_size = layer.incremental_page_size
+    watermark = get_watermark(doctype)
+    conn = PGFeatureServConnector()
+    fetched, updated, unchanged, errors = 0, 0, 0, 0
+
+    while True:
+        fc = conn.get_features_by_filter(
+            layer.collection,
+            _keyset_filter(updated_prop, id_prop, watermark),
+            limit=page_size,
+            sortby=f"{updated_prop},{id_prop}",
+        )
+        if fc is None:
+            frappe.throw(_("GIS request failed during incremental sync of {0}").format(doctype))
+        features = fc.get("features") or []
+        if not features:
+            break
+
+        by_value: Dict[str, Dict[str, Any]] = {}
+        for feat in features:
+            props = feat.get("properties") or {}
+            key = props.get(layer.lookup_property)
+            if key is not None:
+                by_value[str(key)] = feat
+        # The page is sorted, so its last keyed feature is the new resume position
+        last = next(
+            (
+                props
+                for props in ((f.get("properties") or {}) for f in reversed(features))
+                if props.get(updated_prop) is not None and props.get(id_prop) is not None
+            ),
+            None,
+        )
+
+        if by_value:
+            rows = frappe.get_all(
+                doctype,
+                filters={layer.id_field: ["in", list(by_value)]},
+                fields=list(dict.fromkeys(["name", layer.id_field])),
+            )
+            hashes = geometry_store.get_hashes(doctype, [row["name"] for row in rows])
+            for row in rows:
+                try:
+                    changed = store_feature(
+                        layer, row["name"], by_value[str(layer.feature_id(row))], hashes.get(row["name"])
+                    )
+                except Exception as e:
+                    errors += 1
+                    frappe.log_error(
+                        f"{row['name']}: {e}", f"GIS incremental sync write failed for {doctype}"
+                    )
+                    continue
+                if changed:
+                    updated += 1
+                else:
+                    unchanged += 1
+
+        fetched += len(features)
+        if last:
+            watermark = {"updated_at": last[updated_prop], "id": last[id_prop]}
+            frappe.db.set_global(_watermark_key(doctype), json.dumps(watermark, default=str))
+        frappe.db.commit()
+
+        if len(features) < page_size or not last:
+            break
+
+    return {
+        "doctype": doctype,
+        "fetched": fetched,
+        "updated": updated,
+        "unchanged": unchanged,
+        "errors": errors,
+        "watermark": watermark,
+    }
@@ -0,0 +1,196 @@
+"""Background jobs for the bulk GIS geometry syncs.
+
+Full sync: walks the DocType by name in chunks. Every chunk runs as its own background
+job, commits its own writes and then stores a checkpoint (last processed name and
+counters), so a timeout or worker restart only loses the chunk in flight. Progress is
+pushed to the user who started the sync over the `gis_sync_progress` realtime event.
+
+Incremental sync: for collections with an `updated_at_property`, asks GIS only for
+features changed since a stored per-DocType watermark and runs from the scheduler.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, cint, get_datetime, now_datetime
+from frappe.utils.background_jobs import is_job_enqueued
+
+from . import sync_engine
+from .settings import get_doctype_config
+
+
+DEFAULT_CHUNK_SIZE = 500
+PROGRESS_EVENT = "gis_sync_progress"
+# A running sync whose checkpoint has not moved for this long is considered dead
+STALL_AFTER_MINUTES = 15
+
+
+def _checkpoint_key(doctype: str) -> str:
+    return f"gis_sync_checkpoint:{doctype}"
+
+
+def get_checkpoint(doctype: str) -> Optional[Dict[str, Any]]:
+    raw = frappe.db.get_global(_checkpoint_key(doctype))
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def _save_checkpoint(cp: Dict[str, Any]):
+    cp["updated_at"] = str(now_datetime())
+    frappe.db.set_global(_checkpoint_key(cp["doctype"]), json.dumps(cp, ensure_ascii=False))
+
+
+def _publish(cp: Dict[str, Any]):
+    keys = ("doctype", "status", "processed", "total", "success", "unchanged", "errors", "error_details", "error")
+    payload = {k: cp.get(k) for k in keys}
+    frappe.publish_realtime(PROGRESS_EVENT, payload, user=cp.get("user"), after_commit=True)
+
+
+def _job_id(doctype: str, chunk: int) -> str:
+    return f"gis_sync::{doctype}::{chunk}"
+
+
+def _enqueue_chunk(cp: Dict[str, Any]):
+    cp["job_id"] = _job_id(cp["doctype"], cint(cp.get("chunks")))
+    frappe.enqueue(
+        "rb.gis_integration.sync_jobs.run_geometry_sync_chunk",
+        queue="long",
+        timeout=1800,
+        job_id=cp["job_id"],
+        deduplicate=True,
+        enqueue_after_commit=True,
+        doctype=cp["doctype"],
+    )
+
+
+def _validate_doctype(doctype: str):
+    if not sync_engine.is_geo_doctype(doctype):
+        frappe.throw(_("GIS sync is not configured for {0}").format(doctype))
+
+
+@frappe.whitelist()
+def start_geometry_sync(doctype: str, restart: int = 0, chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """Start (or resume) the chunked background sync for a DocType.
+
+    An unfinished sync resumes from its checkpoint unless `restart` is set.
+    """
+    frappe.only_for("System Manager")
+    _validate_doctype(doctype)
+
+    cp = get_checkpoint(doctype)
+    if cp and cp.get("status") == "running" and is_job_enqueued(cp.get("job_id")):
+        return cp
+
+    if restart or not cp or cp.get("status") == "completed":
+        cp = {
+            "doctype": doctype,
+            "last_name": None,
+            "processed": 0,
+            "success": 0,
+            "unchanged": 0,
+            "errors": 0,
+            "error_details": [],
+            "chunks": 0,
+            "started_at": str(now_datetime()),
+        }
+    cp.update(
+        {
+            "status": "running",
+            "error": None,
+            "user": frappe.session.user,
+            "chunk_size": cint(chunk_size) or cint(cp.get("chunk_size")) or DEFAULT_CHUNK_SIZE,
+            "total": sync_engine.count_rows(doctype),
+        }
+    )
+    _enqueue_chunk(cp)
+    _save_checkpoint(cp)
+    _publish(cp)
+    return cp
+
+
+@frappe.whitelist()
+def get_geometry_sync_status(doctype: str) -> Optional[Dict[str, Any]]:
+    frappe.only_for("System Manager")
+    return get_checkpoint(doctype)
+
+
+def run_geometry_sync_chunk(doctype: str):
+    """Background job: sync one chunk after the checkpoint, commit, then queue the next one."""
+    cp = get_checkpoint(doctype)
+    if not cp or cp.get("status") != "running":
+        return
+
+    chunk_size = cint(cp.get("chunk_size")) or DEFAULT_CHUNK_SIZE
+    try:
+        rows = sync_engine.get_rows(doctype, after=cp.get("last_name"), limit=chunk_size)
+        result = (
+            sync_engine.sync_rows(doctype, rows)
+            if rows
+            else {"success": 0, "unchanged": 0, "errors": 0, "error_details": []}
+        )
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), f"GIS sync chunk failed for {doctype}")
+        cp.update({"status": "failed", "error": str(e)})
+        _save_checkpoint(cp)
+        frappe.db.commit()
+        _publish(cp)
+        return
+
+    cp["processed"] = cint(cp.get("processed")) + len(rows)
+    cp["success"] = cint(cp.get("success")) + result["success"]
+    cp["unchanged"] = cint(cp.get("unchanged")) + result["unchanged"]
+    cp["errors"] = cint(cp.get("errors")) + result["errors"]
+    cp["error_details"] = ((cp.get("error_details") or []) + result["error_details"])[:10]
+    cp["chunks"] = cint(cp.get("chunks")) + 1
+    if rows:
+        cp["last_name"] = rows[-1]["name"]
+
+    if len(rows) < chunk_size:
+        cp["status"] = "completed"
+        cp["finished_at"] = str(now_datetime())
+    else:
+        _enqueue_chunk(cp)
+
+    _save_checkpoint(cp)
+    frappe.db.commit()
+    _publish(cp)
+
+
+def resume_stalled_geometry_syncs():
+    """Scheduler hook: requeue running syncs whose job died (e.g. a worker restart)."""
+    threshold = add_to_date(now_datetime(), minutes=-STALL_AFTER_MINUTES)
+    for doctype in sync_engine.layer_doctypes():
+        cp = get_checkpoint(doctype)
+        if not cp or cp.get("status") != "running":
+            continue
+        if is_job_enqueued(cp.get("job_id")):
+            continue
+        if cp.get("updated_at") and get_datetime(cp["updated_at"]) > threshold:
+            continue
+        _enqueue_chunk(cp)
+        _save_checkpoint(cp)
+
+
+@frappe.whitelist()
+def sync_incremental_geometries(doctype: str) -> Dict[str, Any]:
+    frappe.only_for("System Manager")
+    return sync_engine.sync_incremental(doctype)
+
+
+def run_incremental_geometry_syncs():
+    """Scheduler hook: incremental sync for every collection with an `updated_at_property`."""
+    for doctype in sync_engine.layer_doctypes():
+        if not (get_doctype_config(doctype) or {}).get("updated_at_property"):
+            continue
+        try:
+            sync_engine.sync_incremental(doctype)
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), f"GIS incremental sync failed for {doctype}")
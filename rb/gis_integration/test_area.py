@@ -0,0 +1,111 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import math
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import area
+from rb.gis_integration.area import polygon_areas
+
+
+# Surface area of the WGS84 ellipsoid in m²
+WGS84_SURFACE = 5.10065621724e14
+
+
+def _square(lon, lat, side_degrees):
+    return [
+        [lon, lat],
+        [lon + side_degrees, lat],
+        [lon + side_degrees, lat + side_degrees],
+        [lon, lat + side_degrees],
+        [lon, lat],
+    ]
+
+
+def _local_area(lon, lat, side_degrees):
+    """Area of a small lon/lat square from the ellipsoid's radii of curvature at its centre."""
+    phi = math.radians(lat + side_degrees / 2)
+    e2 = area._E2
+    w = math.sqrt(1 - e2 * math.sin(phi) ** 2)
+    meridian = area._A * (1 - e2) / w**3
+    normal = area._A / w
+    step = math.radians(side_degrees)
+    return meridian * step * normal * math.cos(phi) * step
+
+
+class TestPolygonAreas(FrappeTestCase):
+    def _both(self, geometries):
+        """Areas from the NumPy and the pure Python path, which must agree."""
+        fast = polygon_areas(geometries)
+        with patch.object(area, "np", None):
+            slow = polygon_areas(geometries)
+        for a, b in zip(fast, slow):
+            self.assertAlmostEqual(a, b, delta=max(abs(a), 1) * 1e-9)
+        return fast
+
+    def test_hemisphere(self):
+        north = {"type": "Polygon", "coordinates": [[[-180, 0], [180, 0], [180, 90], [-180, 90], [-180, 0]]]}
+        (result,) = self._both([north])
+        self.assertAlmostEqual(result / (WGS84_SURFACE / 2), 1, places=9)
+
+    def test_lot_sized_square(self):
+        # About 94 m x 111 m in Tel Aviv
+        side = 0.001
+        (result,) = self._both([{"type": "Polygon", "coordinates": [_square(34.78, 32.08, side)]}])
+        self.assertAlmostEqual(result / _local_area(34.78, 32.08, side), 1, places=6)
+
+    def test_hole_is_subtracted(self):
+        shell = _square(34.78, 32.08, 0.002)
+        hole = _square(34.7805, 32.0805, 0.001)[::-1]
+        with_hole, shell_only, hole_only = self._both(
+            [
+                {"type": "Polygon", "coordinates": [shell, hole]},
+                {"type": "Polygon", "coordinates": [shell]},
+                {"type": "Polygon", "coordinates": [hole]},
+            ]
+        )
+        self.assertAlmostEqual(with_hole, shell_only - hole_only, delta=1e-6)
+
+    def test_orientation_and_closing_vertex_do_not_matter(self):
+        ring = _square(34.78, 32.08, 0.001)
+        areas = self._both(
+            [
+                {"type": "Polygon", "coordinates": [ring]},
+                {"type": "Polygon", "coordinates": [ring[::-1]]},
+                {"type": "Polygon", "coordinates": [ring[:-1]]},
+            ]
+        )
+        self.assertAlmostEqual(areas[0], areas[1], delta=1e-6)
+        self.assertAlmostEqual(areas[0], areas[2], delta=1e-6)
+
+    def test_collections_sum_their_polygons(self):
+        a, b = _square(34.78, 32.08, 0.001), _square(34.79, 32.09, 0.002)
+        single_a, single_b, multi, fc = self._both(
+            [
+                {"type": "Polygon", "coordinates": [a]},
+                {"type": "Polygon", "coordinates": [b]},
+                {"type": "MultiPolygon", "coordinates": [[a], [b]]},
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [a]}},
+                        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [34.7, 32.0]}},
+                        {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [b]}},
+                    ],
+                },
+            ]
+        )
+        self.assertAlmostEqual(multi, single_a + single_b, delta=1e-6)
+        self.assertAlmostEqual(fc, single_a + single_b, delta=1e-6)
+
+    def test_non_polygons_have_no_area(self):
+        geometries = [
+            None,
+            {"type": "Point", "coordinates": [34.7, 32.0]},
+            {"type": "LineString", "coordinates": [[34.7, 32.0], [34.8, 32.1]]},
+            {"type": "Polygon", "coordinates": [[[34.7, 32.0], [34.8, 32.1]]]},
+        ]
+        self.assertEqual(self._both(geometries), [0.0, 0.0, 0.0, 0.0])
+        self.assertEqual(polygon_areas([]), [])
@@ -0,0 +1,67 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration.cache import ByteBoundedLRU
+
+
+class TestByteBoundedLRU(FrappeTestCase):
+    def test_get_and_put(self):
+        lru = ByteBoundedLRU(100)
+        lru.put("a", {"x": 1}, 10, 60)
+        self.assertEqual(lru.get("a"), {"x": 1})
+        self.assertIsNone(lru.get("missing"))
+        self.assertEqual(lru.bytes, 10)
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        lru = ByteBoundedLRU(100)
+        lru.put("a", "a", 40, 60)
+        lru.put("b", "b", 40, 60)
+        lru.get("a")  # b is now the oldest
+        lru.put("c", "c", 40, 60)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get("a"), "a")
+        self.assertEqual(lru.get("c"), "c")
+        self.assertEqual(lru.bytes, 80)
+        self.assertEqual(lru.evictions, 1)
+
+    def test_byte_budget_is_never_exceeded(self):
+        lru = ByteBoundedLRU(1000)
+        for i in range(200):
+            lru.put(str(i), i, 7 + i % 50, 60)
+            self.assertLessEqual(lru.bytes, 1000)
+        self.assertEqual(lru.bytes, sum(lru._data[k][1] for k in lru._data))
+
+    def test_oversized_value_is_not_stored(self):
+        lru = ByteBoundedLRU(100)
+        lru.put("a", "a", 10, 60)
+        lru.put("big", "big", 101, 60)
+        self.assertIsNone(lru.get("big"))
+        self.assertEqual(lru.get("a"), "a")
+        self.assertEqual(lru.evictions, 0)
+
+    def test_replace_updates_size(self):
+        lru = ByteBoundedLRU(100)
+        lru.put("a", "old", 60, 60)
+        lru.put("a", "new", 20, 60)
+        self.assertEqual(lru.get("a"), "new")
+        self.assertEqual((lru.bytes, len(lru)), (20, 1))
+
+    def test_delete(self):
+        lru = ByteBoundedLRU(100)
+        lru.put("a", "a", 30, 60)
+        lru.delete("a")
+        lru.delete("a")
+        self.assertIsNone(lru.get("a"))
+        self.assertEqual((lru.bytes, len(lru)), (0, 0))
+
+    def test_expired_entries_are_dropped(self):
+        lru = ByteBoundedLRU(100)
+        with patch("rb.gis_integration.cache.time.monotonic", return_value=1000.0):
+            lru.put("a", "a", 30, 5)
+        with patch("rb.gis_integration.cache.time.monotonic", return_value=1006.0):
+            self.assertIsNone(lru.get("a"))
+        self.assertEqual((lru.bytes, len(lru)), (0, 0))
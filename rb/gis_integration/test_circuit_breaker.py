@@ -0,0 +1,74 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration.circuit_breaker import CircuitBreaker, GISUnavailableError
+
+
+class TestCircuitBreaker(FrappeTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(f"_test_{frappe.generate_hash(length=8)}", threshold=3, cooldown=30)
+
+    def tearDown(self):
+        b = self.breaker
+        frappe.cache().delete(b._failures_key, b._open_key, b._probe_key)
+
+    def _fail(self, times):
+        for _i in range(times):
+            self.breaker.before_request()
+            self.breaker.record_failure()
+
+    def _expire_cooldown(self):
+        frappe.cache().delete(self.breaker._open_key)
+
+    def test_closed_counts_failures(self):
+        self._fail(2)
+        state = self.breaker.state()
+        self.assertEqual((state["state"], state["failures"]), ("closed", 2))
+        self.assertEqual(self.breaker.before_request(), 2)
+
+    def test_opens_at_threshold(self):
+        self._fail(3)
+        state = self.breaker.state()
+        self.assertEqual(state["state"], "open")
+        self.assertTrue(0 < state["retry_in"] <= 30)
+        self.assertRaises(GISUnavailableError, self.breaker.before_request)
+
+    def test_half_open_lets_a_single_probe_through(self):
+        self._fail(3)
+        self._expire_cooldown()
+        self.assertEqual(self.breaker.state()["state"], "half_open")
+        failures = self.breaker.before_request()
+        self.assertEqual(failures, 3)
+        # Every other request waits for the probe
+        self.assertRaises(GISUnavailableError, self.breaker.before_request)
+        self.breaker.record_success(failures)
+        state = self.breaker.state()
+        self.assertEqual((state["state"], state["failures"], state["retry_in"]), ("closed", 0, None))
+        self.assertEqual(self.breaker.before_request(), 0)
+
+    def test_failed_probe_opens_again(self):
+        self._fail(3)
+        self._expire_cooldown()
+        self.breaker.before_request()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state()["state"], "open")
+        self.assertRaises(GISUnavailableError, self.breaker.before_request)
+        # The next cool-down allows a new probe
+        self._expire_cooldown()
+        self.assertEqual(self.breaker.before_request(), 4)
+
+    def test_success_resets_the_count(self):
+        self._fail(2)
+        self.breaker.record_success(self.breaker.before_request())
+        self._fail(2)
+        self.assertEqual(self.breaker.state()["state"], "closed")
+
+    def test_threshold_zero_disables(self):
+        breaker = CircuitBreaker(f"_test_{frappe.generate_hash(length=8)}", threshold=0)
+        for _i in range(10):
+            self.assertEqual(breaker.before_request(), 0)
+            breaker.record_failure()
+        self.assertEqual(breaker.state()["state"], "disabled")
@@ -0,0 +1,82 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import fetch_queue, sync_engine
+from rb.gis_integration.circuit_breaker import GISUnavailableError
+
+
+class TestFetchQueue(FrappeTestCase):
+    def setUp(self):
+        frappe.cache().delete(fetch_queue._pending_key())
+        self.addCleanup(frappe.cache().delete, fetch_queue._pending_key())
+        self.synced = []
+        self.failing = set()
+        self.breaker_state = "closed"
+        connector = SimpleNamespace(breaker=SimpleNamespace(state=lambda: {"state": self.breaker_state}))
+        for patcher in (
+            patch.object(frappe, "enqueue"),
+            patch.object(fetch_queue, "PGFeatureServConnector", return_value=connector),
+            patch.object(sync_engine, "is_geo_doctype", return_value=True),
+            patch.object(sync_engine, "get_rows", side_effect=self._get_rows),
+            patch.object(sync_engine, "sync_rows", side_effect=self._sync_rows),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get_rows(self, doctype, names):
+        return [{"name": name} for name in names]
+
+    def _sync_rows(self, doctype, rows):
+        if "unavailable" in self.failing:
+            raise GISUnavailableError("GIS is down")
+        self.synced.extend((doctype, row["name"]) for row in rows)
+        failed = [row["name"] for row in rows if row["name"] in self.failing]
+        return {"errors": len(failed), "failed": failed}
+
+    def test_queued_documents_are_fetched_once(self):
+        for doctype, name in (("Lot", "L-1"), ("Lot", "L-2"), ("Lot", "L-1"), ("Plan", "P-1")):
+            fetch_queue._add_pending(doctype, name)
+        self.assertEqual(frappe.enqueue.call_args.kwargs["job_id"], fetch_queue.FLUSH_JOB_ID)
+
+        fetch_queue.flush_pending_fetches()
+        self.assertEqual(sorted(self.synced), [("Lot", "L-1"), ("Lot", "L-2"), ("Plan", "P-1")])
+        # The queue is drained
+        self.synced.clear()
+        fetch_queue.flush_pending_fetches()
+        self.assertEqual(self.synced, [])
+
+    def test_open_breaker_leaves_the_queue(self):
+        fetch_queue._add_pending("Lot", "L-1")
+        self.breaker_state = "open"
+        fetch_queue.flush_pending_fetches()
+        self.assertEqual(self.synced, [])
+        self.breaker_state = "closed"
+        fetch_queue.flush_pending_fetches()
+        self.assertEqual(self.synced, [("Lot", "L-1")])
+
+    def test_failed_documents_are_retried_by_the_next_run(self):
+        fetch_queue._add_pending("Lot", "L-1")
+        fetch_queue._add_pending("Lot", "L-2")
+        self.failing = {"L-2"}
+        fetch_queue.flush_pending_fetches()
+        self.assertEqual(sorted(self.synced), [("Lot", "L-1"), ("Lot", "L-2")])
+        self.synced.clear()
+        self.failing = set()
+        fetch_queue.flush_pending_fetches()
+        self.assertEqual(self.synced, [("Lot", "L-2")])
+
+    def test_unavailable_gis_keeps_the_batch(self):
+        fetch_queue._add_pending("Lot", "L-1")
+        fetch_queue._add_pending("Plan", "P-1")
+        self.failing = {"unavailable"}
+        fetch_queue.flush_pending_fetches()
+        self.assertEqual(self.synced, [])
+        self.failing = set()
+        fetch_queue.flush_pending_fetches()
+        self.assertEqual(sorted(self.synced), [("Lot", "L-1"), ("Plan", "P-1")])
@@ -0,0 +1,138 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import json
+import math
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import geometry
+from rb.gis_integration.geometry import (
+    bounds,
+    centroid,
+    douglas_peucker,
+    quantize,
+    reduce_feature_collection,
+    simplify,
+)
+
+
+def _wavy_ring(n=200, radius=0.01, wobble=0.0002):
+    """Closed ring around (35, 32) with small wobbles that simplification can remove."""
+    ring = []
+    for i in range(n):
+        a = 2 * math.pi * i / n
+        r = radius + wobble * math.sin(12 * a)
+        ring.append([35 + r * math.cos(a), 32 + r * math.sin(a)])
+    return ring + [ring[0]]
+
+
+def _segment_distance(p, a, b):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length2 = dx * dx + dy * dy
+    t = 0.0 if not length2 else max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length2))
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
+
+
+def _fc(*geometries):
+    return {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "properties": {}, "geometry": g} for g in geometries],
+    }
+
+
+class TestQuantize(FrappeTestCase):
+    def test_rounds_and_drops_repeated_vertices(self):
+        line = {"type": "LineString", "coordinates": [[1.123456, 2.0], [1.123457, 2.0], [1.2, 2.1]]}
+        self.assertEqual(quantize(line, 5)["coordinates"], [[1.12346, 2.0], [1.2, 2.1]])
+
+    def test_collapsed_ring_keeps_full_precision(self):
+        ring = [[0.0, 0.0], [1e-7, 0.0], [1e-7, 1e-7], [0.0, 0.0]]
+        polygon = {"type": "Polygon", "coordinates": [ring]}
+        self.assertEqual(quantize(polygon, 5)["coordinates"], [ring])
+
+    def test_rings_stay_closed(self):
+        polygon = {"type": "MultiPolygon", "coordinates": [[_wavy_ring()], [_wavy_ring(radius=0.02)]]}
+        for poly in quantize(polygon, 6)["coordinates"]:
+            for ring in poly:
+                self.assertEqual(ring[0], ring[-1])
+                self.assertGreaterEqual(len(ring), 4)
+
+
+class TestSimplify(FrappeTestCase):
+    def _check_ring(self, original, simplified, tolerance):
+        self.assertEqual(simplified[0], simplified[-1])
+        self.assertGreaterEqual(len(simplified), 4)
+        self.assertLess(len(simplified), len(original))
+        # Every dropped vertex lies within the tolerance of the simplified outline
+        for p in original:
+            distance = min(_segment_distance(p, a, b) for a, b in zip(simplified, simplified[1:]))
+            self.assertLessEqual(distance, tolerance * (1 + 1e-9))
+
+    def test_polygon_invariants(self):
+        ring = _wavy_ring()
+        tolerance = 0.0005
+        for shapely in (geometry._shapely_shape, None):
+            with self.subTest(shapely=bool(shapely)), patch.object(geometry, "_shapely_shape", shapely):
+                out = simplify({"type": "Polygon", "coordinates": [ring]}, tolerance)
+                self._check_ring(ring, out["coordinates"][0], tolerance)
+
+    def test_small_ring_is_never_collapsed(self):
+        triangle = [[0.0, 0.0], [1e-6, 0.0], [0.0, 1e-6], [0.0, 0.0]]
+        with patch.object(geometry, "_shapely_shape", None):
+            out = simplify({"type": "Polygon", "coordinates": [triangle]}, 1.0)
+        self.assertEqual(out["coordinates"], [triangle])
+
+    def test_zero_tolerance_is_a_no_op(self):
+        polygon = {"type": "Polygon", "coordinates": [_wavy_ring()]}
+        self.assertIs(simplify(polygon, 0), polygon)
+
+    def test_douglas_peucker_keeps_endpoints(self):
+        points = [[0, 0], [1, 0.01], [2, -0.01], [3, 5], [4, 6], [5, 7]]
+        out = douglas_peucker(points, 0.1)
+        self.assertEqual((out[0], out[-1]), (points[0], points[-1]))
+        self.assertIn([3, 5], out)
+        self.assertNotIn([1, 0.01], out)
+
+
+class TestReduceFeatureCollection(FrappeTestCase):
+    def test_fits_budget_by_simplifying(self):
+        fc = _fc({"type": "Polygon", "coordinates": [_wavy_ring(n=2000)]})
+        full = len(json.dumps(fc))
+        data, report = reduce_feature_collection(fc, full // 4, precision=7, tolerance=1e-5)
+        self.assertTrue(report["fits"])
+        self.assertEqual(report["bytes"], len(data.encode("utf-8")))
+        self.assertLessEqual(report["bytes"], full // 4)
+        self.assertIsNotNone(report["tolerance"])
+
+    def test_small_payload_is_left_alone(self):
+        fc = _fc({"type": "Point", "coordinates": [35.0, 32.0]})
+        data, report = reduce_feature_collection(fc, 10_000, tolerance=1e-5)
+        self.assertEqual(json.loads(data), fc)
+        self.assertIsNone(report["tolerance"])
+
+    def test_reports_when_it_cannot_fit(self):
+        fc = _fc({"type": "Polygon", "coordinates": [_wavy_ring()]})
+        _data, report = reduce_feature_collection(fc, 10, tolerance=None)
+        self.assertFalse(report["fits"])
+
+
+class TestBoundsAndCentroid(FrappeTestCase):
+    def test_square_with_hole(self):
+        shell = [[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]]
+        hole = [[0, 0], [0, 2], [2, 2], [2, 0], [0, 0]]
+        fc = _fc({"type": "Polygon", "coordinates": [shell, hole]})
+        self.assertEqual(bounds(fc), (0, 0, 4, 4))
+        cx, cy = centroid(fc)
+        # 16 - 4 = 12 units: (2, 2) * 16 minus (1, 1) * 4
+        self.assertAlmostEqual(cx, 28 / 12)
+        self.assertAlmostEqual(cy, 28 / 12)
+
+    def test_points_use_vertex_mean(self):
+        fc = _fc({"type": "MultiPoint", "coordinates": [[0, 0], [2, 4]]})
+        self.assertEqual(centroid(fc), (1, 2))
+
+    def test_empty(self):
+        self.assertIsNone(bounds(_fc()))
+        self.assertIsNone(centroid(_fc()))
@@ -0,0 +1,168 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import threading
+import time
+from unittest.mock import MagicMock, PropertyMock, patch
+from urllib.parse import parse_qsl, urlsplit
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import cache as gis_cache
+from rb.gis_integration import gis_connector
+from rb.gis_integration.gis_connector import PGFeatureServConnector, cql_literal
+from rb.gis_integration.sync_engine import _site_context
+
+
+def _feature(value):
+    return {"type": "Feature", "properties": {"lot_id": value}, "geometry": None}
+
+
+class _Response:
+    def __init__(self, data, status_code=200):
+        self._data, self.status_code = data, status_code
+        self.content = self.text = str(data)
+
+    def json(self):
+        return self._data
+
+
+def _session(get):
+    """Patch the connector's HTTP session with a fake whose `get` is `get`."""
+    session = MagicMock()
+    session.get.side_effect = get
+    return patch.object(PGFeatureServConnector, "session", new_callable=PropertyMock, return_value=session)
+
+
+class TestCQLBatching(FrappeTestCase):
+    def setUp(self):
+        self.connector = PGFeatureServConnector()
+        self.calls = []
+
+    def _serve(self, features, matched=None):
+        """Fake pg_featureserv session paging over `features` by limit/offset."""
+
+        def get(url, **kwargs):
+            params = dict(parse_qsl(urlsplit(url).query))
+            self.calls.append(params)
+            start, limit = int(params.get("offset", 0)), int(params["limit"])
+            page = {"type": "FeatureCollection", "features": features[start : start + limit]}
+            if matched is not None:
+                page["numberMatched"] = matched
+            return _Response(page)
+
+        return _session(get)
+
+    def test_cql_literal_escapes_quotes(self):
+        self.assertEqual(cql_literal("a'b"), "'a''b'")
+        self.assertEqual(cql_literal(12), "'12'")
+
+    def test_in_filter(self):
+        with self._serve([_feature("1"), _feature("2")]):
+            fc = self.connector.get_features_by_property_values("lots", "lot_id", ["1", "2", "O'Hara"])
+        self.assertEqual(len(fc["features"]), 2)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0]["filter"], "lot_id IN ('1','2','O''Hara')")
+        self.assertEqual(self.calls[0]["limit"], "3")
+
+    def test_empty_values_skip_the_request(self):
+        with self._serve([]):
+            fc = self.connector.get_features_by_property_values("lots", "lot_id", [])
+        self.assertEqual(fc["features"], [])
+        self.assertEqual(self.calls, [])
+
+    def test_pages_until_short_page(self):
+        # Multipart lots: two values match five features
+        features = [_feature("1")] * 3 + [_feature("2")] * 2
+        with self._serve(features):
+            fc = self.connector.get_features_by_property_values("lots", "lot_id", ["1", "2"])
+        self.assertEqual(len(fc["features"]), 5)
+        self.assertEqual([c["offset"] for c in self.calls], ["0", "2", "4"])
+
+    def test_stops_at_number_matched(self):
+        features = [_feature(str(i)) for i in range(4)]
+        with self._serve(features, matched=4):
+            fc = self.connector.get_features_by_property_values("lots", "lot_id", ["0", "1"])
+        self.assertEqual(len(fc["features"]), 4)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_failed_page_returns_none(self):
+        first = _Response({"features": [_feature("1"), _feature("1")]})
+        pages = iter([first, _Response({}, status_code=400)])
+        with _session(lambda url, **kwargs: next(pages)):
+            self.assertIsNone(self.connector.get_features_by_property_values("lots", "lot_id", ["1", "2"]))
+
+    def test_error_response_returns_none(self):
+        with _session(lambda url, **kwargs: _Response({}, status_code=400)):
+            self.assertIsNone(self.connector.get_features_by_property_values("lots", "lot_id", ["1"]))
+
+
+class TestSingleFlight(FrappeTestCase):
+    def setUp(self):
+        self.connector = PGFeatureServConnector()
+        self.connector.flight_wait = 5
+        self.cache_key = self.connector._cache_key("p", "lots", "lot_id", "L-1", "100")
+        self.lock_key = frappe.cache().make_key(f"{self.cache_key}:flight")
+        self._forget()
+        self.addCleanup(self._forget)
+        self.calls = []
+
+    def _forget(self):
+        gis_cache.delete_value(self.cache_key)
+        frappe.cache().delete(self.lock_key)
+
+    def _lookup(self):
+        return self.connector.get_features_by_property("lots", "lot_id", "L-1")
+
+    def _serve(self, delay=0.0):
+        def get(url, **kwargs):
+            self.calls.append(url)
+            if delay:
+                time.sleep(delay)
+            return _Response({"type": "FeatureCollection", "features": [_feature("L-1")]})
+
+        return _session(get)
+
+    def test_concurrent_callers_share_one_request(self):
+        site, sites_path = frappe.local.site, frappe.local.sites_path
+        results = []
+
+        def lookup():
+            with _site_context(site, sites_path):
+                results.append(self._lookup())
+
+        with self._serve(delay=0.2):
+            threads = [threading.Thread(target=lookup) for _i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual([len(fc["features"]) for fc in results], [1, 1])
+
+    def _other_worker(self, action, after_polls=3):
+        """Run `action` (another worker finishing) at the given poll of the waiting loop."""
+        polls = []
+
+        def sleep(seconds):
+            polls.append(seconds)
+            if len(polls) == after_polls:
+                action()
+
+        return patch.object(gis_connector.time, "sleep", side_effect=sleep)
+
+    def test_waits_for_the_worker_holding_the_lock(self):
+        frappe.cache().set(self.lock_key, 1, ex=30)
+        fc = {"type": "FeatureCollection", "features": [_feature("L-1")]}
+        with self._serve(), self._other_worker(lambda: gis_cache.set_value(self.cache_key, fc, 60)) as sleep:
+            self.assertEqual(self._lookup()["features"], fc["features"])
+        self.assertEqual(self.calls, [])
+        self.assertEqual(sleep.call_count, 3)
+
+    def test_fetches_itself_once_the_lock_is_released(self):
+        frappe.cache().set(self.lock_key, 1, ex=30)
+        with self._serve(), self._other_worker(lambda: frappe.cache().delete(self.lock_key)) as sleep:
+            self.assertEqual(len(self._lookup()["features"]), 1)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(sleep.call_count, 3)
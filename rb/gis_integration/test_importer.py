@@ -0,0 +1,195 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import io
+import json
+import sqlite3
+import struct
+
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration.importer import (
+    _epsg_of,
+    _read_wkb,
+    iter_geojson,
+    iter_geojson_seq,
+    iter_geopackage,
+    parse_gpkg_geometry,
+)
+
+
+_CODES = {
+    "Point": 1,
+    "LineString": 2,
+    "Polygon": 3,
+    "MultiPoint": 4,
+    "MultiLineString": 5,
+    "MultiPolygon": 6,
+    "GeometryCollection": 7,
+}
+
+
+def to_wkb(geometry, order="<", z=False):
+    """ISO WKB of a GeoJSON geometry (2-d, or 3-d with a constant Z when `z` is set)."""
+    code = _CODES[geometry["type"]] + (1000 if z else 0)
+    out = struct.pack(f"{order}BI", 1 if order == "<" else 0, code)
+
+    def values(points):
+        return [c for p in points for c in ([*p, 5.0] if z else p)]
+
+    def positions(points):
+        flat = values(points)
+        return struct.pack(f"{order}I{len(flat)}d", len(points), *flat)
+
+    coords = geometry.get("coordinates")
+    t = geometry["type"]
+    if t == "Point":
+        flat = values([coords])
+        out += struct.pack(f"{order}{len(flat)}d", *flat)
+    elif t == "LineString":
+        out += positions(coords)
+    elif t == "Polygon":
+        out += struct.pack(f"{order}I", len(coords)) + b"".join(positions(r) for r in coords)
+    elif t == "GeometryCollection":
+        parts = geometry["geometries"]
+        out += struct.pack(f"{order}I", len(parts)) + b"".join(to_wkb(g, order, z) for g in parts)
+    else:
+        part_type = t[len("Multi") :]
+        out += struct.pack(f"{order}I", len(coords))
+        out += b"".join(to_wkb({"type": part_type, "coordinates": c}, order, z) for c in coords)
+    return out
+
+
+def to_gpkg(geometry, envelope=1, srs_id=4326):
+    """GeoPackage geometry blob: header, optional XY envelope, WKB."""
+    flags = 0x01 | (envelope << 1)  # little-endian header
+    header = b"GP" + bytes([0, flags]) + struct.pack("<i", srs_id)
+    return header + struct.pack("<4d", 0, 0, 0, 0)[: 32 if envelope else 0] + to_wkb(geometry)
+
+
+SQUARE = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+HOLE = [[0.25, 0.25], [0.25, 0.5], [0.5, 0.5], [0.5, 0.25], [0.25, 0.25]]
+GEOMETRIES = [
+    {"type": "Point", "coordinates": [34.78, 32.08]},
+    {"type": "LineString", "coordinates": [[0.0, 0.0], [1.5, 2.5], [3.0, -1.0]]},
+    {"type": "Polygon", "coordinates": [SQUARE, HOLE]},
+    {"type": "MultiPoint", "coordinates": [[1.0, 2.0], [3.0, 4.0]]},
+    {"type": "MultiLineString", "coordinates": [[[0.0, 0.0], [1.0, 1.0]], [[2.0, 2.0], [3.0, 3.0]]]},
+    {"type": "MultiPolygon", "coordinates": [[SQUARE], [HOLE]]},
+    {
+        "type": "GeometryCollection",
+        "geometries": [
+            {"type": "Point", "coordinates": [1.0, 1.0]},
+            {"type": "Polygon", "coordinates": [SQUARE]},
+        ],
+    },
+]
+
+
+class TestWKB(FrappeTestCase):
+    def test_round_trip(self):
+        for geometry in GEOMETRIES:
+            for order in "<>":
+                with self.subTest(type=geometry["type"], order=order):
+                    wkb = to_wkb(geometry, order)
+                    self.assertEqual(_read_wkb(wkb), (geometry, len(wkb)))
+
+    def test_z_is_dropped(self):
+        for geometry in GEOMETRIES:
+            with self.subTest(type=geometry["type"]):
+                wkb = to_wkb(geometry, z=True)
+                self.assertEqual(_read_wkb(wkb), (geometry, len(wkb)))
+
+    def test_ewkb_with_srid(self):
+        point = struct.pack("<BIi2d", 1, 0x20000001, 4326, 34.78, 32.08)
+        self.assertEqual(_read_wkb(point)[0], {"type": "Point", "coordinates": [34.78, 32.08]})
+
+    def test_empty_point(self):
+        nan = float("nan")
+        self.assertEqual(_read_wkb(struct.pack("<BI2d", 1, 1, nan, nan)), (None, 21))
+
+    def test_unsupported_type(self):
+        self.assertRaises(ValueError, _read_wkb, struct.pack("<BI", 1, 15))
+
+
+class TestGeoPackageBlob(FrappeTestCase):
+    def test_envelopes(self):
+        polygon = GEOMETRIES[2]
+        for envelope in (0, 1):
+            with self.subTest(envelope=envelope):
+                self.assertEqual(parse_gpkg_geometry(to_gpkg(polygon, envelope)), polygon)
+
+    def test_empty_and_invalid(self):
+        self.assertIsNone(parse_gpkg_geometry(None))
+        empty = b"GP" + bytes([0, 0x11]) + struct.pack("<i", 4326)
+        self.assertIsNone(parse_gpkg_geometry(empty))
+        self.assertRaises(ValueError, parse_gpkg_geometry, b"XX" + bytes(30))
+        self.assertRaises(ValueError, parse_gpkg_geometry, b"GP" + bytes([0, 0x0B]) + bytes(60))
+
+    def test_iter_geopackage(self):
+        conn = sqlite3.connect(":memory:")
+        conn.executescript(
+            """
+            CREATE TABLE gpkg_spatial_ref_sys (
+                srs_id INTEGER, organization TEXT, organization_coordsys_id INTEGER
+            );
+            CREATE TABLE gpkg_contents (table_name TEXT, data_type TEXT);
+            CREATE TABLE gpkg_geometry_columns (table_name TEXT, column_name TEXT, srs_id INTEGER);
+            CREATE TABLE lots (fid INTEGER PRIMARY KEY, lot_id TEXT, geom BLOB);
+            INSERT INTO gpkg_spatial_ref_sys VALUES (2039, 'EPSG', 2039);
+            INSERT INTO gpkg_contents VALUES ('lots', 'features');
+            INSERT INTO gpkg_geometry_columns VALUES ('lots', 'geom', 2039);
+            """
+        )
+        conn.execute("INSERT INTO lots VALUES (1, 'L-1', ?)", (to_gpkg(GEOMETRIES[2]),))
+        conn.execute("INSERT INTO lots VALUES (2, 'L-2', NULL)")
+        epsg, features = iter_geopackage(conn)
+        features = list(features)
+        self.assertEqual(epsg, 2039)
+        self.assertEqual([f["id"] for f in features], [1, 2])
+        self.assertEqual(features[0]["properties"], {"fid": 1, "lot_id": "L-1"})
+        self.assertEqual(features[0]["geometry"], GEOMETRIES[2])
+        self.assertIsNone(features[1]["geometry"])
+
+
+class TestGeoJSONReaders(FrappeTestCase):
+    def _collection(self, n):
+        return {
+            "type": "FeatureCollection",
+            "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::2039"}},
+            "features": [
+                {"type": "Feature", "properties": {"lot_id": f"L-{i}", "note": "]},{"}, "geometry": g}
+                for i, g in enumerate(GEOMETRIES * n)
+            ],
+        }
+
+    def test_streams_features_across_small_chunks(self):
+        fc = self._collection(5)
+        for chunk_size in (7, 64, 1 << 20):
+            with self.subTest(chunk_size=chunk_size):
+                epsg, features = iter_geojson(io.StringIO(json.dumps(fc, indent=1)), chunk_size)
+                self.assertEqual(epsg, 2039)
+                self.assertEqual(list(features), fc["features"])
+
+    def test_single_feature_and_geometry(self):
+        feature = {"type": "Feature", "properties": {}, "geometry": GEOMETRIES[0]}
+        for data in (feature, GEOMETRIES[0]):
+            epsg, features = iter_geojson(io.StringIO(json.dumps(data)), 8)
+            self.assertIsNone(epsg)
+            self.assertEqual([f["geometry"] for f in features], [GEOMETRIES[0]])
+
+    def test_truncated_file(self):
+        text = json.dumps(self._collection(1))[:-40]
+        _epsg, features = iter_geojson(io.StringIO(text), 16)
+        self.assertRaises(ValueError, list, features)
+
+    def test_geojson_seq(self):
+        lines = "\n".join("\x1e" + json.dumps(g) for g in GEOMETRIES[:3]) + "\n\n"
+        features = list(iter_geojson_seq(io.StringIO(lines)))
+        self.assertEqual([f["geometry"] for f in features], GEOMETRIES[:3])
+
+    def test_epsg_names(self):
+        self.assertEqual(_epsg_of("urn:ogc:def:crs:EPSG::2039"), 2039)
+        self.assertEqual(_epsg_of("EPSG:4326"), 4326)
+        self.assertEqual(_epsg_of("urn:ogc:def:crs:OGC:1.3:CRS84"), 4326)
+        self.assertIsNone(_epsg_of(None))
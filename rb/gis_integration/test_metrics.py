@@ -0,0 +1,106 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import random
+from unittest.mock import patch
+
+import frappe
+import redis
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import metrics
+from rb.gis_integration.metrics import BUCKETS, _bucket, _percentile
+
+
+class TestHistogram(FrappeTestCase):
+    def test_bucket_bounds_are_inclusive(self):
+        self.assertEqual(_bucket(0), "0.005")
+        self.assertEqual(_bucket(0.005), "0.005")
+        self.assertEqual(_bucket(0.0051), "0.01")
+        self.assertEqual(_bucket(1), "1")
+        self.assertEqual(_bucket(30.01), "+Inf")
+
+    def test_percentile_interpolates_inside_the_bucket(self):
+        buckets = {"0.1": 100}
+        self.assertEqual(_percentile(buckets, 100, 0.5), 0.075)
+        self.assertEqual(_percentile(buckets, 100, 0.99), 0.0995)
+
+    def test_percentile_across_buckets(self):
+        buckets = {"0.01": 50, "0.1": 50}
+        self.assertEqual(_percentile(buckets, 100, 0.5), 0.01)
+        self.assertEqual(_percentile(buckets, 100, 0.95), 0.095)
+
+    def test_percentile_edge_cases(self):
+        self.assertIsNone(_percentile({}, 0, 0.5))
+        # Only +Inf observations: the estimate is capped at the last finite bound
+        self.assertEqual(_percentile({"+Inf": 3}, 3, 0.5), BUCKETS[-1])
+
+    def test_percentiles_are_ordered_and_bounded(self):
+        rng = random.Random(7)
+        samples = [rng.lognormvariate(-3, 1.2) for _i in range(2000)]
+        buckets = {}
+        for s in samples:
+            buckets[_bucket(s)] = buckets.get(_bucket(s), 0) + 1
+        p50, p95, p99 = (_percentile(buckets, len(samples), q) for q in (0.5, 0.95, 0.99))
+        self.assertLessEqual(p50, p95)
+        self.assertLessEqual(p95, p99)
+        # The estimate falls in the same bucket as the exact quantile
+        exact = sorted(samples)[len(samples) // 2 - 1]
+        self.assertEqual(_bucket(p50), _bucket(exact))
+
+
+class TestRecordRequest(FrappeTestCase):
+    def test_counters_are_buffered(self):
+        metrics._PENDING.clear()
+        with patch.object(metrics, "flush"):
+            metrics.record_request("_test_lots", 200, 0.02, 512)
+            metrics.record_request("_test_lots", 503, 0.3)
+            metrics.record_request("_test_lots", "circuit_open", 0)
+        counters = dict(metrics._PENDING.pop("_test_lots"))
+        self.assertEqual(counters["requests"], 3)
+        self.assertEqual(counters["errors"], 2)
+        self.assertEqual(counters["status:200"], 1)
+        self.assertEqual(counters["bucket:0.025"], 1)
+        self.assertEqual(counters["bucket:0.5"], 1)
+        self.assertEqual(counters["bytes"], 512)
+        self.assertEqual(counters["latency_us"], 320_000)
+
+
+class TestMetricsStore(FrappeTestCase):
+    collection = "_test_metrics_lots"
+
+    def setUp(self):
+        metrics._PENDING.clear()
+        self._forget()
+        self.addCleanup(self._forget)
+
+    def _forget(self):
+        cache = frappe.cache()
+        redis.Redis.srem(cache, metrics._index_key(), self.collection)
+        cache.delete(metrics._key(self.collection))
+
+    def test_flushed_counters_survive_the_round_trip(self):
+        with patch.object(metrics, "flush"):
+            metrics.record_request(self.collection, 200, 0.02, 512)
+            metrics.record_request(self.collection, 200, 0.3, 100)
+            metrics.record_request(self.collection, 503, 0.04)
+            metrics.record_cache(self.collection, True)
+            metrics.record_cache(self.collection, False)
+        metrics.flush()
+
+        result = metrics.get_metrics()[self.collection]
+        self.assertEqual(result["requests"], 3)
+        self.assertEqual(result["errors"], 1)
+        self.assertEqual(result["status_codes"], {"200": 2, "503": 1})
+        self.assertEqual(result["bytes_received"], 612)
+        self.assertEqual(result["cache"], {"hits": 1, "misses": 1, "hit_ratio": 0.5})
+        self.assertEqual(result["latency"]["p50"], 0.0375)
+        sample = f'gis_requests_total{{collection="{self.collection}",status="503"}} 1'
+        self.assertIn(sample, metrics.prometheus_text().splitlines())
+
+    def test_counters_add_up_across_flushes(self):
+        for _i in range(2):
+            with patch.object(metrics, "flush"):
+                metrics.record_request(self.collection, 200, 0.01)
+            metrics.flush()
+        self.assertEqual(metrics.get_metrics()[self.collection]["requests"], 2)
@@ -0,0 +1,173 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import struct
+
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import mvt
+
+
+def _read_varint(buf, pos):
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _fields(buf):
+    """(field, wire type, value) of a protobuf message; packed/bytes fields stay bytes."""
+    pos, out = 0, []
+    while pos < len(buf):
+        key, pos = _read_varint(buf, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire == 1:
+            value, pos = buf[pos : pos + 8], pos + 8
+        elif wire == 2:
+            size, pos = _read_varint(buf, pos)
+            value, pos = buf[pos : pos + size], pos + size
+        else:
+            raise AssertionError(f"unexpected wire type {wire}")
+        out.append((field, wire, value))
+    return out
+
+
+def _packed(buf):
+    values, pos = [], 0
+    while pos < len(buf):
+        value, pos = _read_varint(buf, pos)
+        values.append(value)
+    return values
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _decode_geometry(commands):
+    """Absolute coordinates per part from an MVT command stream."""
+    parts, x, y, i = [], 0, 0, 0
+    while i < len(commands):
+        cmd, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        if cmd == 7:
+            continue
+        if cmd == 1:
+            parts.append([])
+        for _n in range(count):
+            x += _unzigzag(commands[i])
+            y += _unzigzag(commands[i + 1])
+            i += 2
+            parts[-1].append((x, y))
+    return parts
+
+
+def _decode_value(buf):
+    field, _wire, value = _fields(buf)[0]
+    if field == 1:
+        return value.decode("utf-8")
+    if field == 3:
+        return struct.unpack("<d", value)[0]
+    if field == 6:
+        return _unzigzag(value)
+    if field == 7:
+        return bool(value)
+    raise AssertionError(f"unexpected value field {field}")
+
+
+def _decode_layer(buf):
+    layer = {"features": [], "keys": [], "values": []}
+    for field, _wire, value in _fields(buf):
+        if field == 1:
+            layer["name"] = value.decode("utf-8")
+        elif field == 2:
+            layer["features"].append(_fields(value))
+        elif field == 3:
+            layer["keys"].append(value.decode("utf-8"))
+        elif field == 4:
+            layer["values"].append(_decode_value(value))
+        elif field == 5:
+            layer["extent"] = value
+        elif field == 15:
+            layer["version"] = value
+    return layer
+
+
+class TestWireFormat(FrappeTestCase):
+    def test_varint(self):
+        self.assertEqual(mvt._varint(0), b"\x00")
+        self.assertEqual(mvt._varint(1), b"\x01")
+        self.assertEqual(mvt._varint(300), b"\xac\x02")
+        for n in (0, 127, 128, 16383, 16384, 2**35 + 7):
+            self.assertEqual(_read_varint(mvt._varint(n), 0), (n, len(mvt._varint(n))))
+
+    def test_zigzag(self):
+        self.assertEqual([mvt._zigzag(v) for v in (0, -1, 1, -2, 2)], [0, 1, 2, 3, 4])
+        for v in (-4096, -1, 0, 5, 4160):
+            self.assertEqual(_unzigzag(mvt._zigzag(v)), v)
+
+
+class TestEncodeGeometry(FrappeTestCase):
+    def test_polygon_commands(self):
+        square = [(0, 0), (10, 0), (10, 10), (0, 10)]
+        commands = mvt.encode_geometry(mvt.POLYGON, [square])
+        self.assertEqual(commands, [9, 0, 0, 26, 20, 0, 0, 20, 19, 0, 15])
+
+    def test_cursor_is_relative_across_parts(self):
+        parts = [[(1, 1), (5, 1)], [(10, 10), (12, 14), (3, 2)]]
+        commands = mvt.encode_geometry(mvt.LINESTRING, parts)
+        self.assertEqual(_decode_geometry(commands), parts)
+
+    def test_points(self):
+        points = [(5, 5), (7, 3)]
+        commands = mvt.encode_geometry(mvt.POINT, [points])
+        self.assertEqual(commands[0], 1 | (2 << 3))
+        self.assertEqual(_decode_geometry(commands), [points])
+
+    def test_degenerate_parts_are_skipped(self):
+        self.assertEqual(mvt.encode_geometry(mvt.POLYGON, [[(0, 0), (1, 1)]]), [])
+        self.assertEqual(mvt.encode_geometry(mvt.LINESTRING, [[(0, 0)]]), [])
+        self.assertEqual(mvt.encode_geometry(mvt.POINT, []), [])
+
+    def test_ring_area_winding(self):
+        # Tile y grows downwards: this ring is clockwise on screen and positive per the spec
+        self.assertEqual(mvt.ring_area([(0, 0), (10, 0), (10, 10), (0, 10)]), 100)
+        self.assertEqual(mvt.ring_area([(0, 0), (0, 10), (10, 10), (10, 0)]), -100)
+
+
+class TestEncodeTile(FrappeTestCase):
+    def test_round_trip(self):
+        square = [(0, 0), (100, 0), (100, 100), (0, 100)]
+        features = [
+            {"id": 7, "type": mvt.POLYGON, "parts": [square], "properties": {"name": "L-1", "area": 1.5}},
+            {"type": mvt.POINT, "parts": [[(50, 60)]], "properties": {"name": "L-2", "chargeable": True}},
+            {"type": mvt.POINT, "parts": [[(1, 2)]], "properties": {"name": "L-1", "missing": None}},
+            {"type": mvt.POLYGON, "parts": [], "properties": {"name": "empty"}},
+        ]
+        tile = mvt.encode_tile([mvt.encode_layer("lot", features, 4096)])
+
+        (field, _wire, body), = _fields(tile)
+        self.assertEqual(field, 3)
+        layer = _decode_layer(body)
+        self.assertEqual((layer["name"], layer["extent"], layer["version"]), ("lot", 4096, 2))
+        self.assertEqual(len(layer["features"]), 3)
+        self.assertEqual(layer["keys"], ["name", "area", "chargeable"])
+        self.assertEqual(layer["values"], ["L-1", 1.5, "L-2", True])
+
+        decoded = []
+        for feature in layer["features"]:
+            fields = {f: v for f, _w, v in feature}
+            tags = _packed(fields.get(2, b""))
+            props = {layer["keys"][k]: layer["values"][v] for k, v in zip(tags[::2], tags[1::2])}
+            decoded.append((fields.get(1), fields[3], _decode_geometry(_packed(fields[4])), props))
+
+        self.assertEqual(decoded[0], (7, mvt.POLYGON, [square], {"name": "L-1", "area": 1.5}))
+        self.assertEqual(decoded[1], (None, mvt.POINT, [[(50, 60)]], {"name": "L-2", "chargeable": True}))
+        # Repeated values share one entry in the value table
+        self.assertEqual(decoded[2][3], {"name": "L-1"})
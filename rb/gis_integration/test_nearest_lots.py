@@ -0,0 +1,111 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import math
+import random
+from itertools import islice
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import nearest_lots
+from rb.gis_integration.nearest_lots import KDTree, LotIndex, Search, haversine
+
+
+def _brute_force(points, x, y):
+    return sorted((px - x) ** 2 + (py - y) ** 2 for px, py in points)
+
+
+class TestKDTree(FrappeTestCase):
+    def setUp(self):
+        rng = random.Random(5)
+        self.points = [(rng.uniform(0, 1000), rng.uniform(0, 500)) for _i in range(2000)]
+        # Duplicates and a tight cluster
+        self.points += self.points[:50] + [(500.0 + i * 1e-6, 250.0) for i in range(40)]
+        self.queries = [(rng.uniform(-100, 1100), rng.uniform(-100, 600)) for _i in range(25)]
+
+    def test_knn_matches_brute_force(self):
+        for leaf_size in (1, 16):
+            tree = KDTree(self.points, leaf_size)
+            for x, y in self.queries:
+                with self.subTest(leaf_size=leaf_size, query=(x, y)):
+                    found = list(islice(Search(tree, x, y), 10))
+                    distances = [d2 for d2, _i in found]
+                    self.assertEqual(distances, _brute_force(self.points, x, y)[:10])
+                    for d2, i in found:
+                        px, py = self.points[i]
+                        self.assertEqual(d2, (px - x) ** 2 + (py - y) ** 2)
+
+    def test_full_walk_yields_every_point_in_order(self):
+        tree = KDTree(self.points)
+        x, y = self.queries[0]
+        found = list(Search(tree, x, y))
+        self.assertEqual(sorted(i for _d2, i in found), list(range(len(self.points))))
+        self.assertEqual([d2 for d2, _i in found], _brute_force(self.points, x, y))
+
+    def test_pushed_points_are_merged(self):
+        tree = KDTree(self.points[:100])
+        search = Search(tree, 0, 0)
+        search.push("near", (1, 1))
+        search.push("far", (5000, 5000))
+        keys = [key for _d2, key in search]
+        self.assertEqual(keys[0], "near")
+        self.assertEqual(keys[-1], "far")
+        self.assertEqual(len(keys), 102)
+
+    def test_empty_tree(self):
+        self.assertEqual(list(Search(KDTree([]), 0, 0)), [])
+        search = Search(KDTree([]), 0, 0)
+        search.push("only", (3, 4))
+        self.assertEqual(list(search), [(25, "only")])
+
+
+class TestLotIndex(FrappeTestCase):
+    def _index(self, rows):
+        with (
+            patch.object(nearest_lots, "_version", return_value=1),
+            patch.object(frappe, "get_all", return_value=[frappe._dict(r) for r in rows]),
+        ):
+            return LotIndex()
+
+    def test_search_with_overlay_matches_brute_force(self):
+        rng = random.Random(9)
+        lots = {f"L-{i}": (34.7 + rng.uniform(0, 0.1), 32.0 + rng.uniform(0, 0.1)) for i in range(300)}
+        index = self._index(
+            {"reference_name": name, "centroid_lon": lon, "centroid_lat": lat}
+            for name, (lon, lat) in lots.items()
+        )
+        # Moved, deleted and new Lots go to the overlay
+        index.update("L-1", 34.75, 32.05)
+        index.update("L-2", None, None)
+        index.update("L-new", 34.7501, 32.0501)
+        index.update("L-3", *lots["L-3"])  # unchanged: not an overlay entry
+        lots.update({"L-1": (34.75, 32.05), "L-new": (34.7501, 32.0501)})
+        del lots["L-2"]
+        self.assertEqual(set(index.overlay), {"L-1", "L-2", "L-new"})
+
+        query = (34.75, 32.05)
+        x, y = index.project(*query)
+        found = list(index.search(*query))
+        self.assertEqual(sorted(name for name, _p in found), sorted(lots))
+        self.assertEqual(found[0], ("L-1", (34.75, 32.05)))
+        self.assertEqual(found[1][0], "L-new")
+        expected = _brute_force([index.project(*p) for p in lots.values()], x, y)
+        actual = [(px - x) ** 2 + (py - y) ** 2 for px, py in (index.project(*p) for _n, p in found)]
+        for a, b in zip(actual, expected):
+            self.assertAlmostEqual(a, b, delta=1e-6)
+
+    def test_empty_index(self):
+        index = self._index([])
+        self.assertEqual(list(index.search(34.7, 32.0)), [])
+        index.update("L-1", 34.7, 32.0)
+        self.assertEqual(list(index.search(34.7, 32.0)), [("L-1", (34.7, 32.0))])
+
+
+class TestHaversine(FrappeTestCase):
+    def test_known_distances(self):
+        one_degree = nearest_lots.EARTH_RADIUS * math.pi / 180
+        self.assertAlmostEqual(haversine((34.0, 32.0), (34.0, 33.0)), one_degree, places=3)
+        self.assertAlmostEqual(haversine((0.0, 0.0), (180.0, 0.0)), one_degree * 180, places=3)
+        self.assertEqual(haversine((34.78, 32.08), (34.78, 32.08)), 0)
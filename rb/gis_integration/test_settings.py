@@ -0,0 +1,47 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import settings
+from rb.gis_integration.settings import clear_gis_config_cache, load_gis_config
+
+
+class TestConfigCache(FrappeTestCase):
+    def setUp(self):
+        self._forget()
+        self.addCleanup(self._forget)
+
+    def _forget(self):
+        settings._CACHED.pop(frappe.local.site, None)
+        self._new_request()
+
+    def _new_request(self):
+        frappe.local.gis_config = None
+
+    def test_built_once_per_process(self):
+        with patch.object(settings, "_build_config", return_value={"url": "a"}) as build:
+            first = load_gis_config()
+            self.assertIs(load_gis_config(), first)
+            self._new_request()
+            self.assertIs(load_gis_config(), first)
+        build.assert_called_once()
+
+    def test_reload_reaches_other_workers(self):
+        with patch.object(settings, "_build_config", side_effect=[{"url": "old"}, {"url": "new"}]):
+            self.assertEqual(load_gis_config()["url"], "old")
+            # Another worker still holds the old copy in its own process cache
+            other_worker = dict(settings._CACHED)
+            clear_gis_config_cache()
+            settings._CACHED.update(other_worker)
+            self._new_request()
+            self.assertEqual(load_gis_config()["url"], "new")
+
+    def test_reload_in_the_same_request(self):
+        with patch.object(settings, "_build_config", side_effect=[{"url": "old"}, {"url": "new"}]):
+            self.assertEqual(load_gis_config()["url"], "old")
+            clear_gis_config_cache()
+            self.assertEqual(load_gis_config()["url"], "new")
@@ -0,0 +1,62 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import random
+
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration.spatial_join import PolygonGrid, contains
+
+
+def _rect(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+
+class TestContains(FrappeTestCase):
+    def test_shell_and_hole(self):
+        polygon = [_rect(0, 0, 4, 4), _rect(1, 1, 2, 2)]
+        self.assertTrue(contains([polygon], 3, 3))
+        self.assertFalse(contains([polygon], 1.5, 1.5))
+        self.assertFalse(contains([polygon], 5, 1))
+
+    def test_any_part_of_a_multipolygon(self):
+        parts = [[_rect(0, 0, 1, 1)], [_rect(10, 10, 11, 11)]]
+        self.assertTrue(contains(parts, 10.5, 10.5))
+        self.assertFalse(contains(parts, 5, 5))
+
+    def test_concave_ring(self):
+        # U shape: the notch between the arms is outside
+        u = [[0, 0], [3, 0], [3, 3], [2, 3], [2, 1], [1, 1], [1, 3], [0, 3], [0, 0]]
+        self.assertTrue(contains([[u]], 0.5, 2.5))
+        self.assertFalse(contains([[u]], 1.5, 2))
+
+
+class TestPolygonGrid(FrappeTestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        items = []
+        for i in range(300):
+            x, y = rng.uniform(34, 35), rng.uniform(31, 32)
+            w, h = rng.uniform(1e-4, 0.02), rng.uniform(1e-4, 0.02)
+            items.append((f"P-{i}", [[_rect(x, y, x + w, y + h)]], (x, y, x + w, y + h)))
+        # One polygon spanning far more cells than MAX_CELLS_PER_POLYGON
+        items.append(("Region", [[_rect(30, 28, 38, 36)]], (30, 28, 38, 36)))
+        grid = PolygonGrid(items)
+        self.assertEqual(len(grid.large), 1)
+
+        for _n in range(500):
+            x, y = rng.uniform(33.9, 35.1), rng.uniform(30.9, 32.1)
+            expected = {name for name, polygons, _box in items if contains(polygons, x, y)}
+            self.assertEqual(set(grid.find(x, y)), expected)
+
+    def test_smallest_box_first(self):
+        items = [
+            ("Plan", [[_rect(0, 0, 10, 10)]], (0, 0, 10, 10)),
+            ("Block", [[_rect(2, 2, 6, 6)]], (2, 2, 6, 6)),
+            ("Lot", [[_rect(3, 3, 4, 4)]], (3, 3, 4, 4)),
+        ]
+        self.assertEqual(PolygonGrid(items).find(3.5, 3.5), ["Lot", "Block", "Plan"])
+        self.assertEqual(PolygonGrid(items).find(20, 20), [])
+
+    def test_empty_grid(self):
+        self.assertEqual(PolygonGrid([]).find(1, 1), [])
@@ -0,0 +1,179 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import re
+import threading
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import sync_engine
+from rb.gis_integration.sync_engine import _map_ordered
+
+
+def _square(n):
+    # Later items finish first, so completion order differs from input order
+    time.sleep(0.001 * (10 - n))
+    if n == 5:
+        raise ValueError(n)
+    return n * n
+
+
+class TestMapOrdered(FrappeTestCase):
+    def test_results_keep_input_order(self):
+        for workers in (1, 4):
+            with self.subTest(workers=workers), patch.object(frappe, "init"), patch.object(
+                frappe, "connect"
+            ), patch.object(frappe, "destroy"):
+                results = _map_ordered(_square, list(range(10)), workers)
+            self.assertEqual([r for r, _e in results], [None if n == 5 else n * n for n in range(10)])
+            self.assertEqual([n for n, (_r, e) in enumerate(results) if e], [5])
+            self.assertIsInstance(results[5][1], ValueError)
+
+    def test_each_worker_thread_has_its_own_site_context(self):
+        events, workers = [], set()
+
+        def record(event):
+            return lambda *args, **kwargs: events.append((event, threading.get_ident()))
+
+        def work(n):
+            workers.add(threading.get_ident())
+            return n
+
+        with patch.object(frappe, "init", side_effect=record("init")) as init, patch.object(
+            frappe, "connect", side_effect=record("connect")
+        ), patch.object(frappe, "destroy", side_effect=record("destroy")):
+            self.assertEqual([r for r, _e in _map_ordered(work, list(range(20)), 3)], list(range(20)))
+        init.assert_called_with(site=frappe.local.site, sites_path=frappe.local.sites_path)
+        threads = {ident for _event, ident in events}
+        self.assertLessEqual(len(threads), 3)
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertLessEqual(workers, threads)
+        # Every context that was set up is torn down on the same thread
+        for ident in threads:
+            sequence = [e for e, i in events if i == ident]
+            self.assertEqual(sequence, ["init", "connect", "destroy"] * (len(sequence) // 3))
+
+    def test_single_worker_stays_on_the_calling_thread(self):
+        with patch.object(frappe, "init") as init:
+            results = _map_ordered(lambda n: threading.get_ident(), [1, 2], 1)
+        self.assertEqual([r for r, _e in results], [threading.get_ident()] * 2)
+        init.assert_not_called()
+
+
+def _lot(lot_id, updated):
+    return {"type": "Feature", "properties": {"lot_id": lot_id, "updated": updated}, "geometry": None}
+
+
+class _Server:
+    """pg_featureserv stand-in for the incremental sync filters, sorted by (updated, lot_id)."""
+
+    def __init__(self, features):
+        self.features = features
+        self.filters = []
+        self.on_request = None
+
+    def _after(self, cql):
+        since = re.fullmatch(r"updated >= '(.*)'", cql)
+        if since:
+            return lambda p: p["updated"] >= since.group(1)
+        keyset = re.fullmatch(r"updated > '(.*)' OR \(updated = '(.*)' AND lot_id > '(.*)'\)", cql)
+        updated, after_id = keyset.group(1), keyset.group(3)
+        return lambda p: (p["updated"], p["lot_id"]) > (updated, after_id)
+
+    def get_features_by_filter(self, collection, cql=None, limit=100, sortby=None):
+        self.filters.append(cql)
+        if self.on_request:
+            self.on_request(len(self.filters))
+        keys = sortby.split(",")
+        rows = sorted(self.features, key=lambda f: [f["properties"][k] for k in keys])
+        if cql:
+            after = self._after(cql)
+            rows = [f for f in rows if after(f["properties"])]
+        return {"type": "FeatureCollection", "features": rows[:limit]}
+
+
+class TestIncrementalSync(FrappeTestCase):
+    def setUp(self):
+        # Two features per day: 01-01, 01-01, 01-02, 01-02, 01-03
+        self.server = _Server([_lot(f"L-{i}", f"2025-01-0{1 + i // 2}") for i in range(5)])
+        self.globals = {}
+        config = {
+            "collection": "lots",
+            "id_field": "lot_id",
+            "updated_at_property": "updated",
+            "incremental_page_size": 2,
+        }
+        for patcher in (
+            patch.object(sync_engine, "PGFeatureServConnector", return_value=self.server),
+            patch.object(sync_engine, "get_doctype_config", return_value=config),
+            patch.object(frappe, "get_all", side_effect=self._get_all),
+            patch.object(frappe.db, "get_global", side_effect=self.globals.get),
+            patch.object(frappe.db, "set_global", side_effect=self.globals.__setitem__),
+            patch.object(frappe.db, "commit"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.read = []
+
+    def _get_all(self, doctype, filters, fields):
+        # No matching documents; only record which features each page offered
+        self.read.extend(filters["lot_id"][1])
+        return []
+
+    def test_first_run_walks_the_collection(self):
+        result = sync_engine.sync_incremental("Lot")
+        self.assertEqual(result["fetched"], 5)
+        self.assertEqual(result["watermark"], {"updated_at": "2025-01-03", "id": "L-4"})
+        self.assertEqual(sync_engine.get_watermark("Lot"), result["watermark"])
+        self.assertEqual(
+            self.server.filters,
+            [
+                None,
+                "updated > '2025-01-01' OR (updated = '2025-01-01' AND lot_id > 'L-1')",
+                "updated > '2025-01-02' OR (updated = '2025-01-02' AND lot_id > 'L-3')",
+            ],
+        )
+
+    def test_ties_across_pages_are_read_once(self):
+        self.server.features = [_lot(f"L-{i}", "2025-01-01") for i in range(7)]
+        result = sync_engine.sync_incremental("Lot")
+        self.assertEqual(result["fetched"], 7)
+        self.assertEqual(self.read, [f"L-{i}" for i in range(7)])
+        self.assertEqual(result["watermark"], {"updated_at": "2025-01-01", "id": "L-6"})
+
+    def test_update_during_the_run_does_not_skip_features(self):
+        def touch_first_feature(request):
+            # Once the first page is read, L-0 changes and moves to the end of the order
+            if request == 2:
+                self.server.features[0] = _lot("L-0", "2025-01-09")
+
+        self.server.on_request = touch_first_feature
+        sync_engine.sync_incremental("Lot")
+        self.assertEqual(sorted(set(self.read)), [f"L-{i}" for i in range(5)])
+        self.assertEqual(sync_engine.get_watermark("Lot"), {"updated_at": "2025-01-09", "id": "L-0"})
+
+    def test_next_run_starts_after_the_watermark(self):
+        sync_engine.sync_incremental("Lot")
+        self.server.features.append(_lot("L-9", "2025-01-05"))
+        self.read.clear()
+        result = sync_engine.sync_incremental("Lot")
+        self.assertEqual(self.read, ["L-9"])
+        self.assertEqual(result["watermark"], {"updated_at": "2025-01-05", "id": "L-9"})
+
+    def test_legacy_timestamp_watermark(self):
+        self.globals[sync_engine._watermark_key("Lot")] = "2025-01-03"
+        self.assertEqual(sync_engine.get_watermark("Lot"), {"updated_at": "2025-01-03", "id": None})
+        result = sync_engine.sync_incremental("Lot")
+        # Resumes with >= so features sharing the timestamp are not missed
+        self.assertEqual(self.server.filters[0], "updated >= '2025-01-03'")
+        self.assertEqual(self.read, ["L-4"])
+        self.assertEqual(result["watermark"], {"updated_at": "2025-01-03", "id": "L-4"})
+
+    def test_nothing_changed(self):
+        self.globals[sync_engine._watermark_key("Lot")] = '{"updated_at": "2025-02-01", "id": "L-1"}'
+        result = sync_engine.sync_incremental("Lot")
+        self.assertEqual(result["fetched"], 0)
+        self.assertEqual(result["watermark"], {"updated_at": "2025-02-01", "id": "L-1"})
@@ -0,0 +1,125 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import mvt, tiles
+from rb.gis_integration.tiles import BUFFER, EXTENT
+
+
+LO, HI = -BUFFER, EXTENT + BUFFER
+
+
+def _area(ring):
+    return abs(mvt.ring_area(ring))
+
+
+class TestTileGrid(FrappeTestCase):
+    def test_world_tile_bounds(self):
+        west, south, east, north = tiles.tile_bounds(0, 0, 0)
+        self.assertAlmostEqual(west, -180)
+        self.assertAlmostEqual(east, 180)
+        self.assertAlmostEqual(north, tiles.MAX_LAT, places=6)
+        self.assertAlmostEqual(south, -tiles.MAX_LAT, places=6)
+
+    def test_projector_maps_tile_corners(self):
+        z, x, y = 15, 19571, 13254
+        west, south, east, north = tiles.tile_bounds(z, x, y)
+        project = tiles._projector(z, x, y)
+        for (lon, lat), expected in (((west, north), (0, 0)), ((east, south), (EXTENT, EXTENT))):
+            px, py = project((lon, lat))
+            self.assertAlmostEqual(px, expected[0], places=4)
+            self.assertAlmostEqual(py, expected[1], places=4)
+
+    def test_tile_range_covers_box(self):
+        z = 12
+        box = tiles.tile_bounds(z, 2446, 1656)
+        x0, y0, x1, y1 = tiles._tile_range(z, box)
+        # The buffer reaches into the neighbouring tiles
+        self.assertEqual((x0, y0, x1, y1), (2445, 1655, 2447, 1657))
+        self.assertEqual(tiles._tile_range(0, (-180, -85, 180, 85)), (0, 0, 0, 0))
+
+
+class TestClipRing(FrappeTestCase):
+    def test_ring_inside_is_unchanged(self):
+        ring = [(10.0, 10.0), (100.0, 10.0), (100.0, 100.0), (10.0, 100.0)]
+        self.assertEqual(tiles._clip_ring(ring), ring)
+
+    def test_ring_outside_is_empty(self):
+        ring = [(5000.0, 5000.0), (6000.0, 5000.0), (6000.0, 6000.0)]
+        self.assertEqual(tiles._clip_ring(ring), [])
+
+    def test_covering_ring_becomes_the_buffered_tile(self):
+        ring = [(-1e5, -1e5), (1e5, -1e5), (1e5, 1e5), (-1e5, 1e5)]
+        clipped = tiles._clip_ring(ring)
+        self.assertEqual(set(clipped), {(LO, LO), (HI, LO), (HI, HI), (LO, HI)})
+
+    def test_clip_invariants(self):
+        # A triangle crossing two tile edges
+        ring = [(-500.0, 2000.0), (3000.0, -800.0), (3000.0, 5000.0)]
+        clipped = tiles._clip_ring(ring)
+        for x, y in clipped:
+            self.assertTrue(LO - 1e-9 <= x <= HI + 1e-9 and LO - 1e-9 <= y <= HI + 1e-9)
+        self.assertLess(_area(clipped), _area(ring))
+        # Clipping is idempotent
+        again = tiles._clip_ring(clipped)
+        self.assertAlmostEqual(_area(again), _area(clipped), places=6)
+
+
+class TestTileFeatures(FrappeTestCase):
+    def setUp(self):
+        self.project = tiles._projector(0, 0, 0)
+
+    def test_polygon_winding_and_holes(self):
+        shell = [[-90, -45], [90, -45], [90, 45], [-90, 45], [-90, -45]]
+        hole = [[-10, -10], [-10, 10], [10, 10], [10, -10], [-10, -10]]
+        geometry = {"type": "Polygon", "coordinates": [shell, hole]}
+        (feature,) = tiles._tile_features(geometry, self.project, 1, {"name": "L-1"})
+        self.assertEqual(feature["type"], mvt.POLYGON)
+        exterior, interior = feature["parts"]
+        self.assertGreater(mvt.ring_area(exterior), 0)
+        self.assertLess(mvt.ring_area(interior), 0)
+        # Rings are sent open
+        self.assertNotEqual(exterior[0], exterior[-1])
+
+    def test_polygon_below_one_unit_is_dropped(self):
+        tiny = [[35.0, 32.0], [35.00001, 32.0], [35.00001, 32.00001], [35.0, 32.0]]
+        geometry = {"type": "Polygon", "coordinates": [tiny]}
+        self.assertEqual(tiles._tile_features(geometry, self.project, 1, {}), [])
+
+    def test_points_outside_the_buffer_are_dropped(self):
+        west, south, east, north = tiles.tile_bounds(10, 0, 0)
+        project = tiles._projector(10, 0, 0)
+        inside = [(west + east) / 2, (south + north) / 2]
+        geometry = {"type": "MultiPoint", "coordinates": [inside, [35.0, 32.0]]}
+        (feature,) = tiles._tile_features(geometry, project, 1, {})
+        self.assertEqual(len(feature["parts"][0]), 1)
+
+
+class TestInvalidateTiles(FrappeTestCase):
+    doctype = "_Test GIS Tile Layer"
+
+    def tearDown(self):
+        cache = frappe.cache()
+        cache.delete(tiles._generation_key(self.doctype))
+        for z in range(tiles.MAX_ZOOM + 1):
+            cache.delete(tiles._generation_key(self.doctype, z))
+
+    def test_large_box_bumps_only_deep_zooms(self):
+        before = {z: tiles._generation(self.doctype, z) for z in (0, 8, 18)}
+        tiles.invalidate_tiles(self.doctype, (34.7, 31.9, 34.9, 32.1))
+        after = {z: tiles._generation(self.doctype, z) for z in (0, 8, 18)}
+        self.assertEqual(after[0], before[0])
+        self.assertEqual(after[8], before[8])
+        self.assertNotEqual(after[18], before[18])
+
+    def test_invalidate_layer_bumps_every_zoom(self):
+        before = tiles._tile_key(self.doctype, 3, 1, 1)
+        tiles.invalidate_layer(self.doctype)
+        self.assertNotEqual(tiles._tile_key(self.doctype, 3, 1, 1), before)
+
+    def test_missing_boxes_are_ignored(self):
+        before = tiles._generation(self.doctype, 18)
+        tiles.invalidate_tiles(self.doctype, None, (None, None, None, None))
+        self.assertEqual(tiles._generation(self.doctype, 18), before)
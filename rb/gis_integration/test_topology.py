@@ -0,0 +1,172 @@
+# Copyright (c) 2025, lotan souid and Contributors
+# See license.txt
+
+import json
+import random
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from rb.gis_integration import topology
+from rb.gis_integration.area import project
+from rb.gis_integration.geometry import bounds
+from rb.gis_integration.topology import DEFAULTS, Shape, candidate_pairs, intersection_area
+
+
+LON, LAT = 34.78, 32.08
+# One grid unit is 0.001° (about 94 m x 111 m here)
+UNIT = 0.001
+ORIGIN = project(LON, LAT)
+
+
+def _ring(x0, y0, x1, y1):
+    """Counter-clockwise lon/lat ring of a rectangle given in grid units."""
+    w, s, e, n = LON + x0 * UNIT, LAT + y0 * UNIT, LON + x1 * UNIT, LAT + y1 * UNIT
+    return [[w, s], [e, s], [e, n], [w, n], [w, s]]
+
+
+def _polygon(*rings):
+    return {"type": "Polygon", "coordinates": list(rings)}
+
+
+def _shape(name, *rings):
+    return Shape(name, _polygon(*rings), ORIGIN)
+
+
+class TestIntersectionArea(FrappeTestCase):
+    def assertArea(self, actual, expected):
+        self.assertAlmostEqual(actual, expected, delta=max(expected, 1) * 1e-9)
+
+    def test_half_overlap(self):
+        a, b = _shape("A", _ring(0, 0, 2, 2)), _shape("B", _ring(1, 0, 3, 2))
+        expected = _shape("AB", _ring(1, 0, 2, 2)).area
+        self.assertArea(intersection_area(a, b), expected)
+        self.assertArea(intersection_area(b, a), expected)
+
+    def test_touching_lots_do_not_overlap(self):
+        a, b = _shape("A", _ring(0, 0, 1, 1)), _shape("B", _ring(1, 0, 2, 1))
+        self.assertEqual(intersection_area(a, b), 0)
+        corner = _shape("C", _ring(1, 1, 2, 2))
+        self.assertEqual(intersection_area(a, corner), 0)
+
+    def test_identical_and_contained(self):
+        a = _shape("A", _ring(0, 0, 2, 2))
+        self.assertArea(intersection_area(a, _shape("A2", _ring(0, 0, 2, 2))), a.area)
+        inner = _shape("I", _ring(0.5, 0.5, 1, 1))
+        self.assertArea(intersection_area(a, inner), inner.area)
+        # A shared edge plus containment
+        edge = _shape("E", _ring(0, 0, 1, 2))
+        self.assertArea(intersection_area(a, edge), edge.area)
+
+    def test_orientation_does_not_matter(self):
+        a = _shape("A", _ring(0, 0, 2, 2)[::-1])
+        b = _shape("B", _ring(1, 1, 3, 3))
+        self.assertGreater(a.area, 0)
+        self.assertArea(intersection_area(a, b), _shape("AB", _ring(1, 1, 2, 2)).area)
+
+    def test_holes(self):
+        donut = _shape("D", _ring(0, 0, 4, 4), _ring(1, 1, 3, 3)[::-1])
+        self.assertArea(donut.area, _shape("O", _ring(0, 0, 4, 4)).area - _shape("H", _ring(1, 1, 3, 3)).area)
+        self.assertEqual(intersection_area(donut, _shape("H", _ring(1.5, 1.5, 2.5, 2.5))), 0)
+        straddling = _shape("S", _ring(0.5, 1.5, 1.5, 2.5))
+        self.assertArea(intersection_area(donut, straddling), _shape("P", _ring(0.5, 1.5, 1, 2.5)).area)
+
+    def test_concave(self):
+        # U shape open to the north, crossed by a bar over both arms
+        corners = ((0, 0), (3, 0), (3, 3), (2, 3), (2, 1), (1, 1), (1, 3), (0, 3))
+        u = [[LON + x * UNIT, LAT + y * UNIT] for x, y in corners]
+        shape_u = Shape("U", _polygon(u + [u[0]]), ORIGIN)
+        bar = _shape("B", _ring(-1, 2, 4, 2.5))
+        arm = _shape("arm", _ring(0, 2, 1, 2.5)).area
+        self.assertArea(intersection_area(shape_u, bar), 2 * arm)
+
+    def test_far_apart(self):
+        self.assertEqual(intersection_area(_shape("A", _ring(0, 0, 1, 1)), _shape("B", _ring(5, 5, 6, 6))), 0)
+
+
+class TestCandidatePairs(FrappeTestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(11)
+        shapes = []
+        for i in range(150):
+            x, y = rng.uniform(0, 30), rng.uniform(0, 30)
+            shapes.append(_shape(f"L-{i}", _ring(x, y, x + rng.uniform(0.2, 2), y + rng.uniform(0.2, 2))))
+
+        def boxes_meet(a, b):
+            eps = topology.EPS
+            return (
+                a.box[0] <= b.box[2] + eps
+                and b.box[0] <= a.box[2] + eps
+                and a.box[1] <= b.box[3] + eps
+                and b.box[1] <= a.box[3] + eps
+            )
+
+        expected = {
+            (i, j)
+            for i in range(len(shapes))
+            for j in range(i + 1, len(shapes))
+            if boxes_meet(shapes[i], shapes[j])
+        }
+        found = {tuple(sorted(pair)) for pair in candidate_pairs(shapes)}
+        self.assertEqual(found, expected)
+        self.assertEqual(len(candidate_pairs(shapes)), len(found))
+
+
+class TestFindIssues(FrappeTestCase):
+    """Plan of 4 x 1 units: touching Lots, a half overlap, a near duplicate and an empty strip."""
+
+    lots = {
+        "L-1": _ring(0, 0, 1, 1),
+        "L-2": _ring(1, 0, 2, 1),
+        "L-3": _ring(1.5, 0, 2.5, 1),
+        "L-4": _ring(0, 0, 1, 0.98),
+    }
+    plan = _ring(0, 0, 4, 1)
+
+    def _row(self, name, ring):
+        feature = {"type": "Feature", "properties": {}, "geometry": _polygon(ring)}
+        geometry = {"type": "FeatureCollection", "features": [feature]}
+        box = bounds(geometry)
+        return frappe._dict(
+            reference_name=name,
+            geometry=json.dumps(geometry),
+            min_lon=box[0],
+            min_lat=box[1],
+            max_lon=box[2],
+            max_lat=box[3],
+        )
+
+    def _stored(self, doctype, names):
+        source = self.lots if doctype == "Lot" else {"_Test Plan": self.plan}
+        return [self._row(name, source[name]) for name in names if name in source]
+
+    def _find_issues(self):
+        with (
+            patch.object(topology, "_stored", side_effect=self._stored),
+            patch.object(topology, "_thresholds", return_value=dict(DEFAULTS)),
+            patch.object(frappe, "get_all", return_value=list(self.lots)),
+        ):
+            return topology.find_issues("_Test Plan")
+
+    def test_overlap_duplicate_and_gap(self):
+        result = self._find_issues()
+        unit = _shape("unit", _ring(0, 0, 1, 1)).area
+        findings = {(f["finding_type"], f["lot_a"], f["lot_b"]): f for f in result["findings"]}
+        self.assertEqual(
+            set(findings),
+            {("Near Duplicate", "L-1", "L-4"), ("Overlap", "L-2", "L-3"), ("Coverage Gap", None, None)},
+        )
+        self.assertAlmostEqual(findings[("Overlap", "L-2", "L-3")]["overlap_pct"], 50, places=1)
+        self.assertAlmostEqual(findings[("Near Duplicate", "L-1", "L-4")]["overlap_pct"], 100, places=1)
+        # The Lots cover 2.5 of the Plan's 4 units
+        gap = findings[("Coverage Gap", None, None)]
+        self.assertAlmostEqual(gap["area_sqm"] / unit, 1.5, places=3)
+        self.assertAlmostEqual(gap["overlap_pct"], 37.5, places=1)
+        self.assertEqual(result["lots"], 4)
+
+    def test_fully_covered_plan_has_no_gap(self):
+        self.lots = {"L-1": _ring(0, 0, 2, 1), "L-2": _ring(2, 0, 4, 1)}
+        result = self._find_issues()
+        self.assertEqual(result["findings"], [])
+        self.assertEqual(result["pairs_checked"], 1)
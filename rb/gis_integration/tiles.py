@@ -0,0 +1,342 @@
+"""Mapbox Vector Tiles for the geo-enabled DocTypes, built from the GIS Geometry store.
+
+Tiles are requested as `get_tile?doctype=Lot&z={z}&x={x}&y={y}` (see `tile_url` in
+`gis_get_client_config`). Geometries are projected to Web Mercator tile coordinates,
+clipped to the tile plus a small buffer and simplified in tile units, so the amount of
+detail follows the zoom level. Below the collection's `map.geometry_min_zoom` features
+are sent as centroid points. Attributes come from `map.tile_properties`.
+
+Encoded tiles are cached in Redis per permission scope (users whose read restrictions
+are identical share entries). Writing or deleting a geometry drops the cached tiles it
+touches; at zoom levels where a geometry covers too many tiles, that zoom's generation
+is bumped instead. Bulk writers drop the whole layer with `invalidate_layer`.
+"""
+
+import hashlib
+import json
+import math
+import mimetypes
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import frappe
+from frappe import _
+from frappe.desk.reportview import get_match_cond
+
+from . import geometry_store, mvt, sync_engine
+from .geometry import douglas_peucker
+from .settings import DEFAULT_GEOMETRY_MIN_ZOOM, get_doctype_config
+
+
+EXTENT = 4096
+BUFFER = 64
+MAX_ZOOM = 22
+MAX_TILE_FEATURES = 10000
+# Douglas-Peucker tolerance in tile units (EXTENT units per tile)
+DEFAULT_SIMPLIFY_UNITS = 4
+DEFAULT_TILE_CACHE_TTL = 3600
+# Above this many tiles at one zoom, invalidation bumps that zoom's generation instead
+MAX_INVALIDATE_TILES = 64
+MAX_LAT = 85.0511287798
+
+mimetypes.add_type("application/vnd.mapbox-vector-tile", ".mvt")
+
+
+def tile_url(doctype: str) -> str:
+    """URL template for Leaflet/MapLibre vector tile layers."""
+    method = "/api/method/rb.gis_integration.tiles.get_tile"
+    return f"{method}?doctype={quote(doctype)}&z={{z}}&x={{x}}&y={{y}}"
+
+
+def _world(lon: float, lat: float) -> Tuple[float, float]:
+    """Web Mercator position in [0, 1] x [0, 1] (y grows southwards)."""
+    lat = max(min(lat, MAX_LAT), -MAX_LAT)
+    s = math.sin(math.radians(lat))
+    return (lon + 180.0) / 360.0, 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+
+
+def _lat_of(world_y: float) -> float:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * world_y))))
+
+
+def tile_bounds(z: int, x: int, y: int, buffer: int = 0) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of a tile in degrees, grown by `buffer` tile units."""
+    n = 2 ** z
+    pad = buffer / EXTENT
+    west = (x - pad) / n * 360.0 - 180.0
+    east = (x + 1 + pad) / n * 360.0 - 180.0
+    north = _lat_of(max((y - pad) / n, 0.0))
+    south = _lat_of(min((y + 1 + pad) / n, 1.0))
+    return west, south, east, north
+
+
+def _layer_config(doctype: str) -> Dict[str, Any]:
+    return (get_doctype_config(doctype) or {}).get("map") or {}
+
+
+def _generation_key(doctype: str, z: Optional[int] = None) -> str:
+    # Raw Redis counters (INCRBY), so they are read with get() rather than the pickling get_value()
+    suffix = "" if z is None else f":{z}"
+    return frappe.cache().make_key(f"gis:tile_gen:{doctype}{suffix}")
+
+
+def _generation(doctype: str, z: int) -> str:
+    """Cache generation of one zoom level: the layer's and the zoom's own counter."""
+    cache = frappe.cache()
+    layer = int(cache.get(_generation_key(doctype)) or 0)
+    zoom = int(cache.get(_generation_key(doctype, z)) or 0)
+    return f"{layer}.{zoom}"
+
+
+def _tile_key(doctype: str, z: int, x: int, y: int, generation: Optional[str] = None) -> str:
+    if generation is None:
+        generation = _generation(doctype, z)
+    return f"gis:tile:{doctype}:{generation}:{z}:{x}:{y}"
+
+
+def _permission_scope(doctype: str) -> str:
+    """Users with identical read restrictions on the DocType share cached tiles."""
+    return hashlib.sha1(get_match_cond(doctype).encode("utf-8")).hexdigest()[:16]
+
+
+@frappe.whitelist()
+def get_tile(doctype: str, z: int, x: int, y: int):
+    """Serve one vector tile (binary MVT) for a geo-enabled DocType."""
+    if not sync_engine.is_geo_doctype(doctype):
+        frappe.throw(_("GIS geometry is not stored for {0}").format(doctype))
+    frappe.has_permission(doctype, "read", throw=True)
+    z, x, y = int(z), int(x), int(y)
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        frappe.throw(_("Invalid tile {0}/{1}/{2}").format(z, x, y))
+
+    cfg = _layer_config(doctype)
+    key = _tile_key(doctype, z, x, y)
+    scope = _permission_scope(doctype)
+    data = frappe.cache().hget(key, scope)
+    if data is None:
+        data = build_tile(doctype, z, x, y, cfg)
+        cache = frappe.cache()
+        cache.hset(key, scope, data)
+        cache.expire(cache.make_key(key), int(cfg.get("tile_cache_ttl") or DEFAULT_TILE_CACHE_TTL))
+
+    frappe.response["type"] = "binary"
+    frappe.response["filename"] = f"{z}-{x}-{y}.mvt"
+    frappe.response["filecontent"] = data
+
+
+def build_tile(doctype: str, z: int, x: int, y: int, cfg: Optional[Dict[str, Any]] = None) -> bytes:
+    """Encode the tile for the current user (permissions and list restrictions apply)."""
+    cfg = cfg if cfg is not None else _layer_config(doctype)
+    with_geometry = z >= int(cfg.get("geometry_min_zoom") or DEFAULT_GEOMETRY_MIN_ZOOM)
+    west, south, east, north = tile_bounds(z, x, y, BUFFER)
+    rows = geometry_store.get_in_bbox(doctype, west, south, east, north, MAX_TILE_FEATURES, with_geometry)
+    names = [row.reference_name for row in rows]
+    attributes = _tile_attributes(doctype, names, cfg.get("tile_properties") or [])
+    project = _projector(z, x, y)
+    tolerance = float(cfg.get("tile_simplify_units") or DEFAULT_SIMPLIFY_UNITS)
+
+    features: List[Dict[str, Any]] = []
+    for row in rows:
+        props = attributes.get(row.reference_name)
+        if props is None:
+            continue
+        if not with_geometry:
+            if row.centroid_lon is None:
+                continue
+            px, py = project((row.centroid_lon, row.centroid_lat))
+            if _in_buffer((px, py)):
+                point = (round(px), round(py))
+                features.append({"type": mvt.POINT, "parts": [[point]], "properties": props})
+            continue
+        fc = json.loads(row.geometry or "{}")
+        for feat in fc.get("features") or []:
+            if feat.get("geometry"):
+                features.extend(_tile_features(feat["geometry"], project, tolerance, props))
+
+    if not features:
+        return b""
+    layer = mvt.encode_layer(cfg.get("tile_layer") or frappe.scrub(doctype), features, EXTENT)
+    return mvt.encode_tile([layer])
+
+
+def _tile_attributes(doctype: str, names: List[str], fields: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Attributes per readable document; documents the user cannot read are absent."""
+    out: Dict[str, Dict[str, Any]] = {}
+    fields = [f for f in fields if f != "name"]
+    for start in range(0, len(names), 1000):
+        for row in frappe.get_list(
+            doctype,
+            filters={"name": ["in", names[start : start + 1000]]},
+            fields=["name", *fields],
+            limit_page_length=0,
+        ):
+            props = {"name": row.name}
+            for f in fields:
+                value = row.get(f)
+                if value is not None and not isinstance(value, (str, int, float, bool)):
+                    value = str(value)
+                props[f] = value
+            out[row.name] = props
+    return out
+
+
+def _projector(z: int, x: int, y: int):
+    n = 2 ** z
+
+    def project(p) -> Tuple[float, float]:
+        wx, wy = _world(p[0], p[1])
+        return (wx * n - x) * EXTENT, (wy * n - y) * EXTENT
+
+    return project
+
+
+def _in_buffer(p: Tuple[float, float]) -> bool:
+    return -BUFFER <= p[0] <= EXTENT + BUFFER and -BUFFER <= p[1] <= EXTENT + BUFFER
+
+
+def _clip_ring(points: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Sutherland-Hodgman clip of a ring against the buffered tile square."""
+    lo, hi = -BUFFER, EXTENT + BUFFER
+    edges = (
+        (lambda p: p[0] >= lo, lambda a, b: _cross_x(a, b, lo)),
+        (lambda p: p[0] <= hi, lambda a, b: _cross_x(a, b, hi)),
+        (lambda p: p[1] >= lo, lambda a, b: _cross_y(a, b, lo)),
+        (lambda p: p[1] <= hi, lambda a, b: _cross_y(a, b, hi)),
+    )
+    out = points
+    for inside, intersect in edges:
+        if not out:
+            break
+        src, out = out, []
+        prev = src[-1]
+        for cur in src:
+            if inside(cur):
+                if not inside(prev):
+                    out.append(intersect(prev, cur))
+                out.append(cur)
+            elif inside(prev):
+                out.append(intersect(prev, cur))
+            prev = cur
+    return out
+
+
+def _cross_x(a, b, x):
+    t = (x - a[0]) / (b[0] - a[0])
+    return x, a[1] + t * (b[1] - a[1])
+
+
+def _cross_y(a, b, y):
+    t = (y - a[1]) / (b[1] - a[1])
+    return a[0] + t * (b[0] - a[0]), y
+
+
+def _to_ints(points, tolerance: float, closed: bool) -> List[Tuple[int, int]]:
+    if closed and points and points[0] != points[-1]:
+        points = points + [points[0]]
+    reduced = douglas_peucker([list(p) for p in points], tolerance) if len(points) > 2 else points
+    out: List[Tuple[int, int]] = []
+    for p in reduced:
+        q = (round(p[0]), round(p[1]))
+        if not out or q != out[-1]:
+            out.append(q)
+    if closed and len(out) > 1 and out[0] == out[-1]:
+        out.pop()
+    return out
+
+
+def _tile_features(
+    geometry: Dict[str, Any], project, tolerance: float, props: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    t = geometry.get("type")
+    coords = geometry.get("coordinates") or []
+    if t == "GeometryCollection":
+        out = []
+        for g in geometry.get("geometries") or []:
+            out.extend(_tile_features(g, project, tolerance, props))
+        return out
+
+    if t in ("Point", "MultiPoint"):
+        points = [project(p) for p in ([coords] if t == "Point" else coords)]
+        parts = [[(round(px), round(py)) for px, py in points if _in_buffer((px, py))]]
+        return [{"type": mvt.POINT, "parts": parts, "properties": props}] if parts[0] else []
+
+    if t in ("LineString", "MultiLineString"):
+        lines = [coords] if t == "LineString" else coords
+        parts = [_to_ints([project(p) for p in line], tolerance, closed=False) for line in lines]
+        parts = [part for part in parts if len(part) >= 2]
+        return [{"type": mvt.LINESTRING, "parts": parts, "properties": props}] if parts else []
+
+    if t in ("Polygon", "MultiPolygon"):
+        polygons = [coords] if t == "Polygon" else coords
+        parts: List[List[Tuple[int, int]]] = []
+        for poly in polygons:
+            for index, ring in enumerate(poly or []):
+                clipped = _clip_ring([project(p) for p in ring])
+                part = _to_ints(clipped, tolerance, closed=True) if len(clipped) >= 3 else []
+                area = mvt.ring_area(part) if len(part) >= 3 else 0
+                if abs(area) < 1:
+                    if index == 0:
+                        break  # shell collapsed at this zoom; its holes go with it
+                    continue
+                # Exterior rings positive, holes negative (MVT winding order)
+                if (area > 0) != (index == 0):
+                    part.reverse()
+                parts.append(part)
+        return [{"type": mvt.POLYGON, "parts": parts, "properties": props}] if parts else []
+
+    return []
+
+
+def _tile_range(z: int, box: Tuple[float, float, float, float]) -> Tuple[int, int, int, int]:
+    n = 2 ** z
+    pad = BUFFER / EXTENT
+    (x0, y0), (x1, y1) = _world(box[0], box[3]), _world(box[2], box[1])
+
+    def clamp(v: float) -> int:
+        return min(max(int(math.floor(v)), 0), n - 1)
+
+    return clamp(x0 * n - pad), clamp(y0 * n - pad), clamp(x1 * n + pad), clamp(y1 * n + pad)
+
+
+def invalidate_layer(doctype: str):
+    """Drop every cached tile of a DocType by moving to a new key generation."""
+    frappe.cache().incrby(_generation_key(doctype), 1)
+
+
+def invalidate_tiles(doctype: str, *boxes: Optional[Tuple[float, float, float, float]]):
+    """Drop cached tiles overlapping any of the given (west, south, east, north) boxes.
+
+    Each zoom level is handled on its own: up to MAX_INVALIDATE_TILES tiles are deleted
+    by key, and a zoom level the boxes cover more of moves to a new generation, leaving
+    the cached tiles of the other zoom levels alone.
+    """
+    boxes = tuple(b for b in boxes if b and None not in b)
+    if not boxes:
+        return
+    cache = frappe.cache()
+    keys = []
+    for z in range(MAX_ZOOM + 1):
+        ranges = [_tile_range(z, box) for box in boxes]
+        if sum((x1 - x0 + 1) * (y1 - y0 + 1) for x0, y0, x1, y1 in ranges) > MAX_INVALIDATE_TILES:
+            cache.incrby(_generation_key(doctype, z), 1)
+            continue
+        generation = _generation(doctype, z)
+        keys.extend(
+            {
+                _tile_key(doctype, z, tx, ty, generation)
+                for x0, y0, x1, y1 in ranges
+                for tx in range(x0, x1 + 1)
+                for ty in range(y0, y1 + 1)
+            }
+        )
+    if keys:
+        cache.delete_value(keys)
+
+
+def on_document_update(doc, method=None):
+    """doc_events on_update: tile attributes may have changed, so drop the document's tiles."""
+    if not _layer_config(doc.doctype).get("tile_properties"):
+        return
+    box = geometry_store.get_bbox(doc.doctype, doc.name)
+    frappe.db.after_commit.add(partial(invalidate_tiles, doc.doctype, box))
@@ -0,0 +1,356 @@
+"""Topology QA for the Lots of a Plan: overlaps, near-duplicates and coverage gaps.
+
+Lot polygons come from the GIS Geometry store and are projected to equal-area metres
+(`area.project`). Candidate pairs are found with a sort-and-sweep over the bounding
+boxes: boxes are sorted by west edge, and each one is compared only with the boxes
+still open at that edge. That is O(n log n) plus the number of touching neighbours,
+instead of n² pairs. Each candidate gets an exact intersection area (Green's theorem
+over the parts of each boundary inside the other). Shared edges are counted once, so
+lots that only touch have zero overlap.
+
+Per pair: an overlap of at least `min_overlap_sqm` is an "Overlap". When the overlap
+is at least `duplicate_ratio` of the union (intersection over union) it is a "Near
+Duplicate". The Plan's own polygon minus the Lots' covered area (sum of areas minus
+pairwise overlaps) is a "Coverage Gap" when larger than `min_gap_sqm` and `gap_ratio`
+of the Plan. Thresholds come from `topology` in the Lot collection config.
+
+Findings are kept as Lot Topology Finding records. A re-run updates them in place,
+resolves the open ones that are gone and keeps the ones a reviewer ignored.
+"""
+
+import heapq
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import frappe
+from frappe import _
+from frappe.utils import flt, now_datetime
+
+from .area import iter_polygons, project
+from .geometry_store import BBOX_FIELDS, STORE_DOCTYPE
+from .settings import get_doctype_config
+
+
+FINDING_DOCTYPE = "Lot Topology Finding"
+PROGRESS_EVENT = "gis_topology_progress"
+OPEN_STATUSES = ("Open", "Confirmed")
+DEFAULTS = {"min_overlap_sqm": 1.0, "duplicate_ratio": 0.9, "min_gap_sqm": 10.0, "gap_ratio": 0.005}
+# Metres; vertices are stored to 7 decimals (about 1 cm)
+EPS = 1e-4
+
+Edge = Tuple[float, float, float, float]
+
+
+class Shape:
+    """A (multi)polygon in local metres: oriented edges, bounding box and area."""
+
+    def __init__(self, name: str, geometry: Any, origin: Tuple[float, float]):
+        self.name = name
+        self.edges: List[Edge] = []
+        for rings in iter_polygons(geometry):
+            for k, ring in enumerate(rings):
+                points = [project(p[0], p[1]) for p in ring]
+                points = [(x - origin[0], y - origin[1]) for x, y in points]
+                if len(points) > 1 and points[0] == points[-1]:
+                    points.pop()
+                if len(points) < 3:
+                    continue
+                # Shells counter-clockwise, holes clockwise
+                if (_signed_area(points) > 0) != (k == 0):
+                    points.reverse()
+                self.edges.extend(
+                    (*points[i], *points[(i + 1) % len(points)]) for i in range(len(points))
+                )
+        self.area = sum(x1 * y2 - x2 * y1 for x1, y1, x2, y2 in self.edges) / 2
+        xs = [e[0] for e in self.edges] or [0.0]
+        ys = [e[1] for e in self.edges] or [0.0]
+        self.box = (min(xs), min(ys), max(xs), max(ys))
+
+
+def _signed_area(points: List[Tuple[float, float]]) -> float:
+    return sum(
+        points[i][0] * points[(i + 1) % len(points)][1] - points[(i + 1) % len(points)][0] * points[i][1]
+        for i in range(len(points))
+    ) / 2
+
+
+def _inside(x: float, y: float, edges: List[Edge]) -> bool:
+    """Even-odd point-in-polygon over all rings (holes included)."""
+    inside = False
+    for x1, y1, x2, y2 in edges:
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+    return inside
+
+
+def _on_edge(x: float, y: float, edges: List[Edge]) -> Optional[Edge]:
+    """The edge that (x, y) lies on (within EPS), if any."""
+    for e in edges:
+        x1, y1, x2, y2 = e
+        dx, dy = x2 - x1, y2 - y1
+        length2 = dx * dx + dy * dy
+        if not length2:
+            continue
+        t = ((x - x1) * dx + (y - y1) * dy) / length2
+        if -1e-9 <= t <= 1 + 1e-9:
+            px, py = x1 + t * dx - x, y1 + t * dy - y
+            if px * px + py * py <= EPS * EPS:
+                return e
+    return None
+
+
+def _split_params(edge: Edge, others: List[Edge]) -> List[float]:
+    """Parameters along `edge` where it meets any of `others` (crossings and touches)."""
+    ax1, ay1, ax2, ay2 = edge
+    dx, dy = ax2 - ax1, ay2 - ay1
+    length2 = dx * dx + dy * dy
+    lo_x, hi_x = min(ax1, ax2) - EPS, max(ax1, ax2) + EPS
+    lo_y, hi_y = min(ay1, ay2) - EPS, max(ay1, ay2) + EPS
+    params = [0.0, 1.0]
+    for bx1, by1, bx2, by2 in others:
+        if max(bx1, bx2) < lo_x or min(bx1, bx2) > hi_x or max(by1, by2) < lo_y or min(by1, by2) > hi_y:
+            continue
+        ex, ey = bx2 - bx1, by2 - by1
+        denom = dx * ey - dy * ex
+        if abs(denom) > 1e-12:
+            t = ((bx1 - ax1) * ey - (by1 - ay1) * ex) / denom
+            u = ((bx1 - ax1) * dy - (by1 - ay1) * dx) / denom
+            if -1e-9 <= t <= 1 + 1e-9 and -1e-9 <= u <= 1 + 1e-9:
+                params.append(min(max(t, 0.0), 1.0))
+        else:
+            # Parallel: split at the other edge's endpoints when they lie on this edge
+            for px, py in ((bx1, by1), (bx2, by2)):
+                t = ((px - ax1) * dx + (py - ay1) * dy) / length2
+                cx, cy = ax1 + t * dx - px, ay1 + t * dy - py
+                if 0 < t < 1 and cx * cx + cy * cy <= EPS * EPS:
+                    params.append(t)
+    return sorted(params)
+
+
+def _boundary_inside(a: Shape, b: Shape, keep_shared: bool) -> float:
+    """Twice the Green's-theorem contribution of the parts of a's boundary inside b.
+
+    Parts lying on b's boundary count only when `keep_shared` is set and both run the
+    same way (a shared boundary of the intersection); opposite runs are where two
+    shapes touch from outside.
+    """
+    total = 0.0
+    for edge in a.edges:
+        ax1, ay1, ax2, ay2 = edge
+        dx, dy = ax2 - ax1, ay2 - ay1
+        params = _split_params(edge, b.edges)
+        for t0, t1 in zip(params, params[1:]):
+            if t1 - t0 < 1e-12:
+                continue
+            x0, y0 = ax1 + t0 * dx, ay1 + t0 * dy
+            x1, y1 = ax1 + t1 * dx, ay1 + t1 * dy
+            mx, my = (x0 + x1) / 2, (y0 + y1) / 2
+            shared = _on_edge(mx, my, b.edges)
+            if shared is not None:
+                same_way = (shared[2] - shared[0]) * dx + (shared[3] - shared[1]) * dy > 0
+                if not (keep_shared and same_way):
+                    continue
+            elif not _inside(mx, my, b.edges):
+                continue
+            total += x0 * y1 - x1 * y0
+    return total
+
+
+def intersection_area(a: Shape, b: Shape) -> float:
+    """Area (m²) of the intersection of two shapes; both may be non-convex with holes."""
+    if a.box[0] > b.box[2] or b.box[0] > a.box[2] or a.box[1] > b.box[3] or b.box[1] > a.box[3]:
+        return 0.0
+    return max((_boundary_inside(a, b, True) + _boundary_inside(b, a, False)) / 2, 0.0)
+
+
+def candidate_pairs(shapes: List[Shape]) -> List[Tuple[int, int]]:
+    """Index pairs whose bounding boxes overlap, by sort-and-sweep along x."""
+    order = sorted(range(len(shapes)), key=lambda i: shapes[i].box[0])
+    active: List[Tuple[float, int]] = []  # min-heap of (east edge, index)
+    pairs = []
+    for i in order:
+        box = shapes[i].box
+        while active and active[0][0] < box[0] - EPS:
+            heapq.heappop(active)
+        for _east, j in active:
+            other = shapes[j].box
+            if other[1] <= box[3] + EPS and box[1] <= other[3] + EPS:
+                pairs.append((j, i))
+        heapq.heappush(active, (box[2], i))
+    return pairs
+
+
+def _thresholds() -> Dict[str, float]:
+    cfg = (get_doctype_config("Lot") or {}).get("topology") or {}
+    return {key: flt(cfg.get(key, default)) for key, default in DEFAULTS.items()}
+
+
+def _stored(doctype: str, names: List[str]) -> List[Dict[str, Any]]:
+    if not names:
+        return []
+    return frappe.get_all(
+        STORE_DOCTYPE,
+        filters={"reference_doctype": doctype, "reference_name": ["in", names]},
+        fields=["reference_name", "geometry", *BBOX_FIELDS],
+    )
+
+
+def find_issues(plan: str) -> Dict[str, Any]:
+    """Topology findings for the Lots of one Plan (nothing is written)."""
+    limits = _thresholds()
+    lots = _stored("Lot", frappe.get_all("Lot", filters={"plan": plan}, pluck="name"))
+    plan_rows = _stored("Plan", [plan])
+    boxes = [row for row in [*lots, *plan_rows] if row.min_lon is not None]
+    if not boxes:
+        return {"plan": plan, "lots": 0, "pairs_checked": 0, "findings": []}
+    origin = project(min(r.min_lon for r in boxes), min(r.min_lat for r in boxes))
+
+    shapes = []
+    for row in lots:
+        try:
+            shape = Shape(row.reference_name, json.loads(row.geometry or "null"), origin)
+        except ValueError:
+            continue
+        if shape.edges:
+            shapes.append(shape)
+
+    findings, overlap_total = [], 0.0
+    pairs = candidate_pairs(shapes)
+    for i, j in pairs:
+        a, b = sorted((shapes[i], shapes[j]), key=lambda s: s.name)
+        overlap = intersection_area(a, b)
+        overlap_total += overlap
+        if overlap < limits["min_overlap_sqm"]:
+            continue
+        union = a.area + b.area - overlap
+        smaller = min(a.area, b.area)
+        duplicate = bool(union) and overlap / union >= limits["duplicate_ratio"]
+        findings.append(
+            {
+                "finding_type": "Near Duplicate" if duplicate else "Overlap",
+                "lot_a": a.name,
+                "lot_b": b.name,
+                "area_sqm": round(overlap, 2),
+                "overlap_pct": round(overlap * 100 / smaller, 2) if smaller else 0,
+            }
+        )
+
+    if plan_rows and plan_rows[0].geometry:
+        plan_shape = Shape(plan, json.loads(plan_rows[0].geometry), origin)
+        gap = plan_shape.area - (sum(s.area for s in shapes) - overlap_total)
+        if plan_shape.area and gap >= max(limits["min_gap_sqm"], limits["gap_ratio"] * plan_shape.area):
+            findings.append(
+                {
+                    "finding_type": "Coverage Gap",
+                    "lot_a": None,
+                    "lot_b": None,
+                    "area_sqm": round(gap, 2),
+                    "overlap_pct": round(gap * 100 / plan_shape.area, 2),
+                }
+            )
+
+    return {"plan": plan, "lots": len(shapes), "pairs_checked": len(pairs), "findings": findings}
+
+
+def _key(row: Dict[str, Any]) -> Tuple[str, str, bool]:
+    return (row.get("lot_a") or "", row.get("lot_b") or "", row.get("finding_type") == "Coverage Gap")
+
+
+def check_plan(plan: str) -> Dict[str, Any]:
+    """Run the topology check for a Plan and reconcile its Lot Topology Finding records."""
+    result = find_issues(plan)
+    now = now_datetime()
+    existing = {
+        _key(row): row
+        for row in frappe.get_all(
+            FINDING_DOCTYPE,
+            filters={"plan": plan},
+            fields=["name", "finding_type", "lot_a", "lot_b", "status"],
+        )
+    }
+    created, updated = 0, 0
+    for finding in result["findings"]:
+        row = existing.pop(_key(finding), None)
+        if row:
+            values = {**finding, "checked_at": now}
+            if row.status == "Resolved":
+                values["status"] = "Open"
+            frappe.db.set_value(FINDING_DOCTYPE, row.name, values)
+            updated += 1
+        else:
+            frappe.get_doc(
+                {
+                    "doctype": FINDING_DOCTYPE,
+                    "plan": plan,
+                    "status": "Open",
+                    "detected_at": now,
+                    "checked_at": now,
+                    **finding,
+                }
+            ).insert(ignore_permissions=True)
+            created += 1
+
+    resolved = 0
+    for row in existing.values():
+        if row.status in OPEN_STATUSES:
+            frappe.db.set_value(FINDING_DOCTYPE, row.name, {"status": "Resolved", "checked_at": now})
+            resolved += 1
+
+    summary = {k: v for k, v in result.items() if k != "findings"}
+    summary.update(
+        {
+            "findings": len(result["findings"]),
+            "created": created,
+            "updated": updated,
+            "resolved": resolved,
+        }
+    )
+    return summary
+
+
+@frappe.whitelist()
+def start_topology_check(plan: str) -> Dict[str, Any]:
+    """Check a Plan's Lot topology in a background job.
+
+    The summary is pushed to the caller over the `gis_topology_progress` realtime event.
+    """
+    frappe.only_for(["System Manager", "GIS Operator", "Planning Editor"])
+    if not frappe.db.exists("Plan", plan):
+        frappe.throw(_("Plan not found: {0}").format(plan))
+    job_id = f"gis_topology::{plan}"
+    frappe.enqueue(
+        "rb.gis_integration.topology.run_topology_check",
+        queue="long",
+        timeout=3600,
+        job_id=job_id,
+        deduplicate=True,
+        plan=plan,
+        user=frappe.session.user,
+    )
+    return {"job_id": job_id}
+
+
+def run_topology_check(plan: str, user: Optional[str] = None):
+    """Background job for `start_topology_check`."""
+    try:
+        summary = check_plan(plan)
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), f"Lot topology check failed for {plan}")
+        summary = {"plan": plan, "status": "failed", "error": str(e)}
+    else:
+        summary["status"] = "completed"
+    frappe.publish_realtime(PROGRESS_EVENT, summary, user=user)
+
+
+def run_all_topology_checks():
+    """Scheduler hook: re-check every Plan that has Lots."""
+    plans = frappe.get_all("Lot", filters={"plan": ["is", "set"]}, distinct=True, pluck="plan")
+    for plan in plans:
+        try:
+            check_plan(plan)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), f"Lot topology check failed for {plan}")
@@ -44,9 +44,21 @@ doc_events = {
 	"Lot": {
 		"on_update": "rb.planning.doctype.lot.lot.on_update",
 		"after_delete": "rb.planning.doctype.lot.lot.after_delete"
-	}
+	},
+	# גאומטריות נשמרות ב-GIS Geometry ולא בשורת המסמך; חל על כל DocType שמוגדר כשכבה ב-config.json
+	"*": {
+		"validate": "rb.gis_integration.geometry_store.discard_client_geometry",
+		"on_update": [
+			"rb.gis_integration.tiles.on_document_update",
+			"rb.gis_integration.fetch_queue.on_document_update",
+		],
+		"on_trash": "rb.gis_integration.geometry_store.on_trash",
+	},
 }
 
+# Shared GIS map helpers (rb.gis.*) for the form and list scripts below
+app_include_js = "gis.bundle.js"
+
 # Client scripts
 doctype_js = {
 	"Lot": "public/js/lot_form.js",
@@ -56,5 +68,27 @@ doctype_js = {
 }
 
 doctype_list_js = {
+	"Lot": "public/js/lot_list.js",
 	"Fixture Compensation": "public/js/fixture_compensation_list.js",
 }
+
+scheduler_events = {
+	"daily": [
+		# Re-check Lot overlaps, near-duplicates and coverage gaps of every Plan with Lots
+		"rb.gis_integration.topology.run_all_topology_checks",
+	],
+	"hourly": [
+		# Pull only features changed in GIS since the last run (collections with updated_at_property)
+		"rb.gis_integration.sync_jobs.run_incremental_geometry_syncs",
+	],
+	"cron": {
+		# Requeue chunked GIS syncs whose background job died mid-run
+		"*/10 * * * *": [
+			"rb.gis_integration.sync_jobs.resume_stalled_geometry_syncs",
+		],
+		# Flush geometry fetches queued by document saves that no flush job picked up
+		"* * * * *": [
+			"rb.gis_integration.fetch_queue.flush_pending_fetches",
+		],
+	},
+}
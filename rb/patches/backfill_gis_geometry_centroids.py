@@ -0,0 +1,53 @@
+import json
+
+import frappe
+
+from rb.gis_integration.geometry import bounds, centroid
+
+BATCH_SIZE = 500
+
+
+def execute():
+	"""Fill bounding box and centroid columns for GIS Geometry rows stored before they existed.
+
+	Rows without coordinates keep NULL columns; pages are read by name so they are not
+	picked up again.
+	"""
+	last = None
+	while True:
+		filters = [["centroid_lon", "is", "not set"], ["geometry", "is", "set"]]
+		if last:
+			filters.append(["name", ">", last])
+		rows = frappe.get_all(
+			"GIS Geometry",
+			filters=filters,
+			fields=["name", "geometry"],
+			order_by="name asc",
+			limit_page_length=BATCH_SIZE,
+		)
+		if not rows:
+			break
+		last = rows[-1].name
+		for row in rows:
+			try:
+				fc = json.loads(row.geometry)
+			except ValueError:
+				continue
+			box = bounds(fc)
+			center = centroid(fc)
+			if not box or not center:
+				continue
+			frappe.db.set_value(
+				"GIS Geometry",
+				row.name,
+				{
+					"min_lon": box[0],
+					"min_lat": box[1],
+					"max_lon": box[2],
+					"max_lat": box[3],
+					"centroid_lon": center[0],
+					"centroid_lat": center[1],
+				},
+				update_modified=False,
+			)
+		frappe.db.commit()
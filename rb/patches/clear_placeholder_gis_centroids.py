@@ -0,0 +1,12 @@
+import frappe
+
+
+def execute():
+	"""Reset the 0/0 centroids that an earlier backfill gave rows without coordinates."""
+	frappe.db.sql(
+		"""
+		UPDATE `tabGIS Geometry`
+		SET centroid_lon = NULL, centroid_lat = NULL
+		WHERE centroid_lon = 0 AND centroid_lat = 0 AND min_lon IS NULL
+		"""
+	)
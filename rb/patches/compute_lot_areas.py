@@ -0,0 +1,6 @@
+from rb.gis_integration.area import compute_areas
+
+
+def execute():
+	"""Fill computed_area_sqm for Lots whose geometry was stored before the field existed."""
+	compute_areas("Lot")
@@ -0,0 +1,35 @@
+import frappe
+
+from rb.gis_integration.geometry_store import save_geometry
+from rb.gis_integration.sync_engine import layer_doctypes
+
+BATCH_SIZE = 500
+
+
+def execute():
+	"""Copy geometries from the old `location` columns into GIS Geometry, then empty the columns."""
+	for doctype in layer_doctypes():
+		if not frappe.db.has_column(doctype, "location"):
+			continue
+
+		last_name = ""
+		while True:
+			rows = frappe.db.sql(
+				f"""SELECT name, location FROM `tab{doctype}`
+				WHERE name > %s AND IFNULL(location, '') != ''
+				ORDER BY name LIMIT %s""",
+				(last_name, BATCH_SIZE),
+				as_dict=True,
+			)
+			if not rows:
+				break
+			for row in rows:
+				try:
+					save_geometry(doctype, row.name, row.location)
+				except ValueError:
+					frappe.log_error(f"Unreadable geometry on {doctype} {row.name}", "GIS geometry migration")
+			last_name = rows[-1].name
+			frappe.db.commit()
+
+		frappe.db.sql(f"UPDATE `tab{doctype}` SET location = NULL WHERE location IS NOT NULL")
+		frappe.db.commit()
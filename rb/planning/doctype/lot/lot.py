@@ -4,36 +4,27 @@
 import frappe
 from frappe.model.document import Document
 
+
+# Geometry is fetched after commit by rb.gis_integration.fetch_queue (doc_events "*")
 class Lot(Document):
-	def validate(self):
-		# If Lot ID exists and no geometry yet, try to fetch quietly
-		try:
-			if getattr(self, "lot_id", None) and not getattr(self, "location", None):
-				from rb.gis_integration.api import fetch_lot_geometry
-				fetch_lot_geometry(self.name)
-		except Exception as e:
-			frappe.msgprint(f"Could not fetch geometry automatically: {e}", indicator="orange")
+	pass
+
+
+def _refresh_plan_totals(plans):
+	from rb.planning.doctype.plan.plan import update_total_area, update_total_lots
+
+	for plan in sorted(set(plans) - {None, ""}):
+		# The previous Plan may have been deleted or renamed since
+		if frappe.db.exists("Plan", plan):
+			update_total_area(plan)
+			update_total_lots(plan)
+
 
 def on_update(doc, method=None):
-    from rb.planning.doctype.plan.plan import update_total_area, update_total_lots
-    if doc.plan:
-        update_total_area(doc.plan)
-        update_total_lots(doc.plan)
-
-    # GIS sync: if Lot ID changed, enqueue geometry fetch
-    try:
-        if hasattr(doc, "lot_id") and doc.has_value_changed("lot_id") and doc.lot_id:
-            frappe.enqueue(
-                "rb.gis_integration.api.fetch_lot_geometry",
-                lot_name=doc.name,
-                queue="short",
-                timeout=30,
-            )
-    except Exception as e:
-        frappe.log_error(f"GIS enqueue error for Lot {doc.name}: {e}", "GIS Lot on_update")
+	# A Lot moved to another Plan (e.g. by the spatial join) also changes the old Plan's totals
+	previous = doc.get_doc_before_save()
+	_refresh_plan_totals([doc.plan, previous.plan if previous else None])
+
 
 def after_delete(doc, method=None):
-    from rb.planning.doctype.plan.plan import update_total_area, update_total_lots
-    if doc.plan:
-        update_total_area(doc.plan)
-        update_total_lots(doc.plan)
+	_refresh_plan_totals([doc.plan])
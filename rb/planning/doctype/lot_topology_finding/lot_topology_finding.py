@@ -0,0 +1,14 @@
+# Copyright (c) 2026, lotan souid and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+# Created and resolved by rb.gis_integration.topology; reviewers set status and notes
+class LotTopologyFinding(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Lot Topology Finding", ["plan", "status"])
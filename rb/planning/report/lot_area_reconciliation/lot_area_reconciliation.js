@@ -0,0 +1,29 @@
+// Copyright (c) 2026, lotan souid and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Lot Area Reconciliation"] = {
+  filters: [
+    {
+      fieldname: "plan",
+      label: __("Plan"),
+      fieldtype: "Link",
+      options: "Plan",
+    },
+    {
+      fieldname: "threshold_pct",
+      label: __("Deviation Threshold %"),
+      fieldtype: "Float",
+      default: 5,
+    },
+    {
+      fieldname: "chargeable_only",
+      label: __("Chargeable Lots Only"),
+      fieldtype: "Check",
+    },
+    {
+      fieldname: "include_missing",
+      label: __("Include Lots Without Geometry"),
+      fieldtype: "Check",
+    },
+  ],
+};
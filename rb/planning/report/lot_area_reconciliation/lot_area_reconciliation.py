@@ -0,0 +1,69 @@
+import frappe
+from frappe.utils import flt
+
+DEFAULT_THRESHOLD_PCT = 5
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    threshold = DEFAULT_THRESHOLD_PCT
+    if filters.threshold_pct not in (None, ""):
+        threshold = flt(filters.threshold_pct)
+
+    columns = [
+        {"label": "Lot", "fieldname": "name", "fieldtype": "Link", "options": "Lot", "width": 130},
+        {"label": "Lot ID", "fieldname": "lot_id", "fieldtype": "Data", "width": 120},
+        {"label": "Plan", "fieldname": "plan", "fieldtype": "Link", "options": "Plan", "width": 130},
+        {"label": "Chargeable", "fieldname": "chargeable", "fieldtype": "Check", "width": 100},
+        {"label": "Declared Area (sqm)", "fieldname": "area_sqm", "fieldtype": "Float", "width": 150},
+        {"label": "Computed Area (sqm)", "fieldname": "computed_area_sqm", "fieldtype": "Float", "width": 160},
+        {"label": "Difference (sqm)", "fieldname": "difference", "fieldtype": "Float", "width": 140},
+        {"label": "Deviation %", "fieldname": "deviation_pct", "fieldtype": "Percent", "width": 110},
+    ]
+
+    conditions = []
+    values = {"threshold": threshold}
+    if filters.plan:
+        conditions.append("lot.plan = %(plan)s")
+        values["plan"] = filters.plan
+    if filters.chargeable_only:
+        conditions.append("lot.chargeable = 1")
+
+    # Deviation relative to the computed area; lots without a declared area always qualify
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            lot.name,
+            lot.lot_id,
+            lot.plan,
+            lot.chargeable,
+            lot.area_sqm,
+            lot.computed_area_sqm,
+            IFNULL(lot.area_sqm, 0) - lot.computed_area_sqm AS difference,
+            ABS(IFNULL(lot.area_sqm, 0) - lot.computed_area_sqm) * 100
+                / lot.computed_area_sqm AS deviation_pct
+        FROM `tabLot` lot
+        WHERE {" AND ".join(["IFNULL(lot.computed_area_sqm, 0) > 0", *conditions])}
+        HAVING deviation_pct > %(threshold)s
+        ORDER BY deviation_pct DESC, lot.name
+        """,
+        values,
+        as_dict=True,
+    )
+
+    if filters.include_missing:
+        # No stored geometry yet: computed area is NULL or 0
+        rows.extend(
+            frappe.db.sql(
+                f"""
+                SELECT lot.name, lot.lot_id, lot.plan, lot.chargeable, lot.area_sqm
+                FROM `tabLot` lot
+                WHERE {" AND ".join(["IFNULL(lot.computed_area_sqm, 0) = 0", *conditions])}
+                ORDER BY lot.name
+                """,
+                values,
+                as_dict=True,
+            )
+        )
+
+    return columns, rows
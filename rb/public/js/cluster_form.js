@@ -3,6 +3,7 @@ const CLUSTER_BASEMAPS_FALLBACK = { default: { url: 'https://{s}.tile.openstreet
 let __cluster_basemaps = null;
 let __cluster_map_cfg = null;
 let __cluster_bg_key = 'default';
+let __cluster_tile_url = null; // vector tiles of all Cluster geometries (server-rendered)
 let __cluster_base_layer;
 
 frappe.ui.form.on('Cluster', {
@@ -10,15 +11,10 @@ frappe.ui.form.on('Cluster', {
     if (frm.doc.cluster_name) {
       frm.add_custom_button(__('Fetch Geometry from GIS'), () => fetch_geometry_from_gis(frm), __('GIS Actions'));
       frm.add_custom_button(__('Open Map (tileserv)'), () => open_tiles_map(frm), __('GIS Actions'));
-      if (!frm.doc.location) {
-        frm.dashboard.set_headline(__('No geometry loaded. Click "Fetch Geometry from GIS" to load.'));
-      } else {
-        try { const fc = (typeof frm.doc.location === 'string') ? JSON.parse(frm.doc.location) : frm.doc.location; render_geometry_on_form(frm, fc); } catch(e) {}
-      }
+      load_cluster_geometry(frm);
       frm.add_custom_button(__('Test GIS Connection'), () => test_gis_connection(frm), __('GIS Actions'));
       frm.add_custom_button(__('Cahnge To Background A'), () => toggle_cluster_background(frm, 'A'), __('GIS Actions'));
       frm.add_custom_button(__('Cahnge To Background B'), () => set_cluster_background(frm, 'B'), __('GIS Actions'));
-      if (!__cluster_geo_layer && !frm.doc.location) { setTimeout(() => fetch_geometry_from_gis(frm), 200); }
       ensure_cluster_client_cfg(() => setTimeout(() => set_geolocation_basemap(frm, 'location', __cluster_bg_key), 300));
     }
     if (frappe.user.has_role('System Manager')) {
@@ -33,6 +29,27 @@ frappe.ui.form.on('Cluster', {
   before_save(frm) {}
 });
 
+// Geometry lives in the GIS Geometry store; load it only when the form map renders
+function load_cluster_geometry(frm) {
+  if (frm.is_new()) return;
+  frappe.call({
+    method: 'rb.gis_integration.api.get_document_geometry',
+    args: { doctype: 'Cluster', name: frm.doc.name },
+    callback: (r) => {
+      if (!r || !r.message) {
+        frm.dashboard.set_headline(__('No geometry loaded. Click "Fetch Geometry from GIS" to load.'));
+        if (!__cluster_geo_layer) { setTimeout(() => fetch_geometry_from_gis(frm), 200); }
+        return;
+      }
+      try {
+        frm.doc.location = r.message;
+        frm.refresh_field('location');
+        render_geometry_on_form(frm, JSON.parse(r.message));
+      } catch (e) {}
+    }
+  });
+}
+
 function fetch_geometry_from_gis(frm) {
   frappe.show_alert({ message: __('Fetching geometry from GIS...'), indicator: 'blue' });
   frappe.call({
@@ -44,6 +61,7 @@ function fetch_geometry_from_gis(frm) {
           const fc = (typeof r.message === 'string') ? JSON.parse(r.message) : r.message;
           render_geometry_on_form(frm, fc);
           frm.doc.location = JSON.stringify(fc);
+          frm.refresh_field('location');
         }
       } catch (e) {
         console.error('Failed to render geometry', e);
@@ -92,7 +110,7 @@ function ensure_map(frm) {
     const el = document.getElementById(id);
     if (el && window.L) {
       __cluster_map = L.map(id);
-      ensure_cluster_client_cfg(() => { set_map_basemap(__cluster_map, __cluster_bg_key); apply_default_view(__cluster_map); });
+      ensure_cluster_client_cfg(() => { set_map_basemap(__cluster_map, __cluster_bg_key); apply_default_view(__cluster_map); add_cluster_tile_layer(__cluster_map); });
     }
   }
   return __cluster_map;
@@ -137,21 +155,19 @@ function open_tiles_map(frm) {
 // --- Helpers: config/basemaps/default view ---
 function ensure_cluster_client_cfg(cb) {
   if (__cluster_basemaps) return cb && cb();
-  frappe.call({ method: 'rb.gis_integration.api.gis_reload_config' })
-    .always(() => {
-      frappe.call({
-        method: 'rb.gis_integration.api.gis_get_client_config',
-        args: { doctype: 'Cluster' },
-        callback: (r) => {
-          const msg = r.message || {};
-          __cluster_basemaps = msg.basemaps || null;
-          __cluster_map_cfg = msg.map || {};
-          __cluster_bg_key = normalize_bg_key((__cluster_map_cfg && __cluster_map_cfg.default_basemap) || 'default');
-          cb && cb();
-        },
-        error: () => { __cluster_basemaps = null; __cluster_map_cfg = null; __cluster_bg_key = 'default'; cb && cb(); }
-      });
-    });
+  frappe.call({
+    method: 'rb.gis_integration.api.gis_get_client_config',
+    args: { doctype: 'Cluster' },
+    callback: (r) => {
+      const msg = r.message || {};
+      __cluster_basemaps = msg.basemaps || null;
+      __cluster_map_cfg = msg.map || {};
+      __cluster_tile_url = msg.tile_url || null;
+      __cluster_bg_key = normalize_bg_key((__cluster_map_cfg && __cluster_map_cfg.default_basemap) || 'default');
+      cb && cb();
+    },
+    error: () => { __cluster_basemaps = null; __cluster_map_cfg = null; __cluster_bg_key = 'default'; cb && cb(); }
+  });
 }
 
 function normalize_bg_key(which) { if (!which) return 'default'; const w = String(which).trim(); if (w==='alt') return 'A'; if (w.toLowerCase()==='b') return 'B'; return w; }
@@ -248,3 +264,18 @@ function test_gis_connection(frm) {
     }
   });
 }
+
+// Surrounding Cluster features as server-side vector tiles (Leaflet.VectorGrid is loaded on demand)
+function add_cluster_tile_layer(map) {
+  if (!map || !__cluster_tile_url) return;
+  rb.gis.ensure_vectorgrid(() => {
+    if (!L.vectorGrid) return;
+    const layer = (__cluster_map_cfg && __cluster_map_cfg.tile_layer) || frappe.scrub('Cluster');
+    L.vectorGrid.protobuf(__cluster_tile_url, {
+      vectorTileLayerStyles: { [layer]: { color: '#7F8C8D', weight: 1, fill: true, fillOpacity: 0.05, radius: 3 } },
+      interactive: false,
+      maxNativeZoom: 22,
+      fetchOptions: { credentials: 'same-origin' }
+    }).addTo(map);
+  });
+}
@@ -8,6 +8,7 @@ const FIXTURE_BASEMAP_FALLBACK = {
 let __fixture_basemaps = null;
 let __fixture_map_cfg = null;
 let __fixture_bg_key = 'default';
+let __fixture_tile_url = null; // vector tiles of all Fixture Compensation geometries (server-rendered)
 let __fixture_map;
 let __fixture_geo_layer;
 let __fixture_leaflet_loading;
@@ -27,22 +28,36 @@ frappe.ui.form.on('Fixture Compensation', {
 
     if (!frm.doc.name) {
       frm.dashboard.set_headline(__('Save the document to enable GIS actions.'));
-    } else if (!frm.doc.location) {
-      frm.dashboard.set_headline(__('No geometry loaded. Click "Fetch Geometry from GIS" to load.'));
-      setTimeout(() => fetch_geometry_from_gis(frm), 250);
-    } else {
-      try {
-        const fc = (typeof frm.doc.location === 'string') ? JSON.parse(frm.doc.location) : frm.doc.location;
-        render_geometry_on_form(frm, fc);
-      } catch (e) {
-        console.error('Failed to render saved geometry', e);
-      }
+    } else if (!frm.is_new()) {
+      load_fixture_geometry(frm);
     }
 
     ensure_fixture_client_cfg(() => setTimeout(() => set_geolocation_basemap(frm, 'location', __fixture_bg_key), 300));
   }
 });
 
+// Geometry lives in the GIS Geometry store; load it only when the form map renders
+function load_fixture_geometry(frm) {
+  frappe.call({
+    method: 'rb.gis_integration.api.get_document_geometry',
+    args: { doctype: 'Fixture Compensation', name: frm.doc.name },
+    callback: (r) => {
+      if (!r || !r.message) {
+        frm.dashboard.set_headline(__('No geometry loaded. Click "Fetch Geometry from GIS" to load.'));
+        setTimeout(() => fetch_geometry_from_gis(frm), 250);
+        return;
+      }
+      try {
+        frm.doc.location = r.message;
+        frm.refresh_field('location');
+        render_geometry_on_form(frm, JSON.parse(r.message));
+      } catch (e) {
+        console.error('Failed to render saved geometry', e);
+      }
+    }
+  });
+}
+
 function fetch_geometry_from_gis(frm) {
   if (!frm.doc.name) {
     frappe.msgprint({ message: __('Save the document before fetching geometry.'), indicator: 'orange' });
@@ -96,26 +111,24 @@ function ensure_fixture_client_cfg(cb) {
     cb && cb();
     return;
   }
-  frappe.call({ method: 'rb.gis_integration.api.gis_reload_config' })
-    .always(() => {
-      frappe.call({
-        method: 'rb.gis_integration.api.gis_get_client_config',
-        args: { doctype: 'Fixture Compensation' },
-        callback: (r) => {
-          const msg = r.message || {};
-          __fixture_basemaps = msg.basemaps || null;
-          __fixture_map_cfg = msg.map || {};
-          __fixture_bg_key = normalize_bg_key((__fixture_map_cfg && __fixture_map_cfg.default_basemap) || 'default');
-          cb && cb();
-        },
-        error: () => {
-          __fixture_basemaps = null;
-          __fixture_map_cfg = null;
-          __fixture_bg_key = 'default';
-          cb && cb();
-        }
-      });
-    });
+  frappe.call({
+    method: 'rb.gis_integration.api.gis_get_client_config',
+    args: { doctype: 'Fixture Compensation' },
+    callback: (r) => {
+      const msg = r.message || {};
+      __fixture_basemaps = msg.basemaps || null;
+      __fixture_map_cfg = msg.map || {};
+      __fixture_tile_url = msg.tile_url || null;
+      __fixture_bg_key = normalize_bg_key((__fixture_map_cfg && __fixture_map_cfg.default_basemap) || 'default');
+      cb && cb();
+    },
+    error: () => {
+      __fixture_basemaps = null;
+      __fixture_map_cfg = null;
+      __fixture_bg_key = 'default';
+      cb && cb();
+    }
+  });
 }
 
 function normalize_bg_key(which) {
@@ -150,7 +163,7 @@ function ensure_map(frm) {
     const el = document.getElementById(id);
     if (el && window.L) {
       __fixture_map = L.map(id);
-      ensure_fixture_client_cfg(() => { set_map_basemap(__fixture_map, __fixture_bg_key); apply_default_view(__fixture_map); });
+      ensure_fixture_client_cfg(() => { set_map_basemap(__fixture_map, __fixture_bg_key); apply_default_view(__fixture_map); add_fixture_tile_layer(__fixture_map); });
     }
   }
   return __fixture_map;
@@ -301,3 +314,18 @@ function test_gis_connection(frm) {
     }
   });
 }
+
+// Surrounding Fixture Compensation features as server-side vector tiles (Leaflet.VectorGrid is loaded on demand)
+function add_fixture_tile_layer(map) {
+  if (!map || !__fixture_tile_url) return;
+  rb.gis.ensure_vectorgrid(() => {
+    if (!L.vectorGrid) return;
+    const layer = (__fixture_map_cfg && __fixture_map_cfg.tile_layer) || frappe.scrub('Fixture Compensation');
+    L.vectorGrid.protobuf(__fixture_tile_url, {
+      vectorTileLayerStyles: { [layer]: { color: '#7F8C8D', weight: 1, fill: true, fillOpacity: 0.05, radius: 3 } },
+      interactive: false,
+      maxNativeZoom: 22,
+      fetchOptions: { credentials: 'same-origin' }
+    }).addTo(map);
+  });
+}
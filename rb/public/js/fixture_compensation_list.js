@@ -1,3 +1,82 @@
 frappe.listview_settings['Fixture Compensation'] = {
-  get_coords_method: 'rb.gis_integration.api.get_fixture_compensation_coords'
+  get_coords_method: 'rb.gis_integration.api.get_fixture_compensation_coords',
+  onload(listview) {
+    listview.page.add_menu_item(__('Export GeoJSON'), () => {
+      const args = {
+        doctype: listview.doctype,
+        filters: JSON.stringify(listview.get_filters_for_args() || [])
+      };
+      window.open('/api/method/rb.gis_integration.export.export_geojson?' + new URLSearchParams(args).toString());
+    });
+    if (frappe.user.has_role('System Manager') || frappe.user.has_role('GIS Operator')) {
+      listview.page.add_menu_item(__('Link to Clusters by Geometry'), () => review_fixture_spatial_links(listview));
+    }
+  }
 };
+
+function review_fixture_spatial_links(listview) {
+  frappe.call({
+    method: 'rb.gis_integration.spatial_join.preview_spatial_links',
+    args: { doctype: listview.doctype },
+    freeze: true,
+    freeze_message: __('Matching centroids to Cluster polygons...'),
+    callback: (r) => {
+      const m = r.message || {};
+      const esc = frappe.utils.escape_html;
+      const rows = (m.changes || []).map(c => `<tr>
+          <td>${esc(c.name)}</td><td>${esc(c.current || '')}</td>
+          <td>${esc(c.proposed)}${c.candidates ? ' <span class="text-warning">(' + esc(c.candidates.join(', ')) + ')</span>' : ''}</td>
+        </tr>`).join('');
+      const summary = __('{0} unchanged, {1} to change ({2} ambiguous), {3} outside every Cluster, {4} without geometry', [
+        m.unchanged || 0, m.change_count || 0, m.ambiguous || 0, m.outside_count || 0, m.without_geometry || 0
+      ]);
+      const more = (m.change_count || 0) > (m.changes || []).length
+        ? `<p class="text-muted">${__('Showing the first {0} changes; applying updates all {1}.', [(m.changes || []).length, m.change_count])}</p>`
+        : '';
+      const d = new frappe.ui.Dialog({
+        title: __('Link by Geometry'),
+        size: 'large',
+        fields: [{
+          fieldtype: 'HTML',
+          fieldname: 'diff',
+          options: `<p>${summary}</p>${more}
+            <div style="max-height: 400px; overflow: auto;">
+              <table class="table table-bordered table-condensed">
+                <thead><tr><th>${__(listview.doctype)}</th><th>${__('Current')}</th><th>${__('Proposed')}</th></tr></thead>
+                <tbody>${rows}</tbody>
+              </table>
+            </div>`
+        }],
+        primary_action_label: __('Apply {0} changes', [m.change_count || 0]),
+        primary_action: () => {
+          d.hide();
+          if (!m.change_count) return;
+          frappe.realtime.off('gis_spatial_link_progress', on_fixture_spatial_link_progress);
+          frappe.realtime.on('gis_spatial_link_progress', on_fixture_spatial_link_progress);
+          frappe.call({
+            method: 'rb.gis_integration.spatial_join.apply_spatial_links',
+            args: { token: m.token },
+            callback: () => frappe.show_alert({ message: __('Applying links in background...'), indicator: 'blue' })
+          });
+        }
+      });
+      d.show();
+    }
+  });
+}
+
+function on_fixture_spatial_link_progress(m) {
+  if (!m || m.doctype !== 'Fixture Compensation') return;
+  if (m.status === 'running') {
+    frappe.show_progress(__('Applying links...'), (m.applied || 0) + (m.stale || 0) + (m.errors || 0), m.total || 0);
+    return;
+  }
+  frappe.hide_progress();
+  frappe.realtime.off('gis_spatial_link_progress', on_fixture_spatial_link_progress);
+  let msg = __('Applied: {0}, changed since preview: {1}, errors: {2}', [m.applied || 0, m.stale || 0, m.errors || 0]);
+  if (m.error_details && m.error_details.length) {
+    msg += '<br><br>' + m.error_details.map(x => frappe.utils.escape_html(x)).join('<br>');
+  }
+  frappe.msgprint({ title: __('Link by Geometry'), message: msg, indicator: m.errors ? 'orange' : 'green' });
+  cur_list && cur_list.doctype === 'Fixture Compensation' && cur_list.refresh();
+}
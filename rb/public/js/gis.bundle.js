@@ -0,0 +1,18 @@
+// Shared helpers for the GIS form and list maps (included on every desk page)
+frappe.provide('rb.gis');
+
+// Load the vendored Leaflet.VectorGrid bundle once; Leaflet itself must already be loaded
+rb.gis.ensure_vectorgrid = function (cb) {
+  if (window.L && L.vectorGrid) return cb && cb();
+  if (!window.L) {
+    console.warn('Leaflet.VectorGrid needs Leaflet to be loaded first');
+    return;
+  }
+  frappe.require('gis_vectorgrid.bundle.js', () => {
+    if (L.vectorGrid) {
+      cb && cb();
+    } else {
+      console.warn('Leaflet.VectorGrid load failed');
+    }
+  });
+};
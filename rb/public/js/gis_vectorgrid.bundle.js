@@ -0,0 +1,3 @@
+// Leaflet.VectorGrid, vendored through package.json and built by `bench build`.
+// Loaded on demand by rb.gis.ensure_vectorgrid once Leaflet (window.L) is on the page.
+import 'leaflet.vectorgrid/dist/Leaflet.VectorGrid.bundled.js';
@@ -9,22 +9,17 @@ const LOT_BASEMAPS = {
 let __lot_basemaps = null; // populated from rb.gis_integration.api.gis_get_client_config
 let __lot_map_cfg = null;  // per-DocType map config (default_zoom, center, etc.)
 let __lot_bg_key = 'default';
+let __lot_tile_url = null; // vector tiles of all Lot geometries (server-rendered)
 
 frappe.ui.form.on('Lot', {
   refresh(frm) {
     if (frm.doc.lot_id) {
       frm.add_custom_button(__('Fetch Geometry from GIS'), () => fetch_geometry_from_gis(frm), __('GIS Actions'));
-      if (!frm.doc.location) {
-        frm.dashboard.set_headline(__('No geometry loaded. Click "Fetch Geometry from GIS" to load.'));
-      } else {
-        try { const fc = (typeof frm.doc.location === 'string') ? JSON.parse(frm.doc.location) : frm.doc.location; render_geometry_on_form(frm, fc); } catch(e) {}
-      }
+      load_lot_geometry(frm);
       frm.add_custom_button(__('Open Map (tileserv)'), () => open_tiles_map(frm), __('GIS Actions'));
       frm.add_custom_button(__('Test GIS Connection'), () => test_gis_connection(frm), __('GIS Actions'));
       frm.add_custom_button(__('Cahnge To Background A'), () => toggle_lot_background(frm, 'A'), __('GIS Actions'));
       frm.add_custom_button(__('Cahnge To Background B'), () => set_lot_background(frm, 'B'), __('GIS Actions'));
-      // Try to render on refresh (non-blocking)
-      if (!__lot_geo_layer && !frm.doc.location) { setTimeout(() => fetch_geometry_from_gis(frm), 200); }
       // Load basemaps from server config and apply to Geolocation field
       ensure_lot_client_cfg(() => setTimeout(() => set_geolocation_basemap(frm, 'location', __lot_bg_key), 300));
     }
@@ -40,6 +35,27 @@ frappe.ui.form.on('Lot', {
   before_save(frm) {}
 });
 
+// Geometry lives in the GIS Geometry store; load it only when the form map renders
+function load_lot_geometry(frm) {
+  if (frm.is_new()) return;
+  frappe.call({
+    method: 'rb.gis_integration.api.get_document_geometry',
+    args: { doctype: 'Lot', name: frm.doc.name },
+    callback: (r) => {
+      if (!r || !r.message) {
+        frm.dashboard.set_headline(__('No geometry loaded. Click "Fetch Geometry from GIS" to load.'));
+        if (!__lot_geo_layer) { setTimeout(() => fetch_geometry_from_gis(frm), 200); }
+        return;
+      }
+      try {
+        frm.doc.location = r.message;
+        frm.refresh_field('location');
+        render_geometry_on_form(frm, JSON.parse(r.message));
+      } catch (e) {}
+    }
+  });
+}
+
 function fetch_geometry_from_gis(frm) {
   frappe.show_alert({ message: __('Fetching geometry from GIS...'), indicator: 'blue' });
   frappe.call({
@@ -50,8 +66,9 @@ function fetch_geometry_from_gis(frm) {
         if (r && r.message) {
           const fc = (typeof r.message === 'string') ? JSON.parse(r.message) : r.message;
           render_geometry_on_form(frm, fc);
-          // keep a client-side copy for immediate display; server writes to location
+          // keep a client-side copy for display; the server keeps it in the geometry store
           frm.doc.location = JSON.stringify(fc);
+          frm.refresh_field('location');
         }
       } catch (e) {
         console.error('Failed to render geometry', e);
@@ -62,22 +79,42 @@ function fetch_geometry_from_gis(frm) {
 }
 
 function sync_all_geometries(frm) {
-  frappe.confirm(__('This will sync geometries for all lots with GIS Feature IDs. Continue?'), () => {
+  frappe.confirm(__('This will sync geometries for all lots with GIS Feature IDs in the background. Continue?'), () => {
+    listen_lot_sync_progress();
     frappe.call({
-      method: 'rb.gis_integration.api.sync_all_lot_geometries',
-      args: { },
-      freeze: true,
-      freeze_message: __('Syncing geometries...'),
+      method: 'rb.gis_integration.sync_jobs.start_geometry_sync',
+      args: { doctype: 'Lot' },
       callback: (r) => {
-        const m = r.message || {}; const indicator = m.errors > 0 ? 'orange' : 'green';
-        let msg = __('Sync completed. Success: {0}, Errors: {1}', [m.success || 0, m.errors || 0]);
-        if (m.error_details && m.error_details.length) { msg += '<br><br>' + __('Errors:') + '<br>' + m.error_details.join('<br>'); }
-        frappe.msgprint({ title: __('Sync Results'), message: msg, indicator });
+        const m = r.message || {};
+        frappe.show_alert({ message: __('Geometry sync running in background ({0}/{1})', [m.processed || 0, m.total || 0]), indicator: 'blue' });
       }
     });
   });
 }
 
+function listen_lot_sync_progress() {
+  frappe.realtime.off('gis_sync_progress', on_lot_sync_progress);
+  frappe.realtime.on('gis_sync_progress', on_lot_sync_progress);
+}
+
+function on_lot_sync_progress(m) {
+  if (!m || m.doctype !== 'Lot') return;
+  const title = __('Syncing geometries...');
+  if (m.status === 'running') {
+    frappe.show_progress(title, m.processed || 0, m.total || 0, __('Success: {0}, Errors: {1}', [m.success || 0, m.errors || 0]));
+    return;
+  }
+  frappe.hide_progress();
+  frappe.realtime.off('gis_sync_progress', on_lot_sync_progress);
+  const indicator = (m.status === 'failed' || m.errors > 0) ? 'orange' : 'green';
+  let msg = m.status === 'failed'
+    ? __('Sync stopped at {0}/{1}; starting it again resumes from the last checkpoint.', [m.processed || 0, m.total || 0])
+    : __('Sync completed. Success: {0} ({1} unchanged), Errors: {2}', [m.success || 0, m.unchanged || 0, m.errors || 0]);
+  if (m.error) { msg += '<br>' + frappe.utils.escape_html(m.error); }
+  if (m.error_details && m.error_details.length) { msg += '<br><br>' + __('Errors:') + '<br>' + m.error_details.map(x => frappe.utils.escape_html(x)).join('<br>'); }
+  frappe.msgprint({ title: __('Sync Results'), message: msg, indicator });
+}
+
 function open_tiles_map(frm) {
   // Simple example URL (adjust to your environment as needed)
   const layer = (frm.doc.gis_collection || 'public.lots');
@@ -108,7 +145,7 @@ function ensure_map(frm) {
     const el = document.getElementById(id);
     if (el && window.L) {
       __lot_map = L.map(id);
-      ensure_lot_client_cfg(() => { set_map_basemap(__lot_map, __lot_bg_key); apply_default_view(__lot_map); });
+      ensure_lot_client_cfg(() => { set_map_basemap(__lot_map, __lot_bg_key); apply_default_view(__lot_map); add_lot_tile_layer(__lot_map); });
     }
   }
   return __lot_map;
@@ -240,22 +277,20 @@ function set_lot_background(frm, which) {
 
 function ensure_lot_client_cfg(cb) {
   if (__lot_basemaps) return cb && cb();
-  // Reload server config, then fetch basemaps + Lot map settings
-  frappe.call({ method: 'rb.gis_integration.api.gis_reload_config' })
-    .always(() => {
-      frappe.call({
-        method: 'rb.gis_integration.api.gis_get_client_config',
-        args: { doctype: 'Lot' },
-        callback: (r) => {
-          const msg = r.message || {};
-          __lot_basemaps = msg.basemaps || null;
-          __lot_map_cfg = msg.map || {};
-          __lot_bg_key = normalize_bg_key((__lot_map_cfg && __lot_map_cfg.default_basemap) || 'default');
-          cb && cb();
-        },
-        error: () => { __lot_basemaps = null; __lot_bg_key = 'default'; cb && cb(); }
-      });
-    });
+  // Fetch basemaps + Lot map settings (server config is cached and versioned)
+  frappe.call({
+    method: 'rb.gis_integration.api.gis_get_client_config',
+    args: { doctype: 'Lot' },
+    callback: (r) => {
+      const msg = r.message || {};
+      __lot_basemaps = msg.basemaps || null;
+      __lot_map_cfg = msg.map || {};
+      __lot_tile_url = msg.tile_url || null;
+      __lot_bg_key = normalize_bg_key((__lot_map_cfg && __lot_map_cfg.default_basemap) || 'default');
+      cb && cb();
+    },
+    error: () => { __lot_basemaps = null; __lot_bg_key = 'default'; cb && cb(); }
+  });
 }
 
 function normalize_bg_key(which) {
@@ -300,3 +335,18 @@ function should_fit_geometry() {
   } catch (e) {}
   return false;
 }
+
+// Surrounding Lot features as server-side vector tiles (Leaflet.VectorGrid is loaded on demand)
+function add_lot_tile_layer(map) {
+  if (!map || !__lot_tile_url) return;
+  rb.gis.ensure_vectorgrid(() => {
+    if (!L.vectorGrid) return;
+    const layer = (__lot_map_cfg && __lot_map_cfg.tile_layer) || frappe.scrub('Lot');
+    L.vectorGrid.protobuf(__lot_tile_url, {
+      vectorTileLayerStyles: { [layer]: { color: '#7F8C8D', weight: 1, fill: true, fillOpacity: 0.05, radius: 3 } },
+      interactive: false,
+      maxNativeZoom: 22,
+      fetchOptions: { credentials: 'same-origin' }
+    }).addTo(map);
+  });
+}
@@ -9,6 +9,7 @@ const PLAN_BASEMAPS = {
 let __plan_basemaps = null; // populated from gis_get_client_config
 let __plan_map_cfg = null;
 let __plan_bg_key = 'default';
+let __plan_tile_url = null; // vector tiles of all Plan geometries (server-rendered)
 let __plan_map;
 let __plan_geo_layer;
 let __plan_leaflet_loading;
@@ -24,19 +25,8 @@ frappe.ui.form.on('Plan', {
       frm.add_custom_button(__('Cahnge To Background A'), () => toggle_plan_background(frm, 'A'), group);
       frm.add_custom_button(__('Cahnge To Background B'), () => set_plan_background(frm, 'B'), group);
 
-      if (!frm.doc.location) {
-        frm.dashboard && frm.dashboard.set_headline(__('No geometry loaded. Click "Fetch Geometry from GIS" to load.'));
-        if (!__plan_geo_layer) {
-          setTimeout(() => fetch_plan_geometry(frm), 200);
-        }
-      } else {
-        frm.dashboard && frm.dashboard.clear_headline();
-        try {
-          const fc = typeof frm.doc.location === 'string' ? JSON.parse(frm.doc.location) : frm.doc.location;
-          render_plan_geometry(frm, fc);
-        } catch (e) {
-          console.warn('Failed to parse Plan geometry', e);
-        }
+      if (!frm.is_new()) {
+        load_plan_geometry(frm);
       }
 
       ensure_plan_client_cfg(() => setTimeout(() => set_plan_geolocation_basemap(frm, 'location', __plan_bg_key), 300));
@@ -47,6 +37,15 @@ frappe.ui.form.on('Plan', {
     if (frappe.user.has_role('System Manager')) {
       frm.add_custom_button(__('Sync All Geometries'), () => sync_all_plan_geometries(frm), group);
     }
+    if (!frm.is_new() && (frappe.user.has_role('System Manager') || frappe.user.has_role('GIS Operator'))) {
+      frm.add_custom_button(__('Reconcile Lot Areas'), () => reconcile_plan_lot_areas(frm), group);
+    }
+    if (!frm.is_new() && ['System Manager', 'GIS Operator', 'Planning Editor'].some(r => frappe.user.has_role(r))) {
+      frm.add_custom_button(__('Check Lot Topology'), () => check_plan_lot_topology(frm), group);
+    }
+    if (!frm.is_new()) {
+      show_plan_topology_indicator(frm);
+    }
   },
 
   plan_number(frm) {
@@ -56,6 +55,31 @@ frappe.ui.form.on('Plan', {
   }
 });
 
+// Geometry lives in the GIS Geometry store; load it only when the form map renders
+function load_plan_geometry(frm) {
+  frappe.call({
+    method: 'rb.gis_integration.api.get_document_geometry',
+    args: { doctype: 'Plan', name: frm.doc.name },
+    callback: (r) => {
+      if (!r || !r.message) {
+        frm.dashboard && frm.dashboard.set_headline(__('No geometry loaded. Click "Fetch Geometry from GIS" to load.'));
+        if (!__plan_geo_layer) {
+          setTimeout(() => fetch_plan_geometry(frm), 200);
+        }
+        return;
+      }
+      frm.dashboard && frm.dashboard.clear_headline();
+      try {
+        frm.doc.location = r.message;
+        frm.refresh_field('location');
+        render_plan_geometry(frm, JSON.parse(r.message));
+      } catch (e) {
+        console.warn('Failed to parse Plan geometry', e);
+      }
+    }
+  });
+}
+
 function fetch_plan_geometry(frm) {
   if (!frm.doc.plan_number) {
     frappe.msgprint({ message: __('Plan Number is required before fetching geometry.'), indicator: 'orange' });
@@ -81,7 +105,8 @@ function fetch_plan_geometry(frm) {
         if (r && r.message) {
           const fc = typeof r.message === 'string' ? JSON.parse(r.message) : r.message;
           render_plan_geometry(frm, fc);
-          frm.set_value('location', JSON.stringify(fc));
+          frm.doc.location = JSON.stringify(fc);
+          frm.refresh_field('location');
           frm.dashboard && frm.dashboard.clear_headline();
           frappe.show_alert({ message: __('Geometry updated.'), indicator: 'green' });
         }
@@ -98,24 +123,110 @@ function fetch_plan_geometry(frm) {
 }
 
 function sync_all_plan_geometries(frm) {
-  frappe.confirm(__('Sync geometries for all Plans that have a Plan Number?'), () => {
+  frappe.confirm(__('Sync geometries for all Plans that have a Plan Number in the background?'), () => {
+    listen_plan_sync_progress();
     frappe.call({
-      method: 'rb.gis_integration.api.sync_all_plan_geometries',
-      freeze: true,
-      freeze_message: __('Syncing Plan geometries...'),
+      method: 'rb.gis_integration.sync_jobs.start_geometry_sync',
+      args: { doctype: 'Plan' },
       callback: (r) => {
         const m = r.message || {};
-        const indicator = (m.errors || 0) > 0 ? 'orange' : 'green';
-        let msg = __('Sync completed. Success: {0}, Errors: {1}', [m.success || 0, m.errors || 0]);
-        if (m.error_details && m.error_details.length) {
-          msg += '<br><br>' + __('Errors:') + '<br>' + m.error_details.join('<br>');
-        }
-        frappe.msgprint({ title: __('Sync Results'), message: msg, indicator });
+        frappe.show_alert({
+          message: __('Plan geometry sync running in background ({0}/{1})', [m.processed || 0, m.total || 0]),
+          indicator: 'blue'
+        });
       }
     });
   });
 }
 
+function listen_plan_sync_progress() {
+  frappe.realtime.off('gis_sync_progress', on_plan_sync_progress);
+  frappe.realtime.on('gis_sync_progress', on_plan_sync_progress);
+}
+
+function on_plan_sync_progress(m) {
+  if (!m || m.doctype !== 'Plan') return;
+  const title = __('Syncing Plan geometries...');
+  if (m.status === 'running') {
+    frappe.show_progress(title, m.processed || 0, m.total || 0, __('Success: {0}, Errors: {1}', [m.success || 0, m.errors || 0]));
+    return;
+  }
+  frappe.hide_progress();
+  frappe.realtime.off('gis_sync_progress', on_plan_sync_progress);
+  const indicator = (m.status === 'failed' || (m.errors || 0) > 0) ? 'orange' : 'green';
+  let msg = m.status === 'failed'
+    ? __('Sync stopped at {0}/{1}; starting it again resumes from the last checkpoint.', [m.processed || 0, m.total || 0])
+    : __('Sync completed. Success: {0} ({1} unchanged), Errors: {2}', [m.success || 0, m.unchanged || 0, m.errors || 0]);
+  if (m.error) {
+    msg += '<br>' + frappe.utils.escape_html(m.error);
+  }
+  if (m.error_details && m.error_details.length) {
+    msg += '<br><br>' + __('Errors:') + '<br>' + m.error_details.map(x => frappe.utils.escape_html(x)).join('<br>');
+  }
+  frappe.msgprint({ title: __('Sync Results'), message: msg, indicator });
+}
+
+// Recompute Lot areas from their geometries, then open the reconciliation report
+function reconcile_plan_lot_areas(frm) {
+  frappe.realtime.off('gis_area_progress', on_plan_area_progress);
+  frappe.realtime.on('gis_area_progress', on_plan_area_progress);
+  frappe.call({
+    method: 'rb.gis_integration.area.start_area_computation',
+    args: { plan: frm.doc.name },
+    callback: () => frappe.show_alert({ message: __('Computing Lot areas in background...'), indicator: 'blue' })
+  });
+}
+
+function on_plan_area_progress(m) {
+  if (!m || m.doctype !== 'Lot' || !cur_frm || m.plan !== cur_frm.doc.name) return;
+  const title = __('Computing Lot areas...');
+  if (m.status === 'running') {
+    frappe.show_progress(title, m.processed || 0, m.total || 0);
+    return;
+  }
+  frappe.hide_progress();
+  frappe.realtime.off('gis_area_progress', on_plan_area_progress);
+  if (m.status === 'failed') {
+    frappe.msgprint({ title: __('Area Computation'), message: frappe.utils.escape_html(m.error || ''), indicator: 'red' });
+    return;
+  }
+  frappe.set_route('query-report', 'Lot Area Reconciliation', { plan: m.plan });
+}
+
+// Overlapping / duplicate Lots and coverage gaps, checked in background
+function check_plan_lot_topology(frm) {
+  frappe.realtime.off('gis_topology_progress', on_plan_topology_progress);
+  frappe.realtime.on('gis_topology_progress', on_plan_topology_progress);
+  frappe.call({
+    method: 'rb.gis_integration.topology.start_topology_check',
+    args: { plan: frm.doc.name },
+    callback: () => frappe.show_alert({ message: __('Checking Lot topology in background...'), indicator: 'blue' })
+  });
+}
+
+function on_plan_topology_progress(m) {
+  if (!m || !cur_frm || cur_frm.doctype !== 'Plan' || m.plan !== cur_frm.doc.name) return;
+  frappe.realtime.off('gis_topology_progress', on_plan_topology_progress);
+  if (m.status === 'failed') {
+    frappe.msgprint({ title: __('Lot Topology'), message: frappe.utils.escape_html(m.error || ''), indicator: 'red' });
+    return;
+  }
+  frappe.show_alert({
+    message: __('{0} Lots, {1} pairs checked: {2} findings ({3} new, {4} resolved)',
+      [m.lots || 0, m.pairs_checked || 0, m.findings || 0, m.created || 0, m.resolved || 0]),
+    indicator: m.findings ? 'orange' : 'green'
+  });
+  cur_frm.reload_doc();
+}
+
+function show_plan_topology_indicator(frm) {
+  frappe.db.count('Lot Topology Finding', { filters: { plan: frm.doc.name, status: ['in', ['Open', 'Confirmed']] } })
+    .then((count) => {
+      if (!count || frm.doc.name !== cur_frm.doc.name) return;
+      frm.dashboard.add_indicator(__('{0} open Lot topology findings', [count]), 'orange');
+    });
+}
+
 function open_plan_tiles_map(frm) {
   const layer = frm.doc.gis_collection || 'rb_layers.plans';
   const url = `http://your-tileserv:7800/${layer}/{z}/{x}/{y}.pbf`;
@@ -171,7 +282,7 @@ function ensure_plan_map(frm) {
     const el = document.getElementById(id);
     if (el && window.L) {
       __plan_map = L.map(id);
-      ensure_plan_client_cfg(() => { set_plan_map_basemap(__plan_map, __plan_bg_key); apply_plan_default_view(__plan_map); });
+      ensure_plan_client_cfg(() => { set_plan_map_basemap(__plan_map, __plan_bg_key); apply_plan_default_view(__plan_map); add_plan_tile_layer(__plan_map); });
     }
   }
   return __plan_map;
@@ -270,21 +381,19 @@ function set_plan_background(frm, which) {
 
 function ensure_plan_client_cfg(cb) {
   if (__plan_basemaps) return cb && cb();
-  frappe.call({ method: 'rb.gis_integration.api.gis_reload_config' })
-    .always(() => {
-      frappe.call({
-        method: 'rb.gis_integration.api.gis_get_client_config',
-        args: { doctype: 'Plan' },
-        callback: (r) => {
-          const msg = r.message || {};
-          __plan_basemaps = msg.basemaps || null;
-          __plan_map_cfg = msg.map || {};
-          __plan_bg_key = normalize_plan_bg_key((__plan_map_cfg && __plan_map_cfg.default_basemap) || 'default');
-          cb && cb();
-        },
-        error: () => { __plan_basemaps = null; __plan_bg_key = 'default'; cb && cb(); }
-      });
-    });
+  frappe.call({
+    method: 'rb.gis_integration.api.gis_get_client_config',
+    args: { doctype: 'Plan' },
+    callback: (r) => {
+      const msg = r.message || {};
+      __plan_basemaps = msg.basemaps || null;
+      __plan_map_cfg = msg.map || {};
+      __plan_tile_url = msg.tile_url || null;
+      __plan_bg_key = normalize_plan_bg_key((__plan_map_cfg && __plan_map_cfg.default_basemap) || 'default');
+      cb && cb();
+    },
+    error: () => { __plan_basemaps = null; __plan_bg_key = 'default'; cb && cb(); }
+  });
 }
 
 function normalize_plan_bg_key(which) {
@@ -330,3 +439,18 @@ function plan_should_fit_geometry() {
   } catch (e) {}
   return true;
 }
+
+// Surrounding Plan features as server-side vector tiles (Leaflet.VectorGrid is loaded on demand)
+function add_plan_tile_layer(map) {
+  if (!map || !__plan_tile_url) return;
+  rb.gis.ensure_vectorgrid(() => {
+    if (!L.vectorGrid) return;
+    const layer = (__plan_map_cfg && __plan_map_cfg.tile_layer) || frappe.scrub('Plan');
+    L.vectorGrid.protobuf(__plan_tile_url, {
+      vectorTileLayerStyles: { [layer]: { color: '#7F8C8D', weight: 1, fill: true, fillOpacity: 0.05, radius: 3 } },
+      interactive: false,
+      maxNativeZoom: 22,
+      fetchOptions: { credentials: 'same-origin' }
+    }).addTo(map);
+  });
+}
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, lotan souid and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("GIS Geometry", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,18 @@
+# Copyright (c) 2026, lotan souid and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class GISGeometry(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique(
+		"GIS Geometry", ["reference_doctype", "reference_name"], constraint_name="unique_gis_geometry_reference"
+	)
+	# Viewport queries: bbox overlap and centroid-in-view, always scoped to one DocType
+	frappe.db.add_index("GIS Geometry", ["reference_doctype", "min_lon", "min_lat", "max_lon", "max_lat"])
+	frappe.db.add_index("GIS Geometry", ["reference_doctype", "centroid_lon", "centroid_lat"])